@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Local record/replay stand-in for the FRS, Census and USAspending APIs.
+
+This module defines the `ApiStubServer` class, an `aiohttp` server that answers the requests
+of `FrsDataFetcher` and `NaicsDataFetcher` without reaching the live services, so that their
+throughput can be measured offline (see `benchmarks/fetcher_throughput.py`). Each service is
+mounted under its own path prefix, and `stub_config` points the base URLs of a configuration
+at the server:
+    - /frs: FRS (EPA Envirofacts efservice) registry ID lookups.
+    - /census: Census international trade NAICS title lookups.
+    - /usaspending: USAspending NAICS title lookups.
+
+The responses are replayed from a JSON file of recordings, keyed by the service and the
+request path and query (without the API key and the month of the Census queries). In record mode, the requests that are not in
+the recordings are forwarded to the live service and their responses are recorded and saved
+when the server stops. Requests that are neither recorded nor recordable get a synthetic,
+deterministic response of the same shape, so large sweeps do not need large recordings.
+
+Each service has its own latency (mean and jitter), error rate (503 responses) and rate limit
+(429 responses with a `Retry-After` header once a token bucket is empty), set under `api_stub`
+in the configuration.
+
+Classes:
+    ApiStubServer: Serves the recorded or synthetic responses with the configured faults.
+
+Functions:
+    stub_config(config: DictConfig, base_url: str) -> DictConfig:
+        Returns a copy of the configuration whose API base URLs point at the stub server.
+
+Usage:
+    Record the responses of the live services while running the pipeline or a benchmark
+    against the stub, e.g., with the Census API key in the `.env` file:
+
+    ```
+    python -m benchmarks.api_stub --record
+    ```
+
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from omegaconf import DictConfig, OmegaConf
+
+CURRENT_DIRECTORY = os.getcwd()
+SERVICES = ["frs", "census", "usaspending"]
+IGNORED_QUERY_PARAMETERS = {"key", "time"}  # The API key and the month of the Census queries
+SYNTHETIC_NAICS_CODES = ["325211", "325991", "326199", "424610", "562211", "562212", "221320", "331110"]
+
+
+class ApiStubServer:
+    """Local server replaying the responses of the FRS, Census and USAspending APIs.
+
+    Attributes:
+        host (str): The interface the server listens on.
+        port (int): The port the server listens on (0 picks a free port when started).
+        recordings_path (str): The path to the JSON file with the recorded responses.
+        record (bool): Whether unrecorded requests are forwarded to the live services and recorded.
+        synthesize (bool): Whether unrecorded requests get a synthetic response instead of a 404.
+        upstream_urls (Dict[str, str]): The base URL of the live service behind each path prefix.
+        service_settings (Dict[str, Dict[str, float]]): The latency, error rate and rate limit of each service.
+        requests (Dict[str, Dict[str, int]]): The number of requests of each service, by outcome.
+
+    """
+
+    _DEFAULTS = {
+        "latency_ms": 50,
+        "latency_jitter_ms": 20,
+        "error_rate": 0.0,
+        "rate_limit_per_second": None,
+        "burst": 10,
+    }
+
+    def __init__(
+        self,
+        config: DictConfig,
+    ):
+        stub_config = config.get("api_stub", {})
+        self.host = stub_config.get("host", "127.0.0.1")
+        self.port = stub_config.get("port", 0)
+        self.recordings_path = os.path.join(
+            CURRENT_DIRECTORY,
+            stub_config.get("recordings", "benchmarks/recordings/api_responses.json"),
+        )
+        self.record = stub_config.get("record", False)
+        self.synthesize = stub_config.get("synthesize", True)
+        self.upstream_urls = {
+            "frs": config.frs_api.base_url,
+            "census": config.census_api.base_url,
+            "usaspending": config.usspending_api.base_url.split("/{naics_code}")[0],
+        }
+        service_config = stub_config.get("services", {})
+        self.service_settings = {
+            service: {
+                key: service_config.get(service, {}).get(key, stub_config.get(key, value))
+                for key, value in self._DEFAULTS.items()
+            }
+            for service in SERVICES
+        }
+        self.requests = {
+            service: dict.fromkeys(["replayed", "recorded", "synthetic", "throttled", "failed"], 0) for service in SERVICES
+        }
+        self._recordings: Dict[str, Dict[str, Any]] = {service: {} for service in SERVICES}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._random = random.Random(stub_config.get("seed", 0))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._upstream: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def base_url(self) -> str:
+        """Get the base URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "ApiStubServer":
+        """Load the recordings and start the server on a background thread.
+
+        Returns:
+            ApiStubServer: The started server, e.g., to chain `stub_config(config, server.start().base_url)`.
+
+        """
+        self._load_recordings()
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        """Stop the server and, in record mode, save the recordings."""
+        if self._loop is None or self._runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+        self._loop = None
+        if self.record:
+            self._save_recordings()
+
+    def _serve(self, started: threading.Event):
+        """Run the server on the event loop of the background thread."""
+        assert self._loop is not None
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        for service in SERVICES:
+            app.router.add_get(f"/{service}/{{path:.*}}", self._handler(service))
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        started.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self):
+        """Close the session to the live services and clean up the server."""
+        if self._upstream is not None:
+            await self._upstream.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _handler(self, service: str):
+        """Create the request handler of a service."""
+
+        async def handle(request: web.Request) -> web.Response:
+            return await self._respond(service, request)
+
+        return handle
+
+    async def _respond(
+        self,
+        service: str,
+        request: web.Request,
+    ) -> web.Response:
+        """Answer a request with the faults of its service and the recorded or synthetic response."""
+        settings = self.service_settings[service]
+        if not self._take_token(service, settings):
+            self.requests[service]["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+
+        latency = max(0.0, self._random.gauss(settings["latency_ms"], settings["latency_jitter_ms"])) / 1000
+        await asyncio.sleep(latency)
+        if self._random.random() < settings["error_rate"]:
+            self.requests[service]["failed"] += 1
+            return web.Response(status=503)
+
+        key = self._recording_key(request)
+        recording = self._recordings[service].get(key)
+        if recording is not None:
+            self.requests[service]["replayed"] += 1
+        elif self.record:
+            recording = await self._record(service, request, key)
+            self.requests[service]["recorded"] += 1
+        elif self.synthesize:
+            recording = self._synthesize(service, request)
+            self.requests[service]["synthetic"] += 1
+        else:
+            return web.Response(status=404)
+
+        if recording["body"] is None:
+            return web.Response(status=recording["status"])
+        return web.json_response(recording["body"], status=recording["status"])
+
+    def _take_token(
+        self,
+        service: str,
+        settings: Dict[str, Any],
+    ) -> bool:
+        """Take a token from the bucket of a service, returning False if the service is rate limited."""
+        rate = settings["rate_limit_per_second"]
+        if not rate:
+            return True
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(service, (float(settings["burst"]), now))
+        tokens = min(float(settings["burst"]), tokens + (now - updated_at) * rate)
+        if tokens < 1:
+            self._buckets[service] = (tokens, now)
+            return False
+        self._buckets[service] = (tokens - 1, now)
+        return True
+
+    @staticmethod
+    def _recording_key(request: web.Request) -> str:
+        """Return the path and sorted query of a request, without the service prefix, the API key and the month."""
+        query = "&".join(
+            f"{name}={value}" for name, value in sorted(request.query.items()) if name not in IGNORED_QUERY_PARAMETERS
+        )
+        return request.match_info["path"] + (f"?{query}" if query else "")
+
+    async def _record(
+        self,
+        service: str,
+        request: web.Request,
+        key: str,
+    ) -> Dict[str, Any]:
+        """Forward a request to the live service and record its response."""
+        if self._upstream is None:
+            self._upstream = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        url = f"{self.upstream_urls[service]}/{request.match_info['path']}"
+        async with self._upstream.get(url, params=request.query) as response:
+            body = await response.json(content_type=None) if response.status == 200 else None
+            recording = {"status": response.status, "body": body}
+        # Throttled and failed responses are replayed as they are, but not recorded
+        if response.status in {200, 204, 404}:
+            self._recordings[service][key] = recording
+        return recording
+
+    def _synthesize(
+        self,
+        service: str,
+        request: web.Request,
+    ) -> Dict[str, Any]:
+        """Create a deterministic response with the shape of the responses of a service."""
+        path = request.match_info["path"]
+        if service == "frs":
+            match = re.search(r"registry_id/equals/(\d+)", path)
+            registry_id = match.group(1) if match else ""
+            return {"status": 200, "body": [{"registry_id": registry_id, "naics_code": _pick_naics_code(registry_id)}]}
+        elif service == "census":
+            naics_code = request.query.get("NAICS", "")
+            return {"status": 200, "body": [["NAICS_SDESC", "time", "NAICS"], [f"INDUSTRY {naics_code}", "", naics_code]]}
+        else:
+            naics_code = path.strip("/")
+            return {"status": 200, "body": {"results": [{"naics_description": f"INDUSTRY {naics_code}"}]}}
+
+    def _load_recordings(self):
+        """Load the recorded responses, if the file exists."""
+        if not os.path.exists(self.recordings_path):
+            return
+        with open(self.recordings_path, encoding="utf-8") as file:
+            recordings = json.load(file)
+        for service in SERVICES:
+            self._recordings[service].update(recordings.get(service, {}))
+
+    def _save_recordings(self):
+        """Save the recorded responses."""
+        os.makedirs(os.path.dirname(self.recordings_path), exist_ok=True)
+        with open(self.recordings_path, "w", encoding="utf-8") as file:
+            json.dump(self._recordings, file, indent=1, sort_keys=True)
+
+
+def _pick_naics_code(registry_id: str) -> str:
+    """Pick a NAICS code for a registry ID, always the same for the same ID."""
+    digest = hashlib.md5(registry_id.encode("utf-8")).digest()
+    return SYNTHETIC_NAICS_CODES[digest[0] % len(SYNTHETIC_NAICS_CODES)]
+
+
+def stub_config(
+    config: DictConfig,
+    base_url: str,
+) -> DictConfig:
+    """Return a copy of the configuration whose API base URLs point at the stub server.
+
+    Args:
+        config (DictConfig): The configuration object.
+        base_url (str): The base URL of the stub server.
+
+    Returns:
+        DictConfig: The configuration for the fetchers to query the stub server.
+
+    """
+    config = OmegaConf.create(OmegaConf.to_container(config))
+    OmegaConf.update(config, "frs_api.base_url", f"{base_url}/frs")
+    OmegaConf.update(config, "census_api.base_url", f"{base_url}/census")
+    OmegaConf.update(config, "usspending_api.base_url", f"{base_url}/usaspending/{{naics_code}}/")
+    return config
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(description="Run the local stand-in of the FRS, Census and USAspending APIs.")
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Whether to forward the unrecorded requests to the live services and record their responses",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="The port the server listens on",
+    )
+    args = parser.parse_args()
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../conf",
+        job_name="api-stub",
+    ):
+        cfg = hydra.compose(config_name="main")
+        OmegaConf.update(cfg, "api_stub.record", args.record)
+        OmegaConf.update(cfg, "api_stub.port", args.port)
+        server = ApiStubServer(cfg).start()
+        print(f"Serving the API stand-in on {server.base_url} (Ctrl+C to stop).")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.stop()
+            print(server.requests)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Benchmark of the throughput of the FRS and NAICS fetchers.
+
+This module runs `FrsDataFetcher` and `NaicsDataFetcher` against the local stand-in of the
+FRS, Census and USAspending APIs (`benchmarks/api_stub.py`), sweeping the number of concurrent
+requests per host (`request_scheduler` in the configuration). Every run uses a fixed concurrency
+window and happens in a fresh worker process, so the in-memory caches start empty. The
+persistent cache, the offline NAICS title index and the hedging of the Census requests are
+disabled, so every lookup is requested over HTTP.
+
+The latency, error rate and rate limit of each service are set under `api_stub` in the
+configuration and can be overridden from the command line, e.g., to see how the concurrency
+behaves against a throttling host.
+
+Reported metrics, for each host contacted by the fetcher (e.g., Census and USAspending for the
+NAICS fetcher):
+    - seconds: Wall time of the lookups.
+    - lookups_per_second: Registry IDs or NAICS codes resolved per second of wall time.
+    - requests: Requests sent, including the retries of the throttled or failed ones.
+    - retries and failures: Retried requests and requests that failed after the last retry.
+    - requests_per_second: Requests per second while the host had pending requests.
+    - latency_p50 and latency_p99: Response latency percentiles, in seconds.
+
+Usage:
+    Run from the project root:
+
+    ```
+    python -m benchmarks.fetcher_throughput --concurrency 1 2 4 8 16 32
+    python -m benchmarks.fetcher_throughput --overrides api_stub.rate_limit_per_second=50 api_stub.error_rate=0.02
+    ```
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from omegaconf import DictConfig, OmegaConf
+
+from benchmarks.api_stub import ApiStubServer, stub_config
+from src.data_processing.frs_api_queries import FrsDataFetcher
+from src.data_processing.http_client import SharedHttpClient
+from src.data_processing.naics_api_queries import NaicsDataFetcher
+
+FETCHERS = ["frs", "naics"]
+FIRST_REGISTRY_ID = 110000000000
+UNLIMITED_RATE_PER_SECOND = 1_000_000
+
+
+def _benchmark_config(
+    config: DictConfig,
+    concurrency: int,
+    rate_per_second: Optional[float],
+) -> DictConfig:
+    """Return the configuration of a run with a fixed concurrency and every lookup requested over HTTP."""
+    config = OmegaConf.create(OmegaConf.to_container(config))
+    OmegaConf.update(config, "api_cache.enabled", False)
+    OmegaConf.update(config, "naics_index.enabled", False)
+    OmegaConf.update(config, "census_api.hedging.enabled", False)
+    for setting in ["initial_concurrency", "min_concurrency", "max_concurrency"]:
+        OmegaConf.update(config, f"request_scheduler.{setting}", concurrency)
+    OmegaConf.update(config, "request_scheduler.rate_per_second", rate_per_second or UNLIMITED_RATE_PER_SECOND)
+    OmegaConf.update(config, "request_scheduler.burst", max(concurrency, config.request_scheduler.get("burst", 10)))
+    OmegaConf.update(config, "http_client.limit_per_host", max(concurrency, config.http_client.get("limit_per_host", 10)))
+    OmegaConf.update(config, "http_client.limit", max(concurrency, config.http_client.get("limit", 100)))
+    return config
+
+
+def _measure_fetcher(config: DictConfig, fetcher: str, keys: List[str]) -> List[Dict[str, Any]]:
+    """Look up the keys with the fetcher and return the measurements of each contacted host."""
+    # The stand-in ignores the Census API key, which is only needed to record live responses
+    load_dotenv()
+    os.environ.setdefault("CENSUS_DATA_API_KEY", "benchmark")
+
+    start = time.perf_counter()
+    if fetcher == "frs":
+        FrsDataFetcher(config).process_registry_ids(pd.DataFrame({"registry_id": keys}), "registry_id")
+    else:
+        NaicsDataFetcher(config).process_naics_codes(pd.DataFrame({"naics_code": keys}), "naics_code")
+    seconds = time.perf_counter() - start
+
+    client = SharedHttpClient.instance(config)
+    hosts_stats = client.stats["hosts"]
+    client.close_instance()
+    # E.g., the NAICS fetcher also queries USAspending when Census returns no title
+    return [
+        {
+            "host": host,
+            "seconds": seconds,
+            "lookups_per_second": len(keys) / seconds,
+            "requests": host_stats["requests"],
+            "retries": host_stats["retries"],
+            "failures": host_stats["failures"],
+            "requests_per_second": host_stats["requests_per_second"],
+            "latency_p50": host_stats["latency_p50"],
+            "latency_p99": host_stats["latency_p99"],
+        }
+        for host, host_stats in hosts_stats.items()
+    ]
+
+
+def run_benchmark(
+    config: DictConfig,
+    keys: Dict[str, List[str]],
+    concurrencies: List[int],
+    rate_per_second: Optional[float] = None,
+) -> pd.DataFrame:
+    """Sweep the concurrency of the fetchers against the local API stand-in.
+
+    Args:
+        config (DictConfig): The configuration object.
+        keys (Dict[str, List[str]]): The registry IDs (`frs`) and NAICS codes (`naics`) to look up.
+            Only the fetchers with keys are measured.
+        concurrencies (List[int]): The numbers of concurrent requests per host to measure.
+        rate_per_second (Optional[float]): The client-side rate limit per host. If None, only the
+            stand-in limits the rate.
+
+    Returns:
+        pd.DataFrame: One row per fetcher, concurrency and contacted host with the measurements.
+
+    """
+    server = ApiStubServer(config).start()
+    # Spawned workers do not inherit the thread of the stand-in
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for fetcher, fetcher_keys in keys.items():
+            for concurrency in concurrencies:
+                run_config = _benchmark_config(stub_config(config, server.base_url), concurrency, rate_per_second)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    hosts_measures = executor.submit(_measure_fetcher, run_config, fetcher, fetcher_keys).result()
+                results.extend(
+                    {"fetcher": fetcher, "concurrency": concurrency, "lookups": len(fetcher_keys), **measures}
+                    for measures in hosts_measures
+                )
+    finally:
+        server.stop()
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(
+        description="Sweep the concurrency of the FRS and NAICS fetchers against the API stand-in."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+        help="The numbers of concurrent requests per host to measure",
+    )
+    parser.add_argument(
+        "--fetchers",
+        type=str,
+        nargs="+",
+        choices=FETCHERS,
+        default=FETCHERS,
+        help="The fetchers to measure",
+    )
+    parser.add_argument(
+        "--lookups",
+        type=int,
+        default=500,
+        help="The number of registry IDs and NAICS codes to look up in each run",
+    )
+    parser.add_argument(
+        "--rate_per_second",
+        type=float,
+        default=None,
+        help="The client-side rate limit per host (unlimited by default)",
+    )
+    parser.add_argument(
+        "--overrides",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Configuration overrides, e.g., api_stub.error_rate=0.05",
+    )
+    args = parser.parse_args()
+
+    naics_codes = pd.read_csv("ancillary/naics_titles.csv", dtype=str)["naics_code"].drop_duplicates()
+    benchmark_keys = {
+        "frs": [str(FIRST_REGISTRY_ID + i) for i in range(args.lookups)],
+        "naics": naics_codes[naics_codes.str.len() == 6].head(args.lookups).tolist(),
+    }
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../conf",
+        job_name="benchmark-fetcher-throughput",
+    ):
+        cfg = hydra.compose(config_name="main", overrides=args.overrides)
+        benchmark_keys = {fetcher: benchmark_keys[fetcher] for fetcher in args.fetchers}
+        print(run_benchmark(cfg, benchmark_keys, args.concurrency, args.rate_per_second).round(3).to_string(index=False))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Benchmark of the persistent NAICS title cache.
+
+This module looks up the titles of a set of NAICS codes twice, each time in a fresh worker
+process so that the in-memory caches of `NaicsDataFetcher` start empty:
+    - cold: The persistent cache file is removed first, so every code is requested from the
+      Census API (and USAspending as fallback).
+    - warm: The codes are served from the persistent cache written by the cold run.
+
+The benchmark uses its own cache file (`api_cache_benchmark.sqlite`), so it does not touch
+the cache of the pipeline, and disables the offline NAICS title index, so every code goes
+through the persistent cache.
+
+Reported metrics:
+    - seconds: Wall time of `NaicsDataFetcher.process_naics_codes`.
+    - cache_hits: Codes served from the persistent cache.
+    - api_lookups: Codes requested over HTTP.
+
+Usage:
+    Run from the project root with the Census API key in the `.env` file:
+
+    ```
+    python -m benchmarks.naics_cache
+    ```
+
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import pandas as pd
+from omegaconf import DictConfig, OmegaConf
+
+from src.data_processing.api_cache import PersistentApiCache
+from src.data_processing.naics_api_queries import NaicsDataFetcher
+
+BENCHMARK_CACHE_FILE = "api_cache_benchmark.sqlite"
+
+
+def _measure_lookup(config: DictConfig, naics_codes: List[str]) -> Dict[str, float]:
+    """Look up the NAICS titles and return the measurements."""
+    fetcher = NaicsDataFetcher(config)
+
+    start = time.perf_counter()
+    fetcher.process_naics_codes(pd.DataFrame({"naics_code": naics_codes}), "naics_code")
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": seconds,
+        "cache_hits": fetcher.persistent_cache.hits,
+        "api_lookups": fetcher.persistent_cache.misses,
+    }
+
+
+def run_benchmark(config: DictConfig, naics_codes: List[str]) -> pd.DataFrame:
+    """Compare a cold and a warm lookup of the NAICS titles.
+
+    Args:
+        config (DictConfig): The configuration object.
+        naics_codes (List[str]): The NAICS codes to look up.
+
+    Returns:
+        pd.DataFrame: One row per run with the measurements.
+
+    """
+    OmegaConf.update(config, "naics_index.enabled", False)
+    OmegaConf.update(config, "api_cache.enabled", True)
+    OmegaConf.update(config, "api_cache.file", BENCHMARK_CACHE_FILE)
+    cache_path = PersistentApiCache(config, namespace="naics_title").path
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    results = []
+    for run in ["cold", "warm"]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            measures = executor.submit(_measure_lookup, config, naics_codes).result()
+        results.append({"run": run, "naics_codes": len(naics_codes), **measures})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(description="Compare cold and warm NAICS title lookups.")
+    parser.add_argument(
+        "--codes_file",
+        type=str,
+        default="ancillary/cd_is_to_naics.csv",
+        help="A CSV file with the NAICS codes to look up",
+    )
+    parser.add_argument(
+        "--code_column",
+        type=str,
+        default="naics_code_2022",
+        help="The column of the CSV file with the NAICS codes",
+    )
+    args = parser.parse_args()
+
+    codes = pd.read_csv(args.codes_file, dtype=str)[args.code_column].dropna().unique().tolist()
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../conf",
+        job_name="benchmark-naics-cache",
+    ):
+        cfg = hydra.compose(config_name="main")
+        print(run_benchmark(cfg, codes).round(3))
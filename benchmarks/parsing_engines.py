@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Benchmark of the parsing engines for the TRI and CDR raw files.
+
+This module compares the pandas C engine and the PyArrow engine on the raw files of a
+TRI reporting year (1A, 1B, 3A and 3C) and on the two CDR files. Every measurement runs
+in a fresh worker process, so the reported peak RSS belongs to a single parse.
+
+Reported metrics:
+    - parse_seconds: Wall time of the projected and typed parse.
+    - groupby_seconds: Wall time of a count grouped by the general information columns,
+      as a proxy of the cost of the string dtypes in the later transformations.
+    - frame_mb: Deep memory usage of the parsed DataFrame.
+    - peak_rss_mb: Peak resident set size of the worker process.
+
+Before the measurements, every file is parsed with both engines and the benchmark fails
+if the two frames hold different rows, compared regardless of their order and dtypes.
+
+Usage:
+    Run from the project root once the raw files are in `data/raw`:
+
+    ```
+    python -m benchmarks.parsing_engines --year 2022
+    ```
+
+"""
+
+import argparse
+import copy
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+from omegaconf import DictConfig, OmegaConf
+
+from src.data_processing.cdr.cleaner import CdrDataCleaner
+from src.data_processing.tri.transform.base import TriFileBaseTransformer
+
+ENGINES = ["c", "pyarrow"]
+TRI_FILE_TYPES = ["1a", "1b", "3a", "3c"]
+CDR_USES = ["industrial_use", "commercial_and_consumer_use"]
+
+
+def _peak_rss_mb() -> float:
+    """Get the peak resident set size of the current process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_tri_file(config: DictConfig, file_type: str, year: int, engine: str) -> TriFileBaseTransformer:
+    """Parse a TRI file with the given engine."""
+    OmegaConf.update(config, "tri_files.engine", engine)
+    OmegaConf.update(config, "tri_files.chunksize", None)
+    OmegaConf.update(config, "parsed_file_cache.enabled", False)
+    return TriFileBaseTransformer(f"US_{file_type}_{year}.txt", f"file_{file_type}", config)
+
+
+def _load_cdr_file(config: DictConfig, use: str, engine: str) -> pd.DataFrame:
+    """Parse a CDR file with the given engine."""
+    OmegaConf.update(config, "cdr_data.engine", engine)
+    OmegaConf.update(config, "parsed_file_cache.enabled", False)
+    use_config = config.cdr_data[use]
+    return CdrDataCleaner(config)._load_cdr_file(use_config.file, list(use_config.needed_columns.values()))
+
+
+def _measure_tri_file(config: DictConfig, file_type: str, year: int, engine: str) -> Dict[str, float]:
+    """Parse a TRI file with the given engine and return the measurements."""
+    start = time.perf_counter()
+    transformer = _load_tri_file(config, file_type, year, engine)
+    parse_seconds = time.perf_counter() - start
+
+    id_vars = transformer._get_id_vars()
+    value_vars = transformer._get_value_vars()
+    start = time.perf_counter()
+    transformer.data.groupby(id_vars, observed=True)[value_vars[0]].count()
+    groupby_seconds = time.perf_counter() - start
+
+    return {
+        "parse_seconds": parse_seconds,
+        "groupby_seconds": groupby_seconds,
+        "frame_mb": transformer.data.memory_usage(deep=True).sum() / 1024**2,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _measure_cdr_file(config: DictConfig, use: str, engine: str) -> Dict[str, float]:
+    """Parse a CDR file with the given engine and return the measurements."""
+    use_config = config.cdr_data[use]
+    start = time.perf_counter()
+    df = _load_cdr_file(config, use, engine)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df.groupby(use_config.needed_columns.casrn)[use_config.needed_columns.naics_code].count()
+    groupby_seconds = time.perf_counter() - start
+
+    return {
+        "parse_seconds": parse_seconds,
+        "groupby_seconds": groupby_seconds,
+        "frame_mb": df.memory_usage(deep=True).sum() / 1024**2,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Render the values of a parsed frame as sorted strings, with None for the missing ones."""
+    df = df.astype(object)
+    df = df.where(df.notna(), None).astype(str)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _describe_mismatch(file: str, c_frame: pd.DataFrame, pyarrow_frame: pd.DataFrame) -> Optional[str]:
+    """Describe how the frames parsed by the two engines differ, or return None if they hold the same rows."""
+    c_frame, pyarrow_frame = _normalize_frame(c_frame), _normalize_frame(pyarrow_frame)
+    if c_frame.equals(pyarrow_frame):
+        return None
+    return (
+        f"{file}: c has {c_frame.shape[0]} rows and columns {list(c_frame.columns)}, "
+        f"pyarrow has {pyarrow_frame.shape[0]} rows and columns {list(pyarrow_frame.columns)}"
+    )
+
+
+def check_engine_parity(config: DictConfig, year: int) -> List[str]:
+    """Parse the TRI files of a year and the CDR files with both engines and compare the frames.
+
+    Args:
+        config (DictConfig): The configuration object.
+        year (int): The TRI reporting year.
+
+    Returns:
+        List[str]: The description of each file whose frames differ between the engines.
+
+    """
+    config = copy.deepcopy(config)
+    mismatches = []
+    for file_type in TRI_FILE_TYPES:
+        frames = [_load_tri_file(config, file_type, year, engine).data for engine in ENGINES]
+        mismatches.append(_describe_mismatch(f"US_{file_type}_{year}.txt", *frames))
+    for use in CDR_USES:
+        frames = [_load_cdr_file(config, use, engine) for engine in ENGINES]
+        mismatches.append(_describe_mismatch(config.cdr_data[use].file, *frames))
+    return [mismatch for mismatch in mismatches if mismatch is not None]
+
+
+def run_benchmark(config: DictConfig, year: int) -> pd.DataFrame:
+    """Compare the parsing engines on the TRI files of a year and on the CDR files.
+
+    Args:
+        config (DictConfig): The configuration object.
+        year (int): The TRI reporting year.
+
+    Returns:
+        pd.DataFrame: One row per file and engine with the measurements.
+
+    """
+    results = []
+    for engine in ENGINES:
+        for file_type in TRI_FILE_TYPES:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                measures = executor.submit(_measure_tri_file, config, file_type, year, engine).result()
+            results.append({"file": f"US_{file_type}_{year}.txt", "engine": engine, **measures})
+        for use in CDR_USES:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                measures = executor.submit(_measure_cdr_file, config, use, engine).result()
+            results.append({"file": config.cdr_data[use].file, "engine": engine, **measures})
+    return pd.DataFrame(results).sort_values(["file", "engine"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(description="Compare the TRI/CDR parsing engines.")
+    parser.add_argument(
+        "--year",
+        type=int,
+        default=2022,
+        help="The year of the TRI data files to parse",
+    )
+    args = parser.parse_args()
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../conf",
+        job_name="benchmark-parsing-engines",
+    ):
+        cfg = hydra.compose(config_name="main")
+        engine_mismatches = check_engine_parity(cfg, args.year)
+        if engine_mismatches:
+            raise SystemExit("The parsing engines returned different frames:\n" + "\n".join(engine_mismatches))
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(run_benchmark(cfg, args.year).round(3))
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Benchmark of the ID resolution of the TRI records.
+
+This module compares two ways of filling the ID columns of the Record table (additive, waste
+generator and handler industry sectors, and end-of-life activity or release type) on a synthetic
+set of management records with off-site handlers:
+    - rowwise: The former path, with one `DataFrame.apply` per ID column that builds the keyword
+      arguments of each row and looks them up through `_cache_get_or_create`.
+    - merge: `TriDataLoader.resolve_record_ids`, which resolves the distinct keys of each table at
+      once and merges the IDs back into the records.
+
+Every run uses a fresh in-memory SQLite database with the chemical activities, plastic additives
+and end-of-life activities loaded, so the industry sectors are created by both methods.
+
+Reported metrics:
+    - seconds: Wall time of the ID resolution.
+    - rows_per_second: Records resolved per second.
+
+Usage:
+    Run from the project root:
+
+    ```
+    python -m benchmarks.record_ids --rows 10000 100000
+    ```
+
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from omegaconf import DictConfig
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.data_processing.data_models import Base, EndOfLifeActivity
+from src.data_processing.tri.load.load import TriDataLoader
+
+HANDLER_COLUMNS = ("off_site_naics_code", "off_site_naics_title")
+N_FACILITIES = 5000
+N_END_OF_LIFE_ACTIVITIES = 20
+MISSING_HANDLER_SHARE = 0.3
+
+
+def _create_loader(config: DictConfig) -> TriDataLoader:
+    """Create a loader on a fresh in-memory database with the reference tables loaded."""
+    engine = create_engine("sqlite://", echo=False)
+    Base.metadata.create_all(engine)
+    loader = TriDataLoader(config, sessionmaker(bind=engine)())
+    loader.load_chemical_activity()
+    loader.load_plastic_additives()
+    loader.session.add_all(
+        [EndOfLifeActivity(name=f"Management {i}", management_type="Treatment") for i in range(N_END_OF_LIFE_ACTIVITIES)]
+    )
+    loader.session.commit()
+    return loader
+
+
+def make_records(config: DictConfig, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Create synthetic management records with off-site handlers.
+
+    Args:
+        config (DictConfig): The configuration object.
+        n_rows (int): The number of records.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        pd.DataFrame: The records, with categorical identifiers as in the pipeline.
+
+    """
+    rng = np.random.default_rng(seed)
+    naics = pd.read_csv("ancillary/naics_titles.csv", dtype=str).drop_duplicates("naics_code")
+    naics = naics[naics["naics_code"].str.len() == 6].reset_index(drop=True)
+    generators = naics.iloc[rng.integers(0, len(naics), n_rows)].reset_index(drop=True)
+    handlers = naics.iloc[rng.integers(0, len(naics), n_rows)].reset_index(drop=True)
+    handlers.loc[rng.random(n_rows) < MISSING_HANDLER_SHARE] = None
+    casrns = [additive.CASRN for additive in config.plastic_additives.tri_chem_id]
+
+    records = pd.DataFrame(
+        {
+            "trifid": [f"FAC{i:05d}" for i in rng.integers(0, N_FACILITIES, n_rows)],
+            "tri_chem_id": rng.choice(casrns, n_rows),
+            "amount": rng.random(n_rows) * 1000,
+            "eol_name": [f"Management {i}" for i in rng.integers(0, N_END_OF_LIFE_ACTIVITIES, n_rows)],
+            "naics_code": generators["naics_code"],
+            "naics_title": generators["naics_title"],
+            HANDLER_COLUMNS[0]: handlers["naics_code"],
+            HANDLER_COLUMNS[1]: handlers["naics_title"],
+        }
+    )
+    return records.astype({column: "category" for column in ["trifid", "tri_chem_id", "eol_name"]})
+
+
+def _resolve_rowwise(loader: TriDataLoader, records_df: pd.DataFrame) -> pd.DataFrame:
+    """Resolve the record IDs with one apply per ID column, as the loader did before the merges."""
+    cache_additive_id: Dict = {}
+    cache_industry_sector_id: Dict = {}
+    cache_end_of_life_activity_id: Dict = {}
+
+    def get_end_of_life_activity_id(eol_name):
+        activity = loader.session.query(EndOfLifeActivity).filter_by(name=eol_name).first()
+        return activity.id if activity else None
+
+    def get_handler_industry_sector_id(off_site_naics_code, off_site_naics_title):
+        return loader._get_industry_sector_id(off_site_naics_code, off_site_naics_title)
+
+    records_df["additive_id"] = records_df["tri_chem_id"].apply(
+        lambda row: loader._cache_get_or_create(cache_additive_id, loader._get_additive_id, tri_chem_id=row),
+    )
+    records_df["waste_generator_industry_sector_id"] = records_df.apply(
+        lambda row: loader._cache_get_or_create(
+            cache_industry_sector_id,
+            loader._get_industry_sector_id,
+            naics_code=row["naics_code"],
+            naics_title=row["naics_title"],
+        ),
+        axis=1,
+    )
+    records_df["waste_handler_industry_sector_id"] = records_df.apply(
+        lambda row: (
+            loader._cache_get_or_create(
+                cache_industry_sector_id,
+                get_handler_industry_sector_id,
+                **{col: row[col] for col in HANDLER_COLUMNS},
+            )
+            if all(pd.notnull(row[col]) for col in HANDLER_COLUMNS)
+            else None
+        ),  # type: ignore [reportCallIssue]
+        axis=1,
+    )
+    records_df["end_of_life_activity_id"] = records_df.apply(
+        lambda row: loader._cache_get_or_create(
+            cache_end_of_life_activity_id,
+            get_end_of_life_activity_id,
+            eol_name=row["eol_name"],
+        ),
+        axis=1,
+    )
+    records_df["release_type_id"] = None
+    return records_df
+
+
+def _resolve_merge(loader: TriDataLoader, records_df: pd.DataFrame) -> pd.DataFrame:
+    """Resolve the record IDs with the merges of the loader."""
+    return loader.resolve_record_ids(records_df, "management", HANDLER_COLUMNS)
+
+
+METHODS: Dict[str, Callable[[TriDataLoader, pd.DataFrame], pd.DataFrame]] = {
+    "rowwise": _resolve_rowwise,
+    "merge": _resolve_merge,
+}
+
+
+def run_benchmark(config: DictConfig, row_counts: List[int]) -> pd.DataFrame:
+    """Compare the row-wise and merge-based ID resolution of the records.
+
+    Args:
+        config (DictConfig): The configuration object.
+        row_counts (List[int]): The numbers of records to resolve.
+
+    Returns:
+        pd.DataFrame: One row per number of records and method with the measurements.
+
+    """
+    results = []
+    for n_rows in row_counts:
+        records = make_records(config, n_rows)
+        for method, resolve in METHODS.items():
+            loader = _create_loader(config)
+            start = time.perf_counter()
+            resolve(loader, records.copy())
+            seconds = time.perf_counter() - start
+            loader.session.close()
+            results.append({"rows": n_rows, "method": method, "seconds": seconds, "rows_per_second": n_rows / seconds})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(description="Compare the row-wise and merge-based ID resolution of the TRI records.")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="The numbers of records to resolve",
+    )
+    args = parser.parse_args()
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../conf",
+        job_name="benchmark-record-ids",
+    ):
+        cfg = hydra.compose(config_name="main")
+        print(run_benchmark(cfg, args.rows).round(3).to_string(index=False))
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Persistent cache of API lookups.
+
+This module defines the `PersistentApiCache` class, which stores the results of API lookups
+(e.g., the title of a NAICS code) in a local SQLite database under `data/interim`, so that
+later pipeline runs do not query the APIs again for the same keys.
+
+Each entry is keyed by a namespace (the kind of lookup), the looked-up key and a version
+(e.g., the Census vintage). Entries expire after a configurable time to live (TTL). Failed
+lookups, stored as null values, are cached too, but with a shorter TTL, so that they are
+retried on a later run instead of on every run.
+
+Classes:
+    PersistentApiCache: Reads and writes API lookup results with TTL and negative caching.
+
+Example:
+    >>> cache = PersistentApiCache(config, namespace="naics_title")
+    >>> cached = cache.get_many(["325211", "326199"], version="2024-01")
+    >>> cache.set_many({"325991": "Custom compounding of purchased resins"}, version="2024-01")
+
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from omegaconf import DictConfig
+
+CURRENT_DIRECTORY = os.getcwd()
+SECONDS_PER_DAY = 86400
+
+
+class PersistentApiCache:
+    """SQLite-backed cache of API lookups with TTL and negative caching.
+
+    Attributes:
+        enabled (bool): Whether the cache is used. If False, nothing is read or stored.
+        namespace (str): The kind of lookup stored by this instance.
+        path (str): The path to the SQLite database file.
+        ttl (float): The time to live of the successful lookups, in seconds. The namespace can
+            override the `ttl_days` of the configuration (e.g., for lookups that rarely change).
+        negative_ttl (float): The time to live of the failed lookups, in seconds.
+        hits (int): The number of keys served from the cache.
+        misses (int): The number of keys not found in the cache or expired.
+
+    """
+
+    def __init__(
+        self,
+        config: DictConfig,
+        namespace: str,
+        ttl_days: Optional[float] = None,
+    ):
+        cache_config = config.get("api_cache", {})
+        self.enabled = cache_config.get("enabled", False)
+        self.namespace = namespace
+        self.path = os.path.join(
+            CURRENT_DIRECTORY,
+            "data",
+            cache_config.get("folder", "interim"),
+            cache_config.get("file", "api_cache.sqlite"),
+        )
+        self.ttl = (ttl_days or cache_config.get("ttl_days", 90)) * SECONDS_PER_DAY
+        self.negative_ttl = cache_config.get("negative_ttl_days", 7) * SECONDS_PER_DAY
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(
+        self,
+        keys: Iterable[str],
+        version: str = "",
+    ) -> Dict[str, Any]:
+        """Return the cached values of the keys that are stored and not expired.
+
+        Args:
+            keys (Iterable[str]): The keys to look up.
+            version (str): The version of the lookup (e.g., the API vintage).
+
+        Returns:
+            Dict[str, Any]: The cached value of each hit. A None value is a cached failed lookup.
+
+        """
+        keys = list(dict.fromkeys(keys))
+        if not self.enabled or not keys:
+            self.misses += len(keys)
+            return {}
+
+        now = time.time()
+        cached = {}
+        with self._connect() as connection:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                rows = connection.execute(
+                    f"""
+                    SELECT key, value, stored_at FROM api_cache
+                    WHERE namespace = ? AND version = ? AND key IN ({placeholders})
+                    """,
+                    [self.namespace, version, *batch],
+                ).fetchall()
+                for key, value, stored_at in rows:
+                    value = json.loads(value)
+                    ttl = self.ttl if value is not None else self.negative_ttl
+                    if stored_at + ttl > now:
+                        cached[key] = value
+
+        self.hits += len(cached)
+        self.misses += len(keys) - len(cached)
+        return cached
+
+    def set_many(
+        self,
+        values: Dict[str, Any],
+        version: str = "",
+    ):
+        """Store the values of the looked-up keys, replacing any previous entry.
+
+        Args:
+            values (Dict[str, Any]): The value of each key. None marks a failed lookup.
+            version (str): The version of the lookup (e.g., the API vintage).
+
+        """
+        if not self.enabled or not values:
+            return
+
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO api_cache (namespace, key, version, value, stored_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, key, version, json.dumps(value), now) for key, value in values.items()],
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the cache database, creating it if needed, and commit and close it on exit."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The timeout lets the parallel TRI transformers wait for each other's writes
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS api_cache (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        value TEXT,
+                        stored_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key, version)
+                    )
+                    """
+                )
+                yield connection
+        finally:
+            connection.close()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Asynchronous single-flight memoization.
+
+This module defines the `AsyncSingleFlightCache` class, which memoizes the results of
+asynchronous lookups (e.g., the title of a NAICS code or the NAICS code of an FRS registry
+ID) for the lifetime of the process.
+
+Concurrent callers asking for the same key share a single in-flight task, so each key is
+fetched at most once even when many coroutines request it at the same time. Completed
+results are kept in a least recently used (LRU) cache of bounded size. Failed lookups
+(exceptions) are not cached, so they are retried by the next caller.
+
+Classes:
+    AsyncSingleFlightCache: Shares one in-flight task per key and caches the results with LRU eviction.
+
+Example:
+    >>> memo = AsyncSingleFlightCache(maxsize=1024)
+    >>> title = await memo.get_or_fetch("325211", lambda: fetch_title("325211", session))
+
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class AsyncSingleFlightCache:
+    """Single-flight memoization of asynchronous lookups with LRU eviction.
+
+    Attributes:
+        maxsize (int): The maximum number of cached results.
+        hits (int): The number of lookups served from the cache or from an in-flight task.
+        misses (int): The number of lookups that started a new task.
+
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+    ):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the result for the key, awaiting the in-flight task or starting one if needed.
+
+        Args:
+            key (Hashable): The key of the lookup.
+            fetch (Callable[[], Awaitable[Any]]): A function that creates the lookup coroutine.
+
+        Returns:
+            Any: The result of the lookup.
+
+        """
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return self._results[key]
+
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(key)
+        # A task left by a previous event loop cannot be awaited from this one
+        if task is None or task.get_loop() is not loop:
+            self.misses += 1
+            task = loop.create_task(fetch())
+            task.add_done_callback(lambda done_task: self._on_done(key, done_task))
+            self._in_flight[key] = task
+        else:
+            self.hits += 1
+
+        # Shielded, so a cancelled caller does not cancel the lookup shared with the others
+        return await asyncio.shield(task)
+
+    def clear(self):
+        """Remove all the cached results."""
+        self._results.clear()
+
+    def _on_done(
+        self,
+        key: Hashable,
+        task: asyncio.Task,
+    ):
+        """Move the result of a finished task to the LRU cache."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        self._results[key] = task.result()
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
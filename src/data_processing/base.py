@@ -15,10 +15,13 @@ Classes:
 Attributes:
     config (DictConfig): The configuration object containing settings and options.
     session (Session): The SQLAlchemy session used for database interaction.
+    identity_map (DimensionIdentityMap): The IDs of the dimension tables, shared by the loaders
+        of a run when given (otherwise the loader has its own).
+    bulk_writer (BulkWriter): The writer of the rows of the fact tables.
 
 Methods:
-    __init__(self, config: DictConfig, session: Session):
-        Initializes the `BaseDataLoader` with the given configuration and session.
+    __init__(self, config: DictConfig, session: Session, identity_map: Optional[DimensionIdentityMap] = None):
+        Initializes the `BaseDataLoader` with the given configuration, session and identity map.
 
     element_exists(self, model, **kwargs) -> bool:
         Checks if an element exists in the database by querying with specified criteria.
@@ -29,6 +32,25 @@ Methods:
     create_element(self, model, **kwargs):
         Creates a new element in the database and returns it.
 
+    get_or_create_many(self, model, keys: pd.DataFrame, create: bool = True) -> Dict[Tuple, int]:
+        Retrieves the IDs of the elements with the given natural keys in bulk, inserting the
+        missing ones in a single statement. Returns a mapping from key to ID.
+
+    get_or_create_ids(self, df: pd.DataFrame, model, columns: Dict[str, str], create: bool = True) -> pd.Series:
+        Returns the ID of the element matching the key columns of each row of a DataFrame,
+        resolving the distinct keys with `get_or_create_many` and merging their IDs back.
+        Rows with a missing or empty key get no ID.
+
+    get_id_table(self, model, keys: pd.DataFrame, create: bool = True) -> pd.DataFrame:
+        Returns the keys found or created by `get_or_create_many` and their IDs as a DataFrame.
+
+    merge_ids(df: pd.DataFrame, id_table: pd.DataFrame, key_columns: List[str]) -> pd.Series:
+        Returns the ID of each row of a DataFrame by merging it with an ID table on the key
+        columns. Rows with a missing key get no ID.
+
+    allocate_ids(self, model, count: int) -> np.ndarray:
+        Allocates consecutive IDs after the largest ID of a table, for rows inserted with their IDs.
+
     _cache_get_or_create(self, cache: Dict[Tuple, int], get_or_create_func: Callable, **kwargs):
         Checks a cache for an existing ID or calls a function to create a new record if not found.
         Updates the cache with the ID or the created element.
@@ -57,14 +79,21 @@ Example:
     >>> print(f"Additive ID: {additive_id}")
 """
 
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-from typing import Callable, Dict, Tuple, Union
-
+import numpy as np
+import pandas as pd
 from omegaconf import DictConfig
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 
+from src.data_processing.bulk_writer import BulkWriter
 from src.data_processing.data_models import Additive, IndustrySector
+from src.data_processing.identity_map import DimensionIdentityMap
+
+MAX_SQL_VARIABLES = 999  # Bound parameters per statement allowed by older SQLite builds
 
 
 class BaseDataLoader:
@@ -74,9 +103,14 @@ class BaseDataLoader:
         self,
         config: DictConfig,
         session: Session,
+        identity_map: Optional[DimensionIdentityMap] = None,
     ):
         self.config = config
         self.session = session
+        if identity_map is None:
+            identity_map = DimensionIdentityMap(session.get_bind())  # type: ignore [reportArgumentType]
+        self.identity_map = identity_map
+        self.bulk_writer = BulkWriter(config, session)
 
     def element_exists(self, model, **kwargs):
         """Check if an element exists in the database."""
@@ -99,8 +133,166 @@ class BaseDataLoader:
         self.session.add(element)
         self.session.commit()
         self.session.refresh(element)
+        self.identity_map.add_element(element)
         return element
 
+    def get_or_create_many(
+        self,
+        model,
+        keys: pd.DataFrame,
+        create: bool = True,
+    ) -> Dict[Tuple, int]:
+        """Get the IDs of the elements with the given keys, creating the missing ones in bulk.
+
+        The keys are first looked up in the identity map shared by the loaders. The keys that are
+        not in it are selected with a single `IN` query and the missing ones are inserted with a
+        single `INSERT ... ON CONFLICT DO NOTHING` and selected again, so the number of round trips
+        does not grow with the number of keys (up to the SQLite limit of bound parameters per
+        statement). The selected and inserted IDs are added to the identity map.
+
+        Args:
+            model: The SQLAlchemy model of the elements.
+            keys (pd.DataFrame): The natural keys, with one column per model attribute. Rows with
+                missing values are ignored.
+            create (bool): Whether the missing elements are created. If False, they are left out.
+
+        Returns:
+            Dict[Tuple, int]: The ID of each key, as a tuple of the values in the column order.
+
+        """
+        columns = list(keys.columns)
+        keys = keys.dropna().drop_duplicates()
+        key_tuples = list(keys.astype(object).itertuples(index=False, name=None))
+        ids, missing = self.identity_map.get_many(model, columns, key_tuples)
+        if not missing:
+            return ids
+
+        # Rows inserted without the loaders (e.g., with to_sql) are not in the identity map yet
+        selected_ids = self._select_ids(model, columns, missing)
+        missing = [key for key in missing if key not in selected_ids]
+        if missing and create:
+            chunk_size = MAX_SQL_VARIABLES // len(columns)
+            for start in range(0, len(missing), chunk_size):
+                rows = [dict(zip(columns, key)) for key in missing[start : start + chunk_size]]
+                self.session.execute(insert(model).values(rows).on_conflict_do_nothing())
+            self.session.commit()
+            selected_ids.update(self._select_ids(model, columns, missing))
+        self.identity_map.add_many(model, columns, selected_ids)
+        ids.update(selected_ids)
+        return ids
+
+    def _select_ids(
+        self,
+        model,
+        columns: List[str],
+        key_tuples: List[Tuple],
+    ) -> Dict[Tuple, int]:
+        """Select the IDs of the elements with the given keys, in chunks of bound parameters."""
+        key_columns = [getattr(model, column) for column in columns]
+        chunk_size = MAX_SQL_VARIABLES // len(columns)
+        ids = {}
+        for start in range(0, len(key_tuples), chunk_size):
+            chunk = key_tuples[start : start + chunk_size]
+            if len(columns) == 1:
+                condition = key_columns[0].in_([key[0] for key in chunk])
+            else:
+                condition = tuple_(*key_columns).in_(chunk)
+            for row in self.session.execute(select(model.id, *key_columns).where(condition)):
+                ids[tuple(row[1:])] = row[0]
+        return ids
+
+    def get_or_create_ids(
+        self,
+        df: pd.DataFrame,
+        model,
+        columns: Dict[str, str],
+        create: bool = True,
+    ) -> pd.Series:
+        """Get the ID of the element matching the key columns of each row of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame with the key columns.
+            model: The SQLAlchemy model of the elements.
+            columns (Dict[str, str]): The model attribute of each key column of the DataFrame.
+            create (bool): Whether the missing elements are created (see `get_or_create_many`).
+
+        Returns:
+            pd.Series: The ID of each row, aligned with the DataFrame. Null for the rows with a
+                missing or empty key and, if not created, for the keys that are not in the database.
+
+        """
+        keys = df[list(columns)].rename(columns=columns)
+        id_table = self.get_id_table(model, keys.drop_duplicates(), create=create)
+        return self.merge_ids(keys, id_table, list(columns.values()))
+
+    def get_id_table(
+        self,
+        model,
+        keys: pd.DataFrame,
+        create: bool = True,
+    ) -> pd.DataFrame:
+        """Get the IDs of the elements with the given keys as a table, e.g., to merge it with the rows using the keys.
+
+        Args:
+            model: The SQLAlchemy model of the elements.
+            keys (pd.DataFrame): The natural keys, with one column per model attribute. Missing or
+                empty keys are ignored.
+            create (bool): Whether the missing elements are created (see `get_or_create_many`).
+
+        Returns:
+            pd.DataFrame: The key columns and the `id` of each key found or created.
+
+        """
+        keys = keys.astype(object)
+        keys = keys.where(keys.notnull() & (keys != ""))
+        ids = self.get_or_create_many(model, keys, create=create)
+        id_table = pd.DataFrame(list(ids), columns=keys.columns, dtype=object)
+        id_table["id"] = pd.Series(list(ids.values()), dtype="Int64")
+        return id_table
+
+    @staticmethod
+    def merge_ids(
+        df: pd.DataFrame,
+        id_table: pd.DataFrame,
+        key_columns: List[str],
+    ) -> pd.Series:
+        """Get the ID of each row of a DataFrame from a table of IDs, merging on the key columns.
+
+        The ID table has no missing keys, so the rows with a missing key in any column get no ID.
+
+        Args:
+            df (pd.DataFrame): The DataFrame with the key columns.
+            id_table (pd.DataFrame): The key columns and the `id` of each key (see `get_id_table`).
+            key_columns (List[str]): The key columns, named as in both tables.
+
+        Returns:
+            pd.Series: The ID of each row, aligned with the DataFrame.
+
+        """
+        merged = df[key_columns].merge(id_table[[*key_columns, "id"]], on=key_columns, how="left")
+        return pd.Series(merged["id"].to_numpy(), index=df.index, dtype="Int64")
+
+    def allocate_ids(
+        self,
+        model,
+        count: int,
+    ) -> np.ndarray:
+        """Allocate consecutive IDs for rows to be inserted into a table, after its largest ID.
+
+        The rows are inserted with their IDs, so the loader knows them without reading the table
+        back. The loaders write the tables one at a time, so no other writer allocates the same IDs.
+
+        Args:
+            model: The SQLAlchemy model of the table.
+            count (int): The number of IDs to allocate.
+
+        Returns:
+            np.ndarray: The allocated IDs.
+
+        """
+        last_id = self.session.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one()
+        return np.arange(last_id + 1, last_id + 1 + count, dtype="int64")
+
     def _cache_get_or_create(
         self,
         cache: Dict[Tuple, int],
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Bulk insert of DataFrames into the fact tables.
+
+This module defines the `BulkWriter` class, which the data loaders use to write the fact tables
+(`record`, `record_chemical_activity`, `industrial_use`, `consumer_commercial_use` and
+`industry_use_sector_naics`). Instead of `DataFrame.to_sql` with small multi-row `VALUES`
+statements, which builds a large SQL string for every chunk, the writer:
+    - Converts each batch of rows into Python values just before inserting it, so only one batch
+      is held as Python objects at a time (missing values become NULL).
+    - Streams batches of rows through the DB-API `executemany` with a single prepared `INSERT`
+      statement, in a single transaction per table.
+    - Tunes the batch size of each table while writing: it keeps doubling (or halving) the batch
+      size while the inserted rows per second improve, and reverses when they drop. The time of a
+      batch includes its conversion, and only full batches are measured, so small writes leave the
+      batch size as it is.
+
+The bounds of the batch size are set under `bulk_writer` in the configuration. The inserted rows,
+the time and the rows per second of each table are exposed by the `stats` property.
+
+Classes:
+    BulkWriter: Inserts DataFrames into tables with batched `executemany` calls.
+
+Example:
+    >>> writer = BulkWriter(config, session)
+    >>> writer.write("record", records_df)
+    >>> writer.stats["record"]
+    {'rows': 120000, 'seconds': 0.42, 'rows_per_second': 285714.3, 'batch_size': 40000}
+
+"""
+
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from omegaconf import DictConfig
+from sqlalchemy.orm import Session
+
+THROUGHPUT_TOLERANCE = 0.9  # The batch size tuning reverses when the rows per second drop below this share
+
+
+class BulkWriter:
+    """Inserts DataFrames into database tables with batched DB-API `executemany` calls.
+
+    Attributes:
+        session (Session): The session whose connection the rows are inserted with.
+        initial_batch_size (int): The batch size of the first batch of each table.
+        min_batch_size (int): The lower bound of the batch size.
+        max_batch_size (int): The upper bound of the batch size.
+
+    """
+
+    def __init__(
+        self,
+        config: DictConfig,
+        session: Session,
+    ):
+        writer_config = config.get("bulk_writer", {})
+        self.session = session
+        self.initial_batch_size = writer_config.get("initial_batch_size", 5000)
+        self.min_batch_size = writer_config.get("min_batch_size", 500)
+        self.max_batch_size = writer_config.get("max_batch_size", 200000)
+        self._tuning: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get the insert statistics of each table.
+
+        Returns:
+            Dict[str, Dict[str, float]]: For each table, the inserted rows, the time spent inserting
+                them in seconds, the rows per second and the current batch size.
+
+        """
+        return {
+            table: {
+                **table_stats,
+                "rows_per_second": table_stats["rows"] / table_stats["seconds"] if table_stats["seconds"] else 0.0,
+                "batch_size": self._tuning[table]["batch_size"],
+            }
+            for table, table_stats in self._stats.items()
+        }
+
+    def write(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+    ) -> int:
+        """Insert the rows of a DataFrame into a table.
+
+        The rows are inserted in a single transaction, committed once all of them are inserted or
+        rolled back if any batch fails.
+
+        Args:
+            table_name (str): The name of the table.
+            df (pd.DataFrame): The rows, with one column per table column.
+
+        Returns:
+            int: The number of inserted rows.
+
+        """
+        if df.empty:
+            return 0
+
+        dialect = self.session.get_bind().dialect
+        columns = ", ".join(dialect.identifier_preparer.quote(column) for column in df.columns)
+        placeholders = ", ".join(["?" if dialect.paramstyle == "qmark" else "%s"] * len(df.columns))
+        statement = f"INSERT INTO {dialect.identifier_preparer.quote(table_name)} ({columns}) VALUES ({placeholders})"
+
+        tuning = self._tuning.setdefault(
+            table_name,
+            {"batch_size": self.initial_batch_size, "is_growing": True, "rows_per_second": None},
+        )
+        table_stats = self._stats.setdefault(table_name, {"rows": 0, "seconds": 0.0})
+        cursor = self.session.connection().connection.cursor()
+        try:
+            start = 0
+            while start < len(df):
+                end = min(start + tuning["batch_size"], len(df))
+                batch_start = time.perf_counter()
+                batch = df.iloc[start:end]
+                cursor.executemany(statement, zip(*(self._to_python_values(batch[column]) for column in batch.columns)))
+                batch_seconds = time.perf_counter() - batch_start
+                # Partial batches (e.g., the last one or small writes) do not measure the current batch size
+                if end - start == tuning["batch_size"]:
+                    self._tune_batch_size(tuning, (end - start) / max(batch_seconds, 1e-9))
+                table_stats["seconds"] += batch_seconds
+                start = end
+        except Exception:
+            # The rows inserted before the failure are not committed
+            self.session.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.session.commit()
+        table_stats["rows"] += len(df)
+        return len(df)
+
+    @staticmethod
+    def _to_python_values(column: pd.Series) -> List[Any]:
+        """Convert a column into a list of values that the DB-API driver binds, with None for missing values."""
+        values = column.to_numpy(dtype=object, na_value=None).tolist()
+        if column.dtype == object:
+            # Object columns may hold NumPy scalars, which not every driver binds (e.g., sqlite3)
+            values = [value.item() if isinstance(value, np.generic) else value for value in values]
+        return values
+
+    def _tune_batch_size(
+        self,
+        tuning: Dict[str, Any],
+        rows_per_second: float,
+    ):
+        """Double or halve the batch size of a table, reversing the direction when the throughput drops."""
+        previous_rows_per_second = tuning["rows_per_second"]
+        if previous_rows_per_second is not None and rows_per_second < previous_rows_per_second * THROUGHPUT_TOLERANCE:
+            tuning["is_growing"] = not tuning["is_growing"]
+        batch_size = tuning["batch_size"] * 2 if tuning["is_growing"] else tuning["batch_size"] // 2
+        tuning["batch_size"] = min(self.max_batch_size, max(self.min_batch_size, batch_size))
+        tuning["rows_per_second"] = rows_per_second
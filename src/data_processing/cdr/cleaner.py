@@ -28,7 +28,8 @@ Key Features:
 
 Functions:
     - `__init__`: Initializes the CdrDataCleaner instance with configuration settings.
-    - `_load_cdr_file`: Loads a CDR data file and raises an error if the file is not found.
+    - `_load_cdr_file`: Loads the needed columns of a CDR data file with the configured engine,
+      reusing the parsed frame cached under data/interim, and raises an error if the file is not found.
     - `_clean_naics_code`: Cleans and separates the numeric NAICS code from its title.
     - `_clean_percentage`: Converts the percentage column to numeric and optionally drops NaN rows.
     - `_replace_values_with_null`: Replaces specified values in the DataFrame with null.
@@ -63,12 +64,14 @@ Example Usage:
 
 
 import os
-from typing import List, Union
+from typing import List, Optional, Union
 
 import numpy as np
 import pandas as pd
 from omegaconf import DictConfig
 
+from src.data_processing.parsed_file_cache import ParsedFileCache
+
 CURRENT_DIRECTORY = os.getcwd()
 
 
@@ -92,13 +95,22 @@ class CdrDataCleaner:
         self.cdr_config = config.cdr_data
         self.is_drop_nan_percentage = is_drop_nan_percentage
         self.valid_casrn = [chem.CASRN for chem in self.config.plastic_additives.tri_chem_id]
+        self.parsed_file_cache = ParsedFileCache(config)
 
     def _load_cdr_file(
         self,
         file_name: str,
+        usecols: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         """Load the CDR data file.
 
+        The file is parsed with the engine set in `cdr_data.engine`. The "pyarrow" engine
+        parses with multiple threads and keeps Arrow-backed string and float columns.
+
+        Args:
+            file_name (str): The name of the CDR data file.
+            usecols (Optional[List[str]]): The columns to parse. If None, all columns are parsed.
+
         Raises:
             FileNotFoundError: If the file does not exist.
         """
@@ -112,10 +124,18 @@ class CdrDataCleaner:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"The file '{file_path}' does not exist." " Please check the file path.")
 
-        return pd.read_csv(  # type: ignore [reportCallIssue]
-            file_path,
-            sep=",",
-            quotechar='"',
+        engine = self.cdr_config.get("engine", "c")
+        engine_options = {"engine": "pyarrow", "dtype_backend": "pyarrow"} if engine == "pyarrow" else {}
+        return self.parsed_file_cache.get_or_parse(
+            source_files=[file_path],
+            config_slice={"usecols": usecols, "engine": engine},
+            parse=lambda: pd.read_csv(  # type: ignore [reportCallIssue]
+                file_path,
+                sep=",",
+                quotechar='"',
+                usecols=usecols,
+                **engine_options,
+            ),
         )
 
     def _clean_naics_code(self, naics_code: str) -> Union[tuple[str, str], tuple[None, None]]:
@@ -141,7 +161,9 @@ class CdrDataCleaner:
         column: str,
     ) -> pd.DataFrame:
         """Clean the percentage column by converting to numeric values and optionally dropping rows with NaN."""
-        df[column] = pd.to_numeric(df[column], errors="coerce")  # type: ignore [reportArgumentType]
+        numeric = pd.to_numeric(df[column], errors="coerce")  # type: ignore [reportArgumentType]
+        # Arrow-backed columns keep the coerced values as NaN, which is not null in Arrow
+        df[column] = numeric.mask((numeric != numeric).fillna(False))
         return df.dropna(subset=[column]) if self.is_drop_nan_percentage else df
 
     def _replace_values_with_null(
@@ -212,7 +234,7 @@ class CdrDataCleaner:
             pd.DataFrame: The cleaned DataFrame.
         """
         usecols = list(use_config.needed_columns.values())
-        df = self._load_cdr_file(use_config.file)
+        df = self._load_cdr_file(use_config.file, usecols)
         df = df[usecols]
 
         self._replace_values_with_null(df, columns_to_clean, ["Not Known or Reasonably Ascertainable", "CBI", "NKRA"])
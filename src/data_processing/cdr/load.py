@@ -10,38 +10,21 @@ specialized methods for loading consumer and industrial use data.
 
 Classes:
     CdrDataLoader: A class that provides methods to load cleaned CDR data into
-        corresponding database tables. This class caches certain data to optimize
-        database lookups and inserts.
+        corresponding database tables. The IDs of the related records are resolved
+        in bulk, with one lookup (and one insert of the missing records) per table.
 
 Attributes:
     config (DictConfig): Configuration object containing application settings.
     session (Session): SQLAlchemy session for interacting with the database.
-    cache_* (Dict[Tuple, int]): Caches for storing the IDs of various data models
-        to reduce repeated database queries.
 
 Methods:
-    __init__(self, config: DictConfig, session: Session):
+    __init__(self, config: DictConfig, session: Session, identity_map: Optional[DimensionIdentityMap] = None):
         Initializes the `CdrDataLoader` instance with the given configuration and session.
 
     _load_use(self, df: pd.DataFrame) -> pd.DataFrame:
         Loads general use data and assigns IDs for related records such as additives
         and industry sectors.
 
-    _get_consumer_commercial_product_category(self, consumer_commercial_product_category: Union[str, None]) -> Union[int, None]:
-        Fetches or creates a `ConsumerCommercialProductCategory` record and returns its ID.
-
-    _get_consumer_commercial_function_category(self, consumer_commercial_function_category: Union[str, None]) -> Union[int, None]:
-        Fetches or creates a `ConsumerCommercialFunctionCategory` record and returns its ID.
-
-    _get_industry_function_category(self, industry_function_category: Union[str, None]) -> Union[int, None]:
-        Fetches or creates an `IndustryFunctionCategory` record and returns its ID.
-
-    _get_industry_use_sector_id(self, industry_sector_code: Union[str, None], industry_sector_name: Union[str, None]) -> Union[int, None]:
-        Fetches or creates an `IndustryUseSector` record and returns its ID.
-
-    _get_industrial_type_of_process_or_use(self, industrial_type_of_process_or_use: Union[str, None]) -> Union[int, None]:
-        Fetches or creates an `IndustrialTypeOfProcessOrUse` record and returns its ID.
-
     load_commercial_and_consumer_use(self, df: pd.DataFrame):
         Loads a DataFrame containing consumer and commercial use data into the database.
 
@@ -54,7 +37,7 @@ Methods:
 Usage:
     The `CdrDataLoader` class is used for transforming and loading CDR data from
     DataFrames into the database. It ensures that related records are fetched or
-    created as needed, optimizing the insertion process with caching mechanisms.
+    created as needed, resolving their IDs in bulk with `get_or_create_ids`.
 
 Example:
     >>> from sqlalchemy.orm import sessionmaker
@@ -66,8 +49,7 @@ Example:
     >>> loader.load_industrial_use(df_industrial)
 """
 
-
-from typing import Dict, Tuple, Union
+from typing import Optional
 
 import pandas as pd
 from omegaconf import DictConfig
@@ -75,15 +57,18 @@ from sqlalchemy.orm import Session
 
 from src.data_processing.base import BaseDataLoader
 from src.data_processing.data_models import (
+    Additive,
     ConsumerCommercialFunctionCategory,
     ConsumerCommercialProductCategory,
     ConsumerCommercialUse,
     IndustrialTypeOfProcessOrUse,
     IndustrialUse,
     IndustryFunctionCategory,
+    IndustrySector,
     IndustryUseSector,
     IndustryUseSectorNaics,
 )
+from src.data_processing.identity_map import DimensionIdentityMap
 
 
 class CdrDataLoader(BaseDataLoader):
@@ -99,114 +84,27 @@ class CdrDataLoader(BaseDataLoader):
         self,
         config: DictConfig,
         session: Session,
+        identity_map: Optional[DimensionIdentityMap] = None,
     ):
-        super().__init__(config, session)
-        self.cache_industry_sector_id: Dict[Tuple, int] = {}
-        self.cache_industry_use_sector_id: Dict[Tuple, int] = {}
-        self.cache_chemical_activity_id: Dict[Tuple, int] = {}
-        self.cache_industrial_type_of_process_or_use_id: Dict[Tuple, int] = {}
-        self.cache_industry_function_category_id: Dict[Tuple, int] = {}
-        self.cache_consumer_commercial_product_category_id: Dict[Tuple, int] = {}
-        self.cache_consumer_commercial_function_category_id: Dict[Tuple, int] = {}
-        self.cache_additive_id: Dict[Tuple, int] = {}
+        super().__init__(config, session, identity_map)
 
     def _load_use(
         self,
         df: pd.DataFrame,
     ) -> pd.DataFrame:
-        df["additive_id"] = df["casrn"].apply(
-            lambda row: self._cache_get_or_create(
-                self.cache_additive_id,
-                self._get_additive_id,
-                tri_chem_id=row,
-            ),
+        df["additive_id"] = self.get_or_create_ids(
+            df,
+            Additive,
+            {"casrn": "tri_chemical_id"},
+            create=False,
         )
-        df["industry_sector_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_industry_sector_id,
-                        self._get_industry_sector_id,
-                        **{
-                            "naics_code": row["naics_code"],
-                            "naics_title": row["naics_title"],
-                        },
-                    )
-                )
-                if pd.notnull(row["naics_code"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["industry_sector_id"] = self.get_or_create_ids(
+            df,
+            IndustrySector,
+            {"naics_code": "naics_code", "naics_title": "naics_title"},
         )
         return df
 
-    def _get_consumer_commercial_product_category(
-        self,
-        consumer_commercial_product_category: Union[str, None],
-    ):
-        """Fetch a ConsumerCommercialProductCategory and return its id."""
-        if consumer_commercial_product_category:
-            product_category = self.get_or_create(
-                ConsumerCommercialProductCategory,
-                name=consumer_commercial_product_category,
-            )
-            return product_category.id
-        return None
-
-    def _get_consumer_commercial_function_category(
-        self,
-        consumer_commercial_function_category: Union[str, None],
-    ):
-        """Fetch a ConsumerCommercialFunctionCategory and return its id."""
-        if consumer_commercial_function_category:
-            function_category = self.get_or_create(
-                ConsumerCommercialFunctionCategory,
-                name=consumer_commercial_function_category,
-            )
-            return function_category.id
-        return None
-
-    def _get_industry_function_category(
-        self,
-        industry_function_category: Union[str, None],
-    ):
-        """Fetch an IndustryFunctionCategory and return its id."""
-        if industry_function_category:
-            function_category = self.get_or_create(
-                IndustryFunctionCategory,
-                name=industry_function_category,
-            )
-            return function_category.id
-        return None
-
-    def _get_industry_use_sector_id(
-        self,
-        industry_sector_code: Union[str, None],
-        industry_sector_name: Union[str, None],
-    ):
-        """Fetch an IndustryUseSector and return its id."""
-        if industry_sector_code and industry_sector_name:
-            sector = self.get_or_create(
-                IndustryUseSector,
-                code=industry_sector_code,
-                name=industry_sector_name,
-            )
-            return sector.id
-        return None
-
-    def _get_industrial_type_of_process_or_use(
-        self,
-        industrial_type_of_process_or_use: Union[str, None],
-    ):
-        """Fetch an IndustrialTypeOfProcessOrUse and return its id."""
-        if industrial_type_of_process_or_use:
-            process_or_use = self.get_or_create(
-                IndustrialTypeOfProcessOrUse,
-                name=industrial_type_of_process_or_use,
-            )
-            return process_or_use.id
-        return None
-
     def load_commercial_and_consumer_use(
         self,
         df: pd.DataFrame,
@@ -217,33 +115,15 @@ class CdrDataLoader(BaseDataLoader):
             df (pd.DataFrame): DataFrame containing commercial and consumer use data.
         """
         df = self._load_use(df)
-        df["product_category_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_consumer_commercial_product_category_id,
-                        self._get_consumer_commercial_product_category,
-                        consumer_commercial_product_category=row["consumer_commercial_product_category"],
-                    )
-                )
-                if pd.notnull(row["consumer_commercial_product_category"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["product_category_id"] = self.get_or_create_ids(
+            df,
+            ConsumerCommercialProductCategory,
+            {"consumer_commercial_product_category": "name"},
         )
-        df["function_category_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_consumer_commercial_function_category_id,
-                        self._get_consumer_commercial_function_category,
-                        consumer_commercial_function_category=row["consumer_commercial_function_category"],
-                    )  # type: ignore [reportCallIssue]
-                )
-                if pd.notnull(row["consumer_commercial_function_category"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["function_category_id"] = self.get_or_create_ids(
+            df,
+            ConsumerCommercialFunctionCategory,
+            {"consumer_commercial_function_category": "name"},
         )
 
         insert_df = df[
@@ -256,15 +136,7 @@ class CdrDataLoader(BaseDataLoader):
                 "industry_sector_id",
             ]
         ]
-        insert_df.to_sql(
-            name=ConsumerCommercialUse.__tablename__,
-            con=self.session.get_bind(),
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=200,
-        )
-        self.session.commit()
+        self.bulk_writer.write(ConsumerCommercialUse.__tablename__, insert_df)
 
     def load_industrial_use(
         self,
@@ -276,48 +148,20 @@ class CdrDataLoader(BaseDataLoader):
           df (pd.DataFrame): DataFrame containing industrial use data.
         """
         df = self._load_use(df)
-        df["industrial_type_of_process_or_use_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_industrial_type_of_process_or_use_id,
-                        self._get_industrial_type_of_process_or_use,
-                        industrial_type_of_process_or_use=row["industrial_type_of_process_or_use"],
-                    )
-                )
-                if pd.notnull(row["industrial_type_of_process_or_use"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["industrial_type_of_process_or_use_id"] = self.get_or_create_ids(
+            df,
+            IndustrialTypeOfProcessOrUse,
+            {"industrial_type_of_process_or_use": "name"},
         )
-        df["industry_function_category_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_industry_function_category_id,
-                        self._get_industry_function_category,
-                        industry_function_category=row["industry_function_category"],
-                    )
-                )
-                if pd.notnull(row["industry_function_category"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["industry_function_category_id"] = self.get_or_create_ids(
+            df,
+            IndustryFunctionCategory,
+            {"industry_function_category": "name"},
         )
-        df["industry_use_sector_id"] = df.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_industry_use_sector_id,
-                        self._get_industry_use_sector_id,
-                        industry_sector_code=row["industry_sector_code"],
-                        industry_sector_name=row["industry_sector_name"],
-                    )
-                )
-                if pd.notnull(row["industry_sector_code"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df["industry_use_sector_id"] = self.get_or_create_ids(
+            df,
+            IndustryUseSector,
+            {"industry_sector_code": "code", "industry_sector_name": "name"},
         )
         insert_df = df[
             [
@@ -329,14 +173,7 @@ class CdrDataLoader(BaseDataLoader):
                 "industry_use_sector_id",
             ]
         ]
-        insert_df.to_sql(
-            name=IndustrialUse.__tablename__,
-            con=self.session.get_bind(),
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=200,
-        )
+        self.bulk_writer.write(IndustrialUse.__tablename__, insert_df)
 
         self._load_industry_use_sector_naics(df)
 
@@ -356,29 +193,10 @@ class CdrDataLoader(BaseDataLoader):
         ]
         df_record = df_record.dropna(subset=["industry_use_sector_id"])  # type: ignore [reportCallIssue]
         df_record = df_record.drop_duplicates()
-        df_record["industry_sector_id"] = df_record.apply(
-            lambda row: (
-                (
-                    self._cache_get_or_create(
-                        self.cache_industry_sector_id,
-                        self._get_industry_sector_id,
-                        **{
-                            "naics_code": row["industrial_use_naics_code"],
-                            "naics_title": row["industrial_use_naics_title"],
-                        },
-                    )
-                )
-                if pd.notnull(row["industrial_use_naics_code"])
-                else None
-            ),  # type: ignore [reportCallIssue]
-            axis=1,
+        df_record["industry_sector_id"] = self.get_or_create_ids(
+            df_record,
+            IndustrySector,
+            {"industrial_use_naics_code": "naics_code", "industrial_use_naics_title": "naics_title"},
         )
         insert_df = df_record[["industry_sector_id", "industry_use_sector_id"]]
-        insert_df.to_sql(
-            name=IndustryUseSectorNaics.__tablename__,
-            con=self.session.get_bind(),
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=200,
-        )
+        self.bulk_writer.write(IndustryUseSectorNaics.__tablename__, insert_df)
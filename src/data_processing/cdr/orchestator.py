@@ -41,11 +41,14 @@ Example:
 """
 
 
+from typing import Optional
+
 from omegaconf import DictConfig
 
 from src.data_processing.cdr.cleaner import CdrDataCleaner
 from src.data_processing.cdr.load import CdrDataLoader
 from src.data_processing.create_sqlite_db import create_database
+from src.data_processing.identity_map import DimensionIdentityMap
 
 
 class CdrDataOrchestator:
@@ -55,12 +58,14 @@ class CdrDataOrchestator:
         self,
         config: DictConfig,
         is_drop_nan_percentage: bool = False,
+        identity_map: Optional[DimensionIdentityMap] = None,
     ):
         self.config = config
         self.session = create_database()
         self.cdr_db_loader = CdrDataLoader(
             config=self.config,
             session=self.session,
+            identity_map=identity_map,
         )
         self.cdr_data_cleaner = CdrDataCleaner(
             config=self.config,
@@ -19,9 +19,18 @@ Functions:
     _fetch_single_frs_data(frs_registry_id: str, session: aiohttp.ClientSession) -> Dict[str, Optional[str]]:
         Asynchronously fetches data for a single FRS `registry_id`, returning the `naics_code`
         if the query is successful. If unsuccessful, the function returns `None` for the `naics_code`.
+        The result is memoized, so each `registry_id` is requested at most once per process.
+    stream_naics_codes(registry_ids: List[str]) -> AsyncIterator[Dict[str, Optional[str]]]:
+        Reads the `registry_id`s from the persistent cache and asynchronously fetches data for
+        the remaining IDs by creating tasks for each one. Yields a dictionary with `registry_id`
+        and `naics_code` as soon as each one is known, so the NAICS codes can be processed while
+        the other requests are in flight.
     _fetch_all_frs_data(registry_ids: List[str]) -> List[Dict[str, Optional[str]]]:
-        Asynchronously fetches data for a list of unique `registry_id`s by creating tasks for
-        each ID. Returns a list of dictionaries containing `registry_id` and `naics_code` values.
+        Collects the stream of `stream_naics_codes` in the order of the `registry_id`s. Returns a
+        list of dictionaries containing `registry_id` and `naics_code` values.
+    prefetch_registry_ids(registry_ids: List[str], refresh: bool = False) -> int:
+        Fetches the NAICS codes of the `registry_id`s missing from the persistent cache (or of
+        all of them when refreshing) and stores them, returning the number of fetched IDs.
     process_registry_ids(df: pd.DataFrame, id_column: str) -> pd.DataFrame:
         Processes a DataFrame containing `registry_id`s, extracts unique IDs, and fetches
         corresponding `naics_code` data using the FRS API. Constructs and returns a new DataFrame
@@ -50,39 +59,65 @@ Example Usage:
 Notes:
     - Requires `aiohttp` for asynchronous HTTP requests and `omegaconf` for configuration handling.
     - Asynchronous requests allow concurrent API queries, enhancing performance, especially with large datasets.
+      They run on the event loop and session of `SharedHttpClient`, shared with `NaicsDataFetcher` for the
+      whole pipeline run, so connections are kept alive across calls.
     - Manages duplicate `registry_id`s by querying each unique ID only once, even if duplicates exist in the input DataFrame.
     - Configurable endpoints and query parameters through `DictConfig`, allowing flexibility for API changes.
+    - The NAICS codes are stored in a persistent cache (`api_cache` in the configuration) keyed by
+      `registry_id`, since they barely change between reporting years. The cache can be filled in bulk
+      with `src/data_processing/frs_prefetch.py`, and with `frs_api.cache_only` the API is never queried.
 
 """
 
 
 import asyncio
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 import aiohttp
 import pandas as pd
 from omegaconf import DictConfig
 
+from src.data_processing.api_cache import PersistentApiCache
+from src.data_processing.async_memo import AsyncSingleFlightCache
+from src.data_processing.http_client import SharedHttpClient
+
 
 class FrsDataFetcher:
     """Class for fetching NAICS codes associated with FRS registry IDs from the EPA's FRS API."""
 
+    _registry_memo = AsyncSingleFlightCache(maxsize=4096)  # Registry ID -> NAICS code, shared by all instances
+
     def __init__(
         self,
         cfg: DictConfig,
-        max_concurrent_requests: int = 10,
     ):
         """Initialize the FrsDataFetcher with configuration.
 
+        The concurrency and rate of the requests are set by `request_scheduler` in the configuration,
+        which helps to avoid problems with the server side.
+
         Args:
             cfg (DictConfig): The configuration object.
-            max_concurrent_requests (int): The maximum number of concurrent requests to make.
-                This helps to avoid problems with the server side.
 
         """
         self.cfg = cfg
         self.base_url = cfg.frs_api.base_url
-        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.cache_only = cfg.frs_api.get("cache_only", False)
+        self.persistent_cache = PersistentApiCache(
+            cfg,
+            namespace="frs_naics_code",
+            ttl_days=cfg.frs_api.get("cache_ttl_days"),
+        )
+
+    @property
+    def http_client(self) -> SharedHttpClient:
+        """Get the HTTP client of the current process, shared with the other fetchers.
+
+        Returns:
+            SharedHttpClient: The client that owns the event loop and the session.
+
+        """
+        return SharedHttpClient.instance(self.cfg)
 
     async def _fetch_single_frs_data(
         self,
@@ -91,6 +126,9 @@ class FrsDataFetcher:
     ) -> Dict[str, Optional[str]]:
         """Fetch data for a single registry ID asynchronously using a shared session.
 
+        The NAICS code is memoized for the process. Concurrent calls for the same registry ID
+        share a single request.
+
         Args:
             frs_registry_id (str): The FRS registry ID to fetch data for.
             session (aiohttp.ClientSession): The shared aiohttp session.
@@ -98,6 +136,27 @@ class FrsDataFetcher:
         Returns:
             Dict[str, Optional[str]]: A dictionary with `registry_id` and `naics_code`.
 
+        """
+        naics_code = await self._registry_memo.get_or_fetch(
+            frs_registry_id,
+            lambda: self._request_frs_naics_code(frs_registry_id, session),
+        )
+        return {"registry_id": frs_registry_id, "naics_code": naics_code}
+
+    async def _request_frs_naics_code(
+        self,
+        frs_registry_id: str,
+        session: aiohttp.ClientSession,
+    ) -> Optional[str]:
+        """Request the primary NAICS code of a registry ID from the FRS API.
+
+        Args:
+            frs_registry_id (str): The FRS registry ID to fetch data for.
+            session (aiohttp.ClientSession): The shared aiohttp session.
+
+        Returns:
+            Optional[str]: The NAICS code, or None if the query fails after the retries.
+
         """
         endpoint = (
             f"{self.cfg.frs_api.endpoints.frs_facility_site}/{self.cfg.frs_api.query_parameters.registry_id_equals}".format(
@@ -108,19 +167,73 @@ class FrsDataFetcher:
         primary_filter = f"{self.cfg.frs_api.query_parameters.primary_indicator_equals}/{self.cfg.frs_api.query_parameters.first_last}/{self.cfg.frs_api.query_parameters.format}"
         full_url = f"{self.base_url}/{endpoint}/{join_endpoint}/{primary_filter}"
 
-        # Make the request using the shared session
-        async with self.semaphore:
-            async with session.get(full_url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    naics_code = data[0].get("naics_code") if data else None
-                    return {"registry_id": frs_registry_id, "naics_code": naics_code}
-                else:
-                    print(f"Failed to fetch data for {frs_registry_id}: {response.status}")
-                    return {"registry_id": frs_registry_id, "naics_code": None}
+        # Make the request using the shared session. Throttled and failed requests are retried by the scheduler
+        status, data = await self.http_client.scheduler.get_json(session, full_url)
+        if status == 200:
+            return data[0].get("naics_code") if data else None
+        else:
+            print(f"Failed to fetch data for {frs_registry_id}: {status}")
+            return None
+
+    async def _request_all_frs_data(self, registry_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Request the NAICS codes of the registry IDs from the FRS API using the shared session.
+
+        Args:
+            registry_ids (List[str]): A list of unique FRS registry IDs to fetch data for.
+
+        Returns:
+            Dict[str, Optional[str]]: The NAICS code of each registry ID.
+        """
+        session = self.http_client.session
+        tasks = [self._fetch_single_frs_data(reg_id, session) for reg_id in registry_ids]
+        fetched_data = await asyncio.gather(*tasks)
+        return {item["registry_id"]: item["naics_code"] for item in fetched_data}  # type: ignore [reportReturnType]
+
+    async def stream_naics_codes(self, registry_ids: List[str]) -> AsyncIterator[Dict[str, Optional[str]]]:
+        """Yield the NAICS code of each registry ID as soon as it is known.
+
+        The NAICS codes stored in the persistent cache are yielded first, and only the remaining
+        registry IDs are requested, yielding them in the order in which the responses arrive. Their
+        results, including the failed lookups, are then stored in the cache. When reading only from
+        the cache, the remaining IDs are yielded without a NAICS code.
+
+        Args:
+            registry_ids (List[str]): A list of unique FRS registry IDs to fetch data for.
+
+        Yields:
+            Dict[str, Optional[str]]: A dictionary with `registry_id` and `naics_code`.
+        """
+        # The cache is keyed by the text of the registry IDs, which may be given as numbers
+        naics_codes = self.persistent_cache.get_many(map(str, registry_ids))
+        missing_ids = []
+        for reg_id in registry_ids:
+            if str(reg_id) in naics_codes:
+                yield {"registry_id": reg_id, "naics_code": naics_codes[str(reg_id)]}
+            else:
+                missing_ids.append(reg_id)
+
+        if missing_ids and self.cache_only:
+            print(
+                f"{len(missing_ids)} FRS registry IDs are not in the cache and are left without a NAICS code. "
+                "Run src/data_processing/frs_prefetch.py to fetch them."
+            )
+            for reg_id in missing_ids:
+                yield {"registry_id": reg_id, "naics_code": None}
+        elif missing_ids:
+            session = self.http_client.session
+            fetched_codes = {}
+            try:
+                for next_response in asyncio.as_completed(
+                    [self._fetch_single_frs_data(reg_id, session) for reg_id in missing_ids]
+                ):
+                    item = await next_response
+                    fetched_codes[str(item["registry_id"])] = item["naics_code"]
+                    yield item
+            finally:
+                self.persistent_cache.set_many(fetched_codes)
 
     async def _fetch_all_frs_data(self, registry_ids: List[str]) -> List[Dict[str, Optional[str]]]:
-        """Fetch data for multiple registry IDs asynchronously using a shared session.
+        """Fetch data for multiple registry IDs asynchronously using the shared session.
 
         Args:
             registry_ids (List[str]): A list of unique FRS registry IDs to fetch data for.
@@ -128,9 +241,31 @@ class FrsDataFetcher:
         Returns:
             List[Dict[str, Optional[str]]]: A list of dictionaries with `registry_id` and `naics_code`.
         """
-        async with aiohttp.ClientSession() as session:
-            tasks = [self._fetch_single_frs_data(reg_id, session) for reg_id in registry_ids]
-            return await asyncio.gather(*tasks)
+        naics_codes = {str(item["registry_id"]): item["naics_code"] async for item in self.stream_naics_codes(registry_ids)}
+        return [{"registry_id": reg_id, "naics_code": naics_codes[str(reg_id)]} for reg_id in registry_ids]
+
+    def prefetch_registry_ids(
+        self,
+        registry_ids: List[str],
+        refresh: bool = False,
+    ) -> int:
+        """Fetch the NAICS codes of the registry IDs and store them in the persistent cache.
+
+        Args:
+            registry_ids (List[str]): The FRS registry IDs to prefetch.
+            refresh (bool): Whether to request again the registry IDs that are already cached.
+
+        Returns:
+            int: The number of registry IDs requested from the FRS API.
+
+        """
+        registry_ids = list(dict.fromkeys(map(str, registry_ids)))
+        if not refresh:
+            cached = self.persistent_cache.get_many(registry_ids)
+            registry_ids = [reg_id for reg_id in registry_ids if reg_id not in cached]
+        if registry_ids:
+            self.persistent_cache.set_many(self.http_client.run(self._request_all_frs_data(registry_ids)))
+        return len(registry_ids)
 
     def process_registry_ids(self, df: pd.DataFrame, id_column: str) -> pd.DataFrame:
         """Process registry IDs in a DataFrame and return a DataFrame with fetched data.
@@ -146,7 +281,7 @@ class FrsDataFetcher:
         unique_registry_ids = df[id_column].unique().tolist()
 
         # Run the asynchronous fetch with a shared session
-        data = asyncio.run(self._fetch_all_frs_data(unique_registry_ids))
+        data = self.http_client.run(self._fetch_all_frs_data(unique_registry_ids))
 
         # Convert the result to a DataFrame
         result_df = pd.DataFrame(data)
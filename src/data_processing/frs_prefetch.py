@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Prefetch of the FRS registry ID to NAICS code cache.
+
+This module fills the persistent cache of `FrsDataFetcher` in bulk, so that production runs of the
+pipeline can read the NAICS codes of the off-site facilities only from the cache (`frs_api.cache_only`
+in the configuration). The registry IDs are taken from:
+    - The off-site FRS IDs of the TRI 3A files of the given reporting years, after filtering the
+      plastic additives (as done by `TriFile3aTransformer`).
+    - A CSV file with a column of registry IDs.
+
+Only the IDs missing from the cache (or expired) are requested, unless `--refresh` is given.
+
+Functions:
+    collect_off_site_registry_ids(config: DictConfig, years: List[int]) -> List[str]:
+        Reads the off-site FRS registry IDs of the TRI 3A files of the given years.
+    read_registry_ids(file_path: str, id_column: str) -> List[str]:
+        Reads the registry IDs of a column of a CSV file.
+
+Usage:
+    ```
+    python -m src.data_processing.frs_prefetch --years 2020 2021 2022
+    python -m src.data_processing.frs_prefetch --ids_file registry_ids.csv --id_column registry_id
+    ```
+
+"""
+
+import argparse
+from typing import List
+
+import pandas as pd
+from omegaconf import DictConfig
+
+from src.data_processing.frs_api_queries import FrsDataFetcher
+from src.data_processing.tri.transform.file_3a import TriFile3aTransformer
+
+
+def _normalize_registry_ids(registry_ids: pd.Series) -> List[str]:
+    """Convert the registry IDs to the text used by the pipeline, dropping missing values."""
+    registry_ids = pd.to_numeric(registry_ids, errors="coerce").dropna()
+    return registry_ids.astype("int64").astype(str).unique().tolist()
+
+
+def collect_off_site_registry_ids(
+    config: DictConfig,
+    years: List[int],
+) -> List[str]:
+    """Read the off-site FRS registry IDs of the TRI 3A files.
+
+    Args:
+        config (DictConfig): The configuration object.
+        years (List[int]): The reporting years of the TRI 3A files.
+
+    Returns:
+        List[str]: The unique off-site FRS registry IDs.
+
+    """
+    off_site_frs_id_column = config.tri_files.file_3a.off_site_frs_id_column
+    registry_ids = []
+    for year in years:
+        transformer = TriFile3aTransformer(f"US_3a_{year}.txt", config)
+        transformer.data = transformer.select_columns(transformer._get_needed_columns())
+        transformer.data = transformer.filter_desired_chemicals()
+        registry_ids.extend(_normalize_registry_ids(transformer.data[off_site_frs_id_column]))
+    return list(dict.fromkeys(registry_ids))
+
+
+def read_registry_ids(
+    file_path: str,
+    id_column: str,
+) -> List[str]:
+    """Read the registry IDs of a CSV file.
+
+    Args:
+        file_path (str): The path to the CSV file.
+        id_column (str): The column with the registry IDs.
+
+    Returns:
+        List[str]: The unique registry IDs.
+
+    """
+    return _normalize_registry_ids(pd.read_csv(file_path, usecols=[id_column], dtype=str)[id_column])
+
+
+if __name__ == "__main__":
+    import hydra
+
+    parser = argparse.ArgumentParser(description="Fill the FRS registry ID to NAICS code cache.")
+    parser.add_argument(
+        "--years",
+        type=int,
+        nargs="*",
+        default=[],
+        help="The years of the TRI 3A files whose off-site FRS IDs are prefetched",
+    )
+    parser.add_argument(
+        "--ids_file",
+        type=str,
+        default=None,
+        help="A CSV file with the registry IDs to prefetch",
+    )
+    parser.add_argument(
+        "--id_column",
+        type=str,
+        default="registry_id",
+        help="The column of the CSV file with the registry IDs",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Whether to request again the registry IDs that are already cached",
+    )
+    args = parser.parse_args()
+
+    with hydra.initialize(
+        version_base=None,
+        config_path="../../conf",
+        job_name="frs-prefetch",
+    ):
+        cfg = hydra.compose(config_name="main")
+        ids = collect_off_site_registry_ids(cfg, args.years)
+        if args.ids_file:
+            ids.extend(read_registry_ids(args.ids_file, args.id_column))
+        ids = list(dict.fromkeys(ids))
+
+        fetcher = FrsDataFetcher(cfg)
+        requested = fetcher.prefetch_registry_ids(ids, refresh=args.refresh)
+        print(f"{len(ids)} FRS registry IDs, {requested} requested from the FRS API and cached.")
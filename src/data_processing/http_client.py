@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Shared HTTP client for the external API fetchers.
+
+This module defines the `SharedHttpClient` class, which owns the event loop, the `aiohttp`
+session and its connector for the whole pipeline run. `FrsDataFetcher` and `NaicsDataFetcher`
+run their requests through it instead of calling `asyncio.run` and opening a new session on
+every lookup, so connections are kept alive and reused across files (e.g., the facility NAICS
+lookups of the 1A, 3A and 3C files) and DNS answers are cached.
+
+There is one client per process. Worker processes (e.g., the parallel TRI transformers) create
+their own client, with its own connection pool and request scheduler, since an event loop and its
+connections cannot be shared across processes. Their configuration is given by `worker_config`,
+which divides the connection and per-host request limits among the workers, so together they stay
+within the configured limits.
+
+The connector limits and timeouts are set under `http_client` in the configuration. The requests
+go through the client's `RequestScheduler`, which adapts the concurrency and rate of each host and
+retries throttled requests. Request, connection and DNS cache statistics are collected with
+`aiohttp` tracing and exposed by the `stats` property, together with the statistics of each host.
+
+Classes:
+    SharedHttpClient: Owns the event loop, session, connector and request scheduler of the process.
+
+Example:
+    >>> client = SharedHttpClient.instance(config)
+    >>> naics_titles = client.run(fetch_titles(client))  # fetch_titles uses client.session
+    >>> client.stats
+    {'requests': 12, 'connections_created': 2, 'connections_reused': 10, ..., 'hosts': {...}}
+
+"""
+
+import asyncio
+import atexit
+import os
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+import aiohttp
+from omegaconf import DictConfig, OmegaConf
+
+from src.data_processing.request_scheduler import RequestScheduler
+
+T = TypeVar("T")
+
+
+class SharedHttpClient:
+    """Long-lived event loop and HTTP session shared by the API fetchers of a process.
+
+    Attributes:
+        limit (int): The maximum number of simultaneous connections.
+        limit_per_host (int): The maximum number of simultaneous connections to the same host.
+        ttl_dns_cache (int): The time, in seconds, that resolved host names are cached.
+        keepalive_timeout (float): The time, in seconds, that idle connections are kept open.
+        timeout (aiohttp.ClientTimeout): The total timeout of each request.
+        scheduler (RequestScheduler): The scheduler of the requests of all the fetchers.
+
+    """
+
+    _instance: Optional["SharedHttpClient"] = None
+    _instance_pid: Optional[int] = None
+
+    def __init__(
+        self,
+        config: DictConfig,
+    ):
+        client_config = config.get("http_client", {})
+        self.limit = client_config.get("limit", 100)
+        self.limit_per_host = client_config.get("limit_per_host", 10)
+        self.ttl_dns_cache = client_config.get("ttl_dns_cache", 300)
+        self.keepalive_timeout = client_config.get("keepalive_timeout", 30)
+        self.timeout = aiohttp.ClientTimeout(total=client_config.get("timeout_seconds", 60))
+        self._loop = asyncio.new_event_loop()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.scheduler = RequestScheduler(config)
+        self._stats = dict.fromkeys(
+            [
+                "requests",
+                "failed_requests",
+                "connections_created",
+                "connections_reused",
+                "dns_cache_hits",
+                "dns_cache_misses",
+            ],
+            0,
+        )
+
+    @classmethod
+    def instance(cls, config: DictConfig) -> "SharedHttpClient":
+        """Return the client of the current process, creating it on first use.
+
+        Args:
+            config (DictConfig): The configuration object.
+
+        Returns:
+            SharedHttpClient: The client shared by the fetchers of the process.
+
+        """
+        # A forked worker process inherits the parent's client, whose loop and sockets it cannot use
+        if cls._instance is None or cls._instance_pid != os.getpid():
+            cls._instance = cls(config)
+            cls._instance_pid = os.getpid()
+            atexit.register(cls._instance.close)
+        return cls._instance
+
+    @staticmethod
+    def worker_config(
+        config: DictConfig,
+        n_workers: int,
+    ) -> DictConfig:
+        """Return the configuration of the clients of worker processes that send requests at the same time.
+
+        The connection limits and the rate, burst and concurrency of each host are divided among
+        the workers.
+
+        Args:
+            config (DictConfig): The configuration object.
+            n_workers (int): The number of worker processes.
+
+        Returns:
+            DictConfig: The configuration of each worker process.
+
+        """
+        config = RequestScheduler.split_across_processes(config, n_workers)
+        if n_workers > 1:
+            client_config = config.get("http_client") or OmegaConf.create({})
+            for key, default in [("limit", 100), ("limit_per_host", 10)]:
+                client_config[key] = max(1, client_config.get(key, default) // n_workers)
+            config["http_client"] = client_config
+        return config
+
+    @classmethod
+    def close_instance(cls):
+        """Close the client of the current process, if any."""
+        if cls._instance is not None and cls._instance_pid == os.getpid():
+            cls._instance.close()
+        cls._instance = None
+        cls._instance_pid = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use.
+
+        It must be used from the coroutines run by `run`, so the session is bound to the client's event loop.
+
+        Returns:
+            aiohttp.ClientSession: The session used by all the requests of the process.
+
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                    use_dns_cache=True,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get the request, connection pool and keep-alive statistics of the client.
+
+        Returns:
+            Dict[str, Any]: The counters of requests, new and reused connections and DNS cache
+                hits and misses, the share of requests served by a kept-alive connection, the
+                connector limits and, under `hosts`, the request statistics of each host.
+
+        """
+        connections = self._stats["connections_created"] + self._stats["connections_reused"]
+        return {
+            **self._stats,
+            "keepalive_reuse_ratio": self._stats["connections_reused"] / connections if connections else 0.0,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "hosts": self.scheduler.stats,
+        }
+
+    def run(
+        self,
+        coroutine: Awaitable[T],
+    ) -> T:
+        """Run a coroutine on the client's event loop until it completes.
+
+        Args:
+            coroutine (Awaitable[T]): The coroutine to run.
+
+        Returns:
+            T: The result of the coroutine.
+
+        """
+        return self._loop.run_until_complete(coroutine)
+
+    def close(self):
+        """Report the requests of each host and close the session and the event loop.
+
+        The client cannot be used afterwards.
+
+        """
+        if self._loop.is_closed():
+            return
+        for host, host_stats in self.scheduler.stats.items():
+            latencies = ", ".join(
+                f"{name} {host_stats[f'latency_{name}']:.3f}s"
+                for name in ["p50", "p90"]
+                if host_stats[f"latency_{name}"] is not None
+            )
+            print(
+                f"{host}: {host_stats['requests']} requests, {host_stats['retries']} retries, "
+                f"{host_stats['failures']} failures, {host_stats['requests_per_second']:.1f} requests/s"
+                + (f", latency {latencies}" if latencies else "")
+            )
+        if self._session is not None and not self._session.closed:
+            self._loop.run_until_complete(self._session.close())
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Create the tracing hooks that count requests, connections and DNS cache lookups."""
+
+        def count(stat: str):
+            async def on_event(session, context, params):
+                self._stats[stat] += 1
+
+            return on_event
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(count("requests"))
+        trace_config.on_request_exception.append(count("failed_requests"))
+        trace_config.on_connection_create_end.append(count("connections_created"))
+        trace_config.on_connection_reuseconn.append(count("connections_reused"))
+        trace_config.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace_config
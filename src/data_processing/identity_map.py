@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Identity map of the dimension tables shared by the data loaders.
+
+This module defines the `DimensionIdentityMap` class, which keeps in memory the ID of each row of
+the dimension tables (additives, industry sectors, chemical activities, end-of-life activities,
+release types and the CDR categories and sectors), keyed by their natural key.
+`PlasticAdditiveDataEngineering` creates one map per run, preloads it and passes it to the TRI
+and CDR orchestrators and their loaders, so each table is read once per run instead of each
+loader querying it again for every batch of keys. A loader created without a map gets its own.
+
+Each table is loaded with a single query by `preload`, or the first time one of its keys is
+looked up. The loaders add the rows they insert, and the keys that are not in the map
+(e.g., rows inserted with `to_sql`) are looked up in the database and added by the loaders, so the
+map stays up to date. The hits and misses of each table are exposed by the `stats` property.
+
+Classes:
+    DimensionIdentityMap: Natural key to ID maps of the dimension tables of a database.
+
+Example:
+    >>> identity_map = DimensionIdentityMap(session.get_bind())
+    >>> identity_map.preload()
+    >>> ids, missing = identity_map.get_many(IndustrySector, ["naics_code", "naics_title"], [("325211", "Plastics")])
+    >>> identity_map.stats
+    {'industry_sector': {'rows': 120, 'hits': 1, 'misses': 0}}
+
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from src.data_processing.data_models import (
+    Additive,
+    ChemicalActivity,
+    ConsumerCommercialFunctionCategory,
+    ConsumerCommercialProductCategory,
+    EndOfLifeActivity,
+    IndustrialTypeOfProcessOrUse,
+    IndustryFunctionCategory,
+    IndustrySector,
+    IndustryUseSector,
+    ReleaseType,
+)
+
+# Natural key of each dimension table, as used by the loaders
+DIMENSION_KEYS = {
+    Additive: ("tri_chemical_id",),
+    IndustrySector: ("naics_code", "naics_title"),
+    ChemicalActivity: ("name",),
+    EndOfLifeActivity: ("name",),
+    ReleaseType: ("name",),
+    ConsumerCommercialProductCategory: ("name",),
+    ConsumerCommercialFunctionCategory: ("name",),
+    IndustryFunctionCategory: ("name",),
+    IndustrialTypeOfProcessOrUse: ("name",),
+    IndustryUseSector: ("code", "name"),
+}
+
+
+class DimensionIdentityMap:
+    """In-memory natural key to ID maps of the dimension tables of a database.
+
+    Attributes:
+        engine (Engine): The engine of the database whose tables are mapped.
+
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+    ):
+        self.engine = engine
+        self._ids: Dict[Tuple[str, Tuple[str, ...]], Dict[Tuple, int]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the number of rows, hits and misses of each loaded table.
+
+        Returns:
+            Dict[str, Dict[str, int]]: For each table, the rows in the map and the keys found
+                (hits) and not found (misses) in it.
+
+        """
+        stats = {}
+        for (table, _), ids in self._ids.items():
+            stats[table] = {"rows": len(ids), **self._stats[table]}
+        return stats
+
+    def preload(self):
+        """Load all the dimension tables, each with a single query."""
+        for model, columns in DIMENSION_KEYS.items():
+            self._get_ids(model, columns)
+
+    def get_many(
+        self,
+        model,
+        columns: Sequence[str],
+        keys: List[Tuple],
+    ) -> Tuple[Dict[Tuple, int], List[Tuple]]:
+        """Look up the IDs of the given keys.
+
+        Args:
+            model: The SQLAlchemy model of the table.
+            columns (Sequence[str]): The key columns, in the order of the key values.
+            keys (List[Tuple]): The keys to look up.
+
+        Returns:
+            Tuple[Dict[Tuple, int], List[Tuple]]: The ID of each key in the map and the keys that are not.
+
+        """
+        ids = self._get_ids(model, columns)
+        found = {}
+        missing = []
+        for key in keys:
+            element_id = ids.get(key)
+            if element_id is None:
+                missing.append(key)
+            else:
+                found[key] = element_id
+        table_stats = self._stats[model.__tablename__]
+        table_stats["hits"] += len(found)
+        table_stats["misses"] += len(missing)
+        return found, missing
+
+    def add_many(
+        self,
+        model,
+        columns: Sequence[str],
+        ids: Dict[Tuple, int],
+    ):
+        """Add the IDs of the given keys, e.g., of the rows inserted by a loader.
+
+        Args:
+            model: The SQLAlchemy model of the table.
+            columns (Sequence[str]): The key columns, in the order of the key values.
+            ids (Dict[Tuple, int]): The ID of each key.
+
+        """
+        self._get_ids(model, columns).update(ids)
+
+    def add_element(self, element):
+        """Add an element inserted through the ORM to the loaded maps of its table.
+
+        Args:
+            element: The inserted element, with its ID.
+
+        """
+        table = type(element).__tablename__
+        for (map_table, columns), ids in self._ids.items():
+            if map_table == table:
+                ids[tuple(getattr(element, column) for column in columns)] = element.id
+
+    def _get_ids(
+        self,
+        model,
+        columns: Sequence[str],
+    ) -> Dict[Tuple, int]:
+        """Return the map of a table and key columns, loading it with a single query on first use."""
+        map_key = (model.__tablename__, tuple(columns))
+        if map_key not in self._ids:
+            query = select(model.id, *[getattr(model, column) for column in columns])
+            with self.engine.connect() as connection:
+                self._ids[map_key] = {tuple(row[1:]): row[0] for row in connection.execute(query)}
+            self._stats.setdefault(model.__tablename__, {"hits": 0, "misses": 0})
+        return self._ids[map_key]
@@ -16,6 +16,7 @@ from omegaconf import DictConfig
 
 from src.data_processing.cdr.orchestator import CdrDataOrchestator
 from src.data_processing.create_sqlite_db import create_database
+from src.data_processing.identity_map import DimensionIdentityMap
 from src.data_processing.tri.orchestator import TriOrchestator
 
 
@@ -31,6 +32,8 @@ class PlasticAdditiveDataEngineering:
         year (int): The year of the TRI data being processed.
         tri_orchestator (TriOrchestator): An instance of the TriOrchestator class,
             responsible for orchestrating specific data processing steps for the specified year.
+        identity_map (DimensionIdentityMap): The IDs of the dimension tables, shared by the TRI
+            and CDR loaders of the run.
 
     Methods:
         setup_logging(): Sets up the logging configuration for tracking pipeline execution.
@@ -46,20 +49,23 @@ class PlasticAdditiveDataEngineering:
     ):
         self.year = year
         self.config = config
+        self._create_db_tables()
         self.tri_orchestator = TriOrchestator(
             year=year,
             config=config,
+            identity_map=self.identity_map,
         )
         self.cdr_orchestator = CdrDataOrchestator(
             config=config,
             is_drop_nan_percentage=is_drop_nan_percentage,
+            identity_map=self.identity_map,
         )
-        self._create_db_tables()
         self.setup_logging()
 
     def _create_db_tables(self):
-        """Create database tables for storing processed data."""
+        """Create database tables for storing processed data, and the identity map shared by the loaders."""
         self.session = create_database()
+        self.identity_map = DimensionIdentityMap(self.session.get_bind())  # type: ignore [reportArgumentType]
 
     def setup_logging(self):
         """Sets up logging configuration."""
@@ -78,10 +84,21 @@ class PlasticAdditiveDataEngineering:
     def run(self):
         """Run the data processing pipeline."""
         self.logger.info("Starting data processing pipeline...")
+        # Each dimension table is read once, before the loaders look up their keys
+        self.identity_map.preload()
         self.logger.info(f"Running data processing pipeline for the TRI RY {self.year}...")
         self.tri_orchestator.run()
         self.logger.info("Running data processing pipeline for the CDR RY 2022...")
         self.cdr_orchestator.run()
+        for loader in [self.tri_orchestator.tri_db_loader, self.cdr_orchestator.cdr_db_loader]:
+            for table, table_stats in loader.bulk_writer.stats.items():
+                self.logger.info(
+                    f"Inserted {table_stats['rows']} rows into {table} at {table_stats['rows_per_second']:.0f} rows/s"
+                )
+        for table, table_stats in self.identity_map.stats.items():
+            self.logger.info(
+                f"Identity map of {table}: {table_stats['rows']} rows, {table_stats['hits']} hits, {table_stats['misses']} misses"
+            )
         self.logger.info("Data processing pipeline completed.")
 
 
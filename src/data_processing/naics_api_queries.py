@@ -16,15 +16,29 @@ Classes:
 Functions:
     __init__(cfg: DictConfig): Initializes the `NaicsDataFetcher` with a configuration object
                                and loads the API key from the `.env` file.
-    _load_api_key() -> str: Loads the Census API key from the `.env` file, raising an
-                            `EnvironmentError` if the file or key is missing.
+    _load_api_key() -> Optional[str]: Loads the Census API key from the `.env` file, raising an
+                                      `EnvironmentError` if the file or key is missing (unless
+                                      the fetcher runs offline only).
     _fetch_single_naics_data(naics_code: str, session: aiohttp.ClientSession) -> Dict[str, Optional[str]]:
-        Asynchronously fetches a description for a single NAICS code using a shared session.
+        Asynchronously fetches a description for a single NAICS code using a shared session,
+        memoized so that each code is requested at most once per process.
+    _request_naics_title(naics_code: str, session: aiohttp.ClientSession) -> Optional[str]:
+        Requests the title of a NAICS code from the Census API, with USAspending as fallback. In
+        hedged mode, USAspending is also queried when Census is slower than a latency percentile,
+        and the first valid title wins.
+    _request_census_title(naics_code: str, session: aiohttp.ClientSession) -> Optional[str]:
+        Requests the title of a NAICS code from the Census API only.
     _fetch_all_naics_data(naics_codes: List[str]) -> List[Dict[str, Optional[str]]]:
-        Asynchronously fetches descriptions for multiple NAICS codes using a single session.
+        Resolves the NAICS codes from the offline index and the persistent cache, and
+        asynchronously fetches descriptions for the remaining codes using the shared session.
     process_naics_codes(df: pd.DataFrame, code_column: str) -> pd.DataFrame:
         Processes a DataFrame containing NAICS codes, fetching descriptions and returning
         a new DataFrame with `naics_code` and `naics_title` columns.
+    process_frs_registry_ids(frs_fetcher: FrsDataFetcher, df: pd.DataFrame, id_column: str)
+        -> Tuple[pd.DataFrame, pd.DataFrame]:
+        Processes a DataFrame containing FRS registry IDs, looking up the titles of the NAICS codes
+        in batches as the FRS responses that produced them arrive. Returns the `registry_id` and
+        `naics_code` DataFrame and the `naics_code` and `naics_title` DataFrame.
 
 Example Usage:
     ```
@@ -53,27 +67,40 @@ Notes:
     - Requires `aiohttp` for asynchronous HTTP requests, `omegaconf` for configuration handling,
       and `dotenv` to load environment variables.
     - The API key must be stored in an `.env` file with the key `CENSUS_DATA_API_KEY`.
-    - Asynchronous requests are used to enhance performance when querying multiple codes.
+    - Asynchronous requests are used to enhance performance when querying multiple codes. They run
+      on the event loop and session of `SharedHttpClient`, shared with `FrsDataFetcher` for the
+      whole pipeline run, so connections are kept alive across calls.
+    - The titles are first resolved from the bundled NAICS title table (`naics_index` in the
+      configuration), so only the codes missing from it are requested. With
+      `naics_index.offline_only`, the APIs are never queried and the API key is not needed.
+    - The titles are stored in a persistent cache (`api_cache` in the configuration) keyed by
+      NAICS code and Census vintage, so warm runs do not query the APIs again.
 
 """
 
 import asyncio
 import os
+import time
 from datetime import datetime
-from functools import lru_cache
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import aiohttp
 import pandas as pd
 from dotenv import load_dotenv
 from omegaconf import DictConfig
 
+from src.data_processing.api_cache import PersistentApiCache
+from src.data_processing.async_memo import AsyncSingleFlightCache
+from src.data_processing.frs_api_queries import FrsDataFetcher
+from src.data_processing.http_client import SharedHttpClient
+from src.data_processing.naics_title_index import NaicsTitleIndex
+
 
 class NaicsDataFetcher:
     """Singleton class for fetching NAICS code descriptions from the Census API with caching."""
 
     _instance = None  # Singleton instance
-    _naics_cache = {}
+    _naics_memo = AsyncSingleFlightCache(maxsize=4096)  # NAICS code -> title, shared by all callers
 
     def __new__(cls, *args, **kwargs):
         """Ensure only a single instance of NaicsDataFetcher is created."""
@@ -84,33 +111,49 @@ class NaicsDataFetcher:
     def __init__(
         self,
         cfg: DictConfig,
-        max_concurrent_requests: int = 10,
     ):
         """Initialize the NaicsDataFetcher with configuration and API key.
 
+        The concurrency and rate of the requests are set by `request_scheduler` in the configuration.
+
         Args:
             cfg (DictConfig): The configuration object.
-            max_concurrent_requests (int): The maximum number of concurrent requests.
 
         """
         if not hasattr(self, "_initialized"):  # Avoid re-initialization in singleton
             self.cfg = cfg
+            self.offline_only = cfg.get("naics_index", {}).get("offline_only", False)
             self.census_api_key = self._load_api_key()
             self.base_url = f"{cfg.census_api.base_url}/{cfg.census_api.dataset}"
-            self.semaphore = asyncio.Semaphore(max_concurrent_requests)
             self.time = f"{datetime.now().year}-01"
+            self.persistent_cache = PersistentApiCache(cfg, namespace="naics_title")
+            self.title_index = NaicsTitleIndex(cfg)
+            self.hedging = cfg.census_api.get("hedging", {})
             self._initialized = True
 
-    def _load_api_key(self) -> str:
+    @property
+    def http_client(self) -> SharedHttpClient:
+        """Get the HTTP client of the current process, shared with the other fetchers.
+
+        Returns:
+            SharedHttpClient: The client that owns the event loop and the session.
+
+        """
+        return SharedHttpClient.instance(self.cfg)
+
+    def _load_api_key(self) -> Optional[str]:
         """Load the Census API key from the .env file.
 
         Returns:
-            str: The API key for the Census Bureau.
+            Optional[str]: The API key for the Census Bureau, or None if the fetcher runs offline only.
 
         Raises:
             EnvironmentError: If the .env file or the CENSUS_DATA_API_KEY is not found.
 
         """
+        if self.offline_only:
+            return None
+
         load_dotenv()
         api_key = os.getenv("CENSUS_DATA_API_KEY")
 
@@ -136,15 +179,13 @@ class NaicsDataFetcher:
 
         """
         query_url = self.cfg.usspending_api.base_url.format(naics_code=naics_code)
-        async with session.get(query_url) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data["results"][0]["naics_description"].capitalize()
-            else:
-                print(f"Failed to fetch data for NAICS code {naics_code}: {response.status}")
-                return None
-
-    @lru_cache(maxsize=100)
+        status, data = await self.http_client.scheduler.get_json(session, query_url)
+        if status == 200:
+            return data["results"][0]["naics_description"].capitalize()
+        else:
+            print(f"Failed to fetch data for NAICS code {naics_code}: {status}")
+            return None
+
     async def _fetch_single_naics_data(
         self,
         naics_code: str,
@@ -152,6 +193,9 @@ class NaicsDataFetcher:
     ) -> Dict[str, Optional[str]]:
         """Fetch data for a single NAICS code asynchronously using a shared session.
 
+        The title is memoized for the process. Concurrent calls for the same code share a
+        single request.
+
         Args:
             naics_code (str): The NAICS code to fetch data for.
             session (aiohttp.ClientSession): The shared aiohttp session.
@@ -159,40 +203,121 @@ class NaicsDataFetcher:
         Returns:
             Dict[str, Optional[str]]: A dictionary with `naics_code` and `naics_title`.
         """
-        if naics_code in self._naics_cache:
-            return {"naics_code": naics_code, "naics_title": self._naics_cache[naics_code]}
+        naics_title = await self._naics_memo.get_or_fetch(
+            naics_code,
+            lambda: self._request_naics_title(naics_code, session),
+        )
+        return {"naics_code": naics_code, "naics_title": naics_title}
+
+    async def _request_naics_title(
+        self,
+        naics_code: str,
+        session: aiohttp.ClientSession,
+    ) -> Optional[str]:
+        """Request the title of a NAICS code from the Census API, falling back to USAspending.
+
+        In hedged mode (`census_api.hedging` in the configuration), if Census has not answered
+        within the configured percentile of its recent latencies, USAspending is queried in
+        parallel and the first valid title wins. Otherwise, USAspending is only queried after
+        Census returns no title.
+
+        Args:
+            naics_code (str): The NAICS code to fetch data for.
+            session (aiohttp.ClientSession): The shared aiohttp session.
+
+        Returns:
+            Optional[str]: The NAICS title, or None if neither API returns it.
+        """
+        if not self.hedging.get("enabled", False):
+            naics_title = await self._request_census_title(naics_code, session)
+            if naics_title is None:
+                naics_title = await self._fetch_from_auxiliar_endpoint(naics_code, session)
+            return naics_title
+
+        # The delay starts when the Census request is sent, not while it waits for a slot
+        census_sent = asyncio.Event()
+        census_task = asyncio.ensure_future(self._request_census_title(naics_code, session, census_sent))
+        sent_task = asyncio.ensure_future(census_sent.wait())
+        await asyncio.wait({census_task, sent_task}, return_when=asyncio.FIRST_COMPLETED)
+        sent_task.cancel()
+        done, _ = await asyncio.wait({census_task}, timeout=self._hedging_delay())
+        if done and census_task.exception() is None and census_task.result() is not None:
+            return census_task.result()
+
+        # Census is slow or returned no title, so USAspending is queried too
+        pending = {census_task, asyncio.ensure_future(self._fetch_from_auxiliar_endpoint(naics_code, session))} - done
+        error = census_task.exception() if done else None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif task.result() is not None:
+                        return task.result()
+            # Failed requests only raise if no endpoint returned a title
+            if error is not None:
+                raise error
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            # The cancelled requests free their slots of the host before the title is returned
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _hedging_delay(self) -> float:
+        """Get the time to wait for Census before also querying USAspending, in seconds.
+
+        Returns:
+            float: The configured percentile of the recent Census latencies, or the default delay
+                while too few latencies are recorded.
+
+        """
+        delay = self.http_client.scheduler.latency_percentile(
+            self.base_url,
+            self.hedging.get("percentile", 90),
+            min_samples=self.hedging.get("min_samples", 20),
+        )
+        return delay if delay is not None else self.hedging.get("default_delay_seconds", 1.0)
+
+    async def _request_census_title(
+        self,
+        naics_code: str,
+        session: aiohttp.ClientSession,
+        sent: Optional[asyncio.Event] = None,
+    ) -> Optional[str]:
+        """Request the title of a NAICS code from the Census API.
+
+        Args:
+            naics_code (str): The NAICS code to fetch data for.
+            session (aiohttp.ClientSession): The shared aiohttp session.
+            sent (Optional[asyncio.Event]): An event set when the request is sent.
 
+        Returns:
+            Optional[str]: The NAICS title, or None if the Census API does not return it.
+        """
         full_url = (
             f"{self.base_url}"
             f"?get={"&".join(self.cfg.census_api.parameters['get']).format(time=self.time)}"
             f"&{self.cfg.census_api.parameters['naics_code'].format(naics_code=naics_code)}"
             f"&key={self.census_api_key}"
         )
-        async with self.semaphore:
-            async with session.get(full_url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    naics_title = data[1][0].capitalize() if len(data) > 1 else None
-                    if naics_title is None:
-                        naics_title = await self._fetch_from_auxiliar_endpoint(
-                            naics_code,
-                            session,
-                        )
-                    self._naics_cache[naics_code] = naics_title
-                    return {"naics_code": naics_code, "naics_title": naics_title}
-                else:
-                    naics_title = await self._fetch_from_auxiliar_endpoint(
-                        naics_code,
-                        session,
-                    )
-                    self._naics_cache[naics_code] = naics_title
-                    return {"naics_code": naics_code, "naics_title": naics_title}
+        # Throttled and failed requests are retried by the scheduler before falling back
+        status, data = await self.http_client.scheduler.get_json(session, full_url, sent)
+        if status == 200:
+            return data[1][0].capitalize() if len(data) > 1 else None
+        return None
 
     async def _fetch_all_naics_data(
         self,
         naics_codes: List[str],
     ) -> List[Dict[str, Optional[str]]]:
-        """Fetch data for multiple NAICS codes asynchronously using a shared session.
+        """Fetch data for multiple NAICS codes asynchronously using the shared session.
+
+        The codes are resolved from the offline NAICS title index first, then from the persistent
+        cache for the current Census vintage, and only the remaining codes are requested. Their
+        results, including the failed lookups, are then stored in the cache. When running offline
+        only, the remaining codes are left without a title.
 
         Args:
             naics_codes (List[str]): A list of unique NAICS codes to fetch data for.
@@ -200,9 +325,103 @@ class NaicsDataFetcher:
         Returns:
             List[Dict[str, Optional[str]]]: A list of dictionaries with `naics_code` and `naics_title`.
         """
-        async with aiohttp.ClientSession() as session:  # Shared session for all requests
-            tasks = [self._fetch_single_naics_data(code, session) for code in naics_codes]
-            return await asyncio.gather(*tasks)
+        naics_titles: Dict[str, Optional[str]] = {**self.title_index.lookup_many(naics_codes)}
+        missing_codes = [code for code in naics_codes if code not in naics_titles]
+
+        if missing_codes and self.offline_only:
+            naics_titles.update(dict.fromkeys(missing_codes))
+            missing_codes = []
+
+        if missing_codes:
+            naics_titles.update(self.persistent_cache.get_many(missing_codes, version=self.time))
+            missing_codes = [code for code in missing_codes if code not in naics_titles]
+
+        if missing_codes:
+            session = self.http_client.session  # Shared session for all requests of the run
+            tasks = [self._fetch_single_naics_data(code, session) for code in missing_codes]
+            fetched_data = await asyncio.gather(*tasks)
+            fetched_titles = {item["naics_code"]: item["naics_title"] for item in fetched_data}
+            self.persistent_cache.set_many(fetched_titles, version=self.time)
+            naics_titles.update(fetched_titles)
+
+        return [{"naics_code": code, "naics_title": naics_titles[code]} for code in naics_codes]
+
+    async def _fetch_frs_and_naics_data(
+        self,
+        frs_fetcher: FrsDataFetcher,
+        registry_ids: List[str],
+    ) -> Tuple[List[Dict[str, Optional[str]]], List[Dict[str, Optional[str]]]]:
+        """Fetch the NAICS codes of the registry IDs and their titles as a pipeline.
+
+        The new NAICS codes of the FRS responses are collected as they arrive and their titles are
+        looked up in batches, each resolved with a single `_fetch_all_naics_data` call while the
+        other FRS requests are still in flight. A batch is sent when it has `stream_batch_size`
+        codes or its first code has waited `stream_batch_seconds` (`census_api` in the configuration),
+        even if no other FRS response arrives in the meantime.
+
+        Args:
+            frs_fetcher (FrsDataFetcher): The fetcher of the NAICS codes of the registry IDs.
+            registry_ids (List[str]): A list of unique FRS registry IDs to fetch data for.
+
+        Returns:
+            Tuple[List[Dict[str, Optional[str]]], List[Dict[str, Optional[str]]]]: The dictionaries with
+                `registry_id` and `naics_code`, and the dictionaries with `naics_code` and `naics_title`.
+        """
+        batch_size = self.cfg.census_api.get("stream_batch_size", 100)
+        batch_seconds = self.cfg.census_api.get("stream_batch_seconds", 0.5)
+        frs_data = []
+        seen_codes = set()
+        batch: List[str] = []
+        batch_started_at = 0.0
+        naics_tasks: List[asyncio.Future] = []
+
+        def send_batch():
+            nonlocal batch
+            naics_tasks.append(asyncio.ensure_future(self._fetch_all_naics_data(batch)))
+            batch = []
+
+        stream = frs_fetcher.stream_naics_codes(registry_ids)
+        next_item = asyncio.ensure_future(anext(stream))
+        try:
+            while True:
+                # The pending item is awaited without cancelling it, so the stream survives the timeouts
+                timeout = max(batch_started_at + batch_seconds - time.monotonic(), 0) if batch else None
+                done, _ = await asyncio.wait({next_item}, timeout=timeout)
+                if not done:
+                    send_batch()
+                    continue
+                try:
+                    item = next_item.result()
+                except StopAsyncIteration:
+                    break
+                next_item = asyncio.ensure_future(anext(stream))
+                frs_data.append(item)
+                naics_code = item["naics_code"]
+                if naics_code is not None and naics_code not in seen_codes:
+                    seen_codes.add(naics_code)
+                    if not batch:
+                        batch_started_at = time.monotonic()
+                    batch.append(naics_code)
+                    if len(batch) >= batch_size:
+                        send_batch()
+        finally:
+            next_item.cancel()
+            await asyncio.gather(next_item, return_exceptions=True)
+            await stream.aclose()
+        if batch:
+            send_batch()
+
+        naics_data = [item for items in await asyncio.gather(*naics_tasks) for item in items]
+        return frs_data, naics_data
+
+    def _build_naics_dataframe(
+        self,
+        data: List[Dict[str, Optional[str]]],
+    ) -> pd.DataFrame:
+        """Build the DataFrame of the NAICS titles, capitalized."""
+        result_df = pd.DataFrame(data, columns=["naics_code", "naics_title"])
+        result_df["naics_title"] = result_df["naics_title"].str.capitalize()
+        return result_df
 
     def process_naics_codes(
         self,
@@ -219,10 +438,32 @@ class NaicsDataFetcher:
             pd.DataFrame: A DataFrame containing `naics_code` and `naics_title`.
         """
         unique_naics_codes = df[code_column].unique().tolist()
-        data = asyncio.run(self._fetch_all_naics_data(unique_naics_codes))
-        result_df = pd.DataFrame(data)
-        result_df["naics_title"] = result_df["naics_title"].str.capitalize()
-        return result_df
+        data = self.http_client.run(self._fetch_all_naics_data(unique_naics_codes))
+        return self._build_naics_dataframe(data)
+
+    def process_frs_registry_ids(
+        self,
+        frs_fetcher: FrsDataFetcher,
+        df: pd.DataFrame,
+        id_column: str,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Process FRS registry IDs in a DataFrame and return their NAICS codes and titles.
+
+        Unlike calling `FrsDataFetcher.process_registry_ids` and then `process_naics_codes`, the
+        NAICS titles are looked up while the FRS requests are in flight, overlapping both lookups.
+
+        Args:
+            frs_fetcher (FrsDataFetcher): The fetcher of the NAICS codes of the registry IDs.
+            df (pd.DataFrame): The DataFrame containing FRS registry IDs.
+            id_column (str): The name of the column containing the registry IDs.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: A DataFrame containing `registry_id` and `naics_code`, and
+                a DataFrame containing `naics_code` and `naics_title` for the non-null NAICS codes.
+        """
+        unique_registry_ids = df[id_column].unique().tolist()
+        frs_data, naics_data = self.http_client.run(self._fetch_frs_and_naics_data(frs_fetcher, unique_registry_ids))
+        return pd.DataFrame(frs_data, columns=["registry_id", "naics_code"]), self._build_naics_dataframe(naics_data)
 
 
 if __name__ == "__main__":
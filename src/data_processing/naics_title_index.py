@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Offline index of NAICS code titles.
+
+This module defines the `NaicsTitleIndex` class, which resolves NAICS code titles from the
+table bundled under `ancillary` (`naics_titles.csv`), so that the NAICS titles can be added
+without querying the Census and USAspending APIs.
+
+The table has one row per NAICS code and vintage (`naics_code`, `naics_title` and
+`naics_vintage`). When a code is listed in more than one vintage, the title of the most recent
+vintage is used. The table is loaded once into a dictionary, so exact lookups take constant
+time. A code that is not in the table (e.g., a 6-digit code created or dropped by a NAICS
+revision) can optionally fall back to the title of its longest listed prefix, i.e., its
+closest parent industry.
+
+Classes:
+    NaicsTitleIndex: Resolves NAICS code titles from the bundled table, with prefix fallback.
+
+Example:
+    >>> index = NaicsTitleIndex(config)
+    >>> index.lookup("325211")
+    'Plastics Material and Resin Manufacturing'
+    >>> index.lookup_many(["325211", "999999"])
+    {'325211': 'Plastics Material and Resin Manufacturing'}
+
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+from omegaconf import DictConfig
+
+CURRENT_DIRECTORY = os.getcwd()
+MIN_NAICS_CODE_LENGTH = 2  # NAICS sectors
+
+
+class NaicsTitleIndex:
+    """In-memory index of the bundled NAICS code titles.
+
+    Attributes:
+        enabled (bool): Whether the index is used. If False, no code is resolved.
+        path (str): The path to the CSV file with the NAICS titles.
+        prefix_fallback (bool): Whether unknown codes are resolved to the title of their closest parent.
+
+    """
+
+    def __init__(
+        self,
+        config: DictConfig,
+    ):
+        index_config = config.get("naics_index", {})
+        self.enabled = index_config.get("enabled", False)
+        self.path = os.path.join(
+            CURRENT_DIRECTORY,
+            index_config.get("folder", "ancillary"),
+            index_config.get("file", "naics_titles.csv"),
+        )
+        self.prefix_fallback = index_config.get("prefix_fallback", True)
+        self._titles: Optional[Dict[str, str]] = None
+
+    @property
+    def titles(self) -> Dict[str, str]:
+        """Get the title of each NAICS code, loading the table on first use.
+
+        Returns:
+            Dict[str, str]: The NAICS title for each code. Empty if the index is disabled or the file is missing.
+
+        """
+        if self._titles is None:
+            self._titles = self._load_titles()
+        return self._titles
+
+    def _load_titles(self) -> Dict[str, str]:
+        """Load the NAICS titles, keeping the most recent vintage of each code."""
+        if not self.enabled:
+            return {}
+        if not os.path.exists(self.path):
+            print(f"NAICS title index {self.path} not found. The NAICS titles will be requested from the APIs.")
+            return {}
+
+        df = pd.read_csv(
+            self.path,
+            usecols=["naics_code", "naics_title", "naics_vintage"],  # type: ignore [reportArgumentType]
+            dtype={"naics_code": str, "naics_title": str, "naics_vintage": int},
+        )
+        df = df.dropna(subset=["naics_code", "naics_title"])
+        df = df.sort_values("naics_vintage").drop_duplicates(subset="naics_code", keep="last")
+        return dict(zip(df["naics_code"].str.strip(), df["naics_title"].str.strip()))
+
+    def lookup(
+        self,
+        naics_code: str,
+    ) -> Optional[str]:
+        """Return the title of a NAICS code.
+
+        Args:
+            naics_code (str): The NAICS code to look up.
+
+        Returns:
+            Optional[str]: The NAICS title, or None if neither the code nor (with prefix fallback) a parent is listed.
+
+        """
+        titles = self.titles
+        title = titles.get(naics_code)
+        if title is not None or not self.prefix_fallback:
+            return title
+
+        for length in range(len(naics_code) - 1, MIN_NAICS_CODE_LENGTH - 1, -1):
+            title = titles.get(naics_code[:length])
+            if title is not None:
+                return title
+        return None
+
+    def lookup_many(
+        self,
+        naics_codes: Iterable[str],
+    ) -> Dict[str, str]:
+        """Return the titles of the NAICS codes that the index resolves.
+
+        Args:
+            naics_codes (Iterable[str]): The NAICS codes to look up.
+
+        Returns:
+            Dict[str, str]: The NAICS title of each resolved code. Unresolved codes are left out.
+
+        """
+        if not self.titles:
+            return {}
+
+        resolved = {}
+        for naics_code in naics_codes:
+            title = self.lookup(naics_code)
+            if title is not None:
+                resolved[naics_code] = title
+        return resolved
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Content-addressed cache of parsed raw data files.
+
+This module defines the `ParsedFileCache` class, which stores the DataFrame obtained
+from parsing a raw TRI or CDR file as an uncompressed Feather (Arrow IPC) file under
+`data/interim`. Later runs memory-map the cached file instead of parsing the raw file
+again.
+
+The cache key is a SHA-256 digest that combines:
+    - The content of the raw data file and of any auxiliary file that drives the parse
+      (e.g., the TRI columns file).
+    - The slice of the configuration that changes the parsed result (projected columns,
+      dtypes, engine, early filters).
+
+Therefore, editing the raw file, the columns file or the relevant configuration produces
+a new entry, while changes elsewhere in the configuration reuse the cached frames. Writing
+a new entry removes the older entries of the same raw file, so the folder keeps one frame
+per raw file.
+
+Classes:
+    ParsedFileCache: Reads and writes parsed DataFrames keyed by content and configuration.
+
+Example:
+    >>> cache = ParsedFileCache(config)
+    >>> df = cache.get_or_parse(
+    ...     source_files=["data/raw/US_1a_2022.txt", "ancillary/tri_file_1a_columns.txt"],
+    ...     config_slice={"used_cols": used_cols, "engine": "c"},
+    ...     parse=lambda: TriDataHelper.load_txt_data(...),
+    ... )
+
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from omegaconf import DictConfig, ListConfig, OmegaConf
+from pyarrow import feather
+
+CURRENT_DIRECTORY = os.getcwd()
+KEY_LENGTH = 16
+
+
+class ParsedFileCache:
+    """Content-addressed cache of parsed raw data files.
+
+    Attributes:
+        enabled (bool): Whether the cache is used. If False, every call parses the raw file.
+        folder (str): The folder where the cached frames are stored.
+
+    """
+
+    def __init__(
+        self,
+        config: DictConfig,
+    ):
+        cache_config = config.get("parsed_file_cache", {})
+        self.enabled = cache_config.get("enabled", False)
+        self.folder = os.path.join(
+            CURRENT_DIRECTORY,
+            "data",
+            cache_config.get("folder", "interim"),
+        )
+
+    def get_or_parse(
+        self,
+        source_files: List[str],
+        config_slice: Dict[str, Any],
+        parse: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Return the cached frame for the inputs, parsing and caching it on a miss.
+
+        Args:
+            source_files (List[str]): The raw data file followed by any auxiliary file that drives the parse.
+            config_slice (Dict[str, Any]): The configuration values that change the parsed result.
+            parse (Callable[[], pd.DataFrame]): The function that parses the raw data file.
+
+        Returns:
+            pd.DataFrame: The parsed DataFrame.
+
+        """
+        if not self.enabled:
+            return parse()
+
+        cache_path = self._get_cache_path(source_files, config_slice)
+        if os.path.exists(cache_path):
+            return self._read(cache_path)
+
+        df = parse()
+        self._write(df, cache_path)
+        return df
+
+    def build_key(
+        self,
+        source_files: List[str],
+        config_slice: Dict[str, Any],
+    ) -> str:
+        """Build the cache key from the content of the files and the configuration slice.
+
+        Args:
+            source_files (List[str]): The files whose content determines the parsed result.
+            config_slice (Dict[str, Any]): The configuration values that change the parsed result.
+
+        Returns:
+            str: The hexadecimal SHA-256 digest.
+
+        Raises:
+            FileNotFoundError: If a source file does not exist.
+
+        """
+        digest = hashlib.sha256()
+        for file_path in source_files:
+            try:
+                with open(file_path, "rb") as file:
+                    digest.update(hashlib.file_digest(file, "sha256").digest())
+            except FileNotFoundError:
+                raise FileNotFoundError(f"File not found: {file_path}")
+        digest.update(json.dumps(self._to_container(config_slice), sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _get_cache_path(
+        self,
+        source_files: List[str],
+        config_slice: Dict[str, Any],
+    ) -> str:
+        """Get the path of the cached frame, named after the raw file and the key."""
+        file_stem = os.path.splitext(os.path.basename(source_files[0]))[0]
+        key = self.build_key(source_files, config_slice)
+        return os.path.join(self.folder, f"{file_stem}-{key[:KEY_LENGTH]}.feather")
+
+    def _read(self, cache_path: str) -> pd.DataFrame:
+        """Memory-map a cached frame and convert it back to pandas."""
+        df = feather.read_table(cache_path, memory_map=True).to_pandas()
+
+        # Arrow nulls come back as None in object columns, while a fresh parse yields NaN
+        object_columns = df.select_dtypes("object").columns
+        df[object_columns] = df[object_columns].where(df[object_columns].notna(), np.nan)
+        return df
+
+    def _write(self, df: pd.DataFrame, cache_path: str):
+        """Write a frame atomically as uncompressed Feather, so it can be memory-mapped."""
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+        self._evict_older_entries(cache_path)
+
+    def _evict_older_entries(self, cache_path: str):
+        """Remove the other cached frames of the raw file, which belong to older contents or settings."""
+        file_stem = os.path.basename(cache_path).rsplit("-", 1)[0]
+        entry_pattern = re.compile(rf"{re.escape(file_stem)}-[0-9a-f]{{{KEY_LENGTH}}}\.feather")
+        for entry_path in glob.glob(os.path.join(glob.escape(self.folder), f"{glob.escape(file_stem)}-*.feather")):
+            if entry_path != cache_path and entry_pattern.fullmatch(os.path.basename(entry_path)):
+                try:
+                    os.remove(entry_path)
+                except FileNotFoundError:
+                    pass  # Already removed by another worker
+
+    @staticmethod
+    def _to_container(value: Any) -> Any:
+        """Convert OmegaConf nodes to plain Python containers for hashing."""
+        if isinstance(value, (DictConfig, ListConfig)):
+            return OmegaConf.to_container(value, resolve=True)
+        if isinstance(value, dict):
+            return {key: ParsedFileCache._to_container(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ParsedFileCache._to_container(item) for item in value]
+        return value
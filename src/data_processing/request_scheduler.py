@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/env python
+
+"""Adaptive scheduling of the requests to the external APIs.
+
+This module defines the `RequestScheduler` class, through which `FrsDataFetcher` and
+`NaicsDataFetcher` send their requests to the FRS (EPA), Census and USAspending APIs. Each host
+gets its own `HostLimiter`, which combines:
+    - AIMD (additive increase, multiplicative decrease) concurrency: the number of concurrent
+      requests grows by about one per window of successful requests and is halved when the host
+      throttles (429), fails (5xx) or times out, within configurable bounds.
+    - A token-bucket rate limit: requests are sent at most at a sustained rate per second, with
+      a configurable burst.
+    - Jittered exponential backoff: throttled or failed requests are retried after a random delay
+      of up to `backoff_base_seconds * 2 ** attempt` (capped, and never shorter than the
+      `Retry-After` header), so the retries of concurrent requests do not arrive together.
+
+The settings are read from `request_scheduler` in the configuration, with optional overrides per
+host. Each process has its own scheduler, so processes that send requests at the same time (e.g.,
+the parallel TRI transformers) get a share of the limits of each host (`split_across_processes`). The number of requests, retries and failures, the effective requests per second and the
+latency percentiles and histogram of each host are exposed by the `stats` property. The latency
+percentiles are also used to hedge slow requests (see `NaicsDataFetcher`).
+
+Classes:
+    HostLimiter: AIMD concurrency window and token bucket of a single host.
+    LatencyHistogram: Response latencies of a single host, as histogram counts and recent samples.
+    RequestScheduler: Sends requests through the limiter of their host, retrying with backoff.
+
+Example:
+    >>> scheduler = RequestScheduler(config)
+    >>> status, data = await scheduler.get_json(session, "https://api.census.gov/data/...")
+    >>> scheduler.stats["api.census.gov"]
+    {'requests': 120, 'retries': 3, 'failures': 0, 'requests_per_second': 15.2, 'concurrency': 8.4, ...}
+
+"""
+
+import asyncio
+import bisect
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from omegaconf import DictConfig, OmegaConf
+
+
+class HostLimiter:
+    """AIMD concurrency window and token-bucket rate limit of a single host.
+
+    Attributes:
+        min_concurrency (int): The lower bound of the concurrency window.
+        max_concurrency (int): The upper bound of the concurrency window.
+        decrease_factor (float): The factor applied to the window when the host throttles or fails.
+        rate_per_second (float): The sustained number of requests per second.
+        burst (float): The maximum number of requests sent at once after an idle period.
+        concurrency (float): The current concurrency window.
+
+    """
+
+    def __init__(
+        self,
+        settings: Dict[str, Any],
+    ):
+        self.min_concurrency = settings["min_concurrency"]
+        self.max_concurrency = settings["max_concurrency"]
+        self.decrease_factor = settings["decrease_factor"]
+        self.rate_per_second = settings["rate_per_second"]
+        self.burst = settings["burst"]
+        self.concurrency = float(min(max(settings["initial_concurrency"], self.min_concurrency), self.max_concurrency))
+        self.in_flight = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot in the concurrency window and for a token of the bucket.
+
+        Returns:
+            float: The time at which the request is sent, used to attribute its outcome.
+
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.concurrency))
+            self.in_flight += 1
+        try:
+            await self._take_token()
+        except asyncio.CancelledError:
+            # A request cancelled while waiting for a token (e.g., that lost a hedge) frees its slot
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+            raise
+        return time.monotonic()
+
+    async def release(
+        self,
+        sent_at: float,
+        is_congested: bool,
+    ):
+        """Free the slot of a finished request and adapt the concurrency window.
+
+        Args:
+            sent_at (float): The time at which the request was sent.
+            is_congested (bool): Whether the host throttled, failed or timed out.
+
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if not is_congested:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            # Requests sent before the last decrease saw the old window, so they do not decrease it again
+            elif sent_at >= self._decreased_at:
+                self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+                self._decreased_at = time.monotonic()
+            self._condition.notify_all()
+
+    async def _take_token(self):
+        """Wait until the token bucket has a token and take it."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+
+class LatencyHistogram:
+    """Response latencies of a single host.
+
+    Every latency is counted in a histogram of fixed buckets for reporting, and the most recent
+    ones are kept to estimate percentiles. Cancelled requests are recorded with the time they
+    waited, a lower bound of their latency (censored), so the percentiles do not only see the
+    requests that were fast enough to finish.
+
+    Attributes:
+        bounds (Tuple[float, ...]): The upper bounds of the histogram buckets, in seconds.
+        count (int): The number of recorded latencies.
+        censored (int): The number of recorded latencies of cancelled requests.
+
+    """
+
+    BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(
+        self,
+        window: int = 1000,
+    ):
+        self.bounds = self.BOUNDS
+        self.count = 0
+        self.censored = 0
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(
+        self,
+        seconds: float,
+        is_censored: bool = False,
+    ):
+        """Record the latency of a response.
+
+        Args:
+            seconds (float): The time from sending the request to reading the response.
+            is_censored (bool): Whether the request was cancelled before the response, so its
+                latency is at least `seconds`.
+
+        """
+        self._counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self._recent.append(seconds)
+        self.count += 1
+        self.censored += is_censored
+
+    def percentile(
+        self,
+        q: float,
+    ) -> Optional[float]:
+        """Estimate a percentile of the recent latencies (nearest rank).
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            Optional[float]: The latency percentile in seconds, or None if nothing is recorded.
+
+        """
+        if not self._recent:
+            return None
+        latencies = sorted(self._recent)
+        return latencies[max(0, math.ceil(q / 100 * len(latencies)) - 1)]
+
+    def buckets(self) -> Dict[str, int]:
+        """Get the number of latencies of each histogram bucket, labeled by its upper bound in seconds."""
+        labels = [f"<={bound:g}s" for bound in self.bounds] + [f">{self.bounds[-1]:g}s"]
+        return dict(zip(labels, self._counts))
+
+
+class RequestScheduler:
+    """Scheduler of the API requests with per-host adaptive concurrency, rate limit and retries.
+
+    Attributes:
+        max_retries (int): The maximum number of retries of a request.
+        backoff_base_seconds (float): The backoff delay cap of the first retry, doubled on each retry.
+        backoff_max_seconds (float): The maximum backoff delay.
+        retry_statuses (Set[int]): The HTTP statuses that are retried (throttling and server errors).
+
+    """
+
+    _DEFAULTS = {
+        "initial_concurrency": 4,
+        "min_concurrency": 1,
+        "max_concurrency": 10,
+        "decrease_factor": 0.5,
+        "rate_per_second": 20,
+        "burst": 10,
+    }
+    _SPLIT_SETTINGS = ["initial_concurrency", "max_concurrency", "rate_per_second", "burst"]
+
+    def __init__(
+        self,
+        config: DictConfig,
+    ):
+        scheduler_config = config.get("request_scheduler", {})
+        self._settings = {key: scheduler_config.get(key, value) for key, value in self._DEFAULTS.items()}
+        self._host_settings = scheduler_config.get("hosts", None) or {}
+        self.max_retries = scheduler_config.get("max_retries", 4)
+        self.backoff_base_seconds = scheduler_config.get("backoff_base_seconds", 0.5)
+        self.backoff_max_seconds = scheduler_config.get("backoff_max_seconds", 30)
+        self.retry_statuses = set(scheduler_config.get("retry_statuses", [429, 500, 502, 503, 504]))
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def split_across_processes(
+        cls,
+        config: DictConfig,
+        n_processes: int,
+    ) -> DictConfig:
+        """Return a copy of the configuration whose per-host limits are shared by several processes.
+
+        Each process has its own scheduler, so the rate, burst and concurrency of each host
+        (including the per-host overrides) are divided by the number of processes that may send
+        requests at the same time, keeping their total within the configured limits.
+
+        Args:
+            config (DictConfig): The configuration object.
+            n_processes (int): The number of processes sending requests at the same time.
+
+        Returns:
+            DictConfig: The configuration of each process.
+
+        """
+        config = OmegaConf.create(OmegaConf.to_container(config))
+        if n_processes <= 1:
+            return config
+
+        scheduler_config = config.get("request_scheduler") or OmegaConf.create({})
+        host_settings = (scheduler_config.get("hosts") or {}).values()
+        for settings, defaults in [(scheduler_config, cls._DEFAULTS), *[(host, {}) for host in host_settings]]:
+            for key in cls._SPLIT_SETTINGS:
+                value = settings.get(key, defaults.get(key))
+                if value is None:
+                    continue
+                settings[key] = value / n_processes if key == "rate_per_second" else max(1, value // n_processes)
+            if "max_concurrency" in settings:
+                settings["min_concurrency"] = min(
+                    settings.get("min_concurrency", cls._DEFAULTS["min_concurrency"]), settings["max_concurrency"]
+                )
+        config["request_scheduler"] = scheduler_config
+        return config
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the request statistics of each host.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: For each host, the number of requests (including retries), retries
+                and failed requests (after the last retry), the effective requests per second while the
+                host had pending requests, the current concurrency window, the 50th, 90th and 99th
+                latency percentiles in seconds, the number of censored latencies (cancelled requests) and
+                the latency histogram.
+
+        """
+        stats = {}
+        for host, host_stats in self._stats.items():
+            elapsed = host_stats["busy_seconds"]
+            if host_stats["pending"]:
+                elapsed += time.monotonic() - host_stats["busy_since"]
+            stats[host] = {
+                "requests": host_stats["requests"],
+                "retries": host_stats["retries"],
+                "failures": host_stats["failures"],
+                "requests_per_second": host_stats["requests"] / elapsed if elapsed > 0 else 0.0,
+                "concurrency": self._limiters[host].concurrency,
+                "latency_p50": self._latencies[host].percentile(50),
+                "latency_p90": self._latencies[host].percentile(90),
+                "latency_p99": self._latencies[host].percentile(99),
+                "latency_censored": self._latencies[host].censored,
+                "latency_histogram": self._latencies[host].buckets(),
+            }
+        return stats
+
+    def latency_percentile(
+        self,
+        url: str,
+        q: float,
+        min_samples: int = 1,
+    ) -> Optional[float]:
+        """Estimate a percentile of the recent response latencies of the host of a URL.
+
+        Args:
+            url (str): A URL of the host.
+            q (float): The percentile, between 0 and 100.
+            min_samples (int): The minimum number of recorded latencies for an estimate.
+
+        Returns:
+            Optional[float]: The latency percentile in seconds, or None if there are fewer samples.
+
+        """
+        latencies = self._latencies.get(urlsplit(url).hostname or "")
+        if latencies is None or latencies.count < min_samples:
+            return None
+        return latencies.percentile(q)
+
+    def _get_limiter(self, host: str) -> HostLimiter:
+        """Return the limiter of a host, creating it with the host's settings on first use."""
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter({**self._settings, **self._host_settings.get(host, {})})
+            self._latencies[host] = LatencyHistogram()
+            self._stats[host] = dict.fromkeys(["requests", "retries", "failures", "pending", "busy_since", "busy_seconds"], 0)
+        return self._limiters[host]
+
+    def _start_pending(self, host_stats: Dict[str, Any]):
+        """Count a pending request of a host, starting a busy period if it is the only one."""
+        if host_stats["pending"] == 0:
+            host_stats["busy_since"] = time.monotonic()
+        host_stats["pending"] += 1
+
+    def _end_pending(self, host_stats: Dict[str, Any]):
+        """Count a finished request of a host, ending the busy period if it was the last one."""
+        host_stats["pending"] -= 1
+        if host_stats["pending"] == 0:
+            host_stats["busy_seconds"] += time.monotonic() - host_stats["busy_since"]
+
+    def _backoff_delay(
+        self,
+        attempt: int,
+        retry_after: Optional[str],
+    ) -> float:
+        """Return the jittered exponential backoff delay before a retry, honoring `Retry-After` seconds."""
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt))
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, min(self.backoff_max_seconds, float(retry_after)))
+        return delay
+
+    async def get_json(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        sent: Optional[asyncio.Event] = None,
+    ) -> Tuple[int, Any]:
+        """Send a GET request through the limiter of its host and return the status and JSON body.
+
+        Throttled (e.g., 429), failed (e.g., 503) and timed out requests are retried with jittered
+        exponential backoff. Other statuses are returned as they are.
+
+        Args:
+            session (aiohttp.ClientSession): The shared aiohttp session.
+            url (str): The URL of the request.
+            sent (Optional[asyncio.Event]): An event set when the request leaves the queue of its host,
+                e.g., to time its latency without the wait for a slot.
+
+        Returns:
+            Tuple[int, Any]: The HTTP status of the last attempt and the JSON body, or None if the
+                status is not 200.
+
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: If the last attempt fails without a response.
+
+        """
+        host = urlsplit(url).hostname or ""
+        limiter = self._get_limiter(host)
+        host_stats = self._stats[host]
+        self._start_pending(host_stats)
+        try:
+            return await self._get_json_with_retries(session, url, limiter, self._latencies[host], host_stats, sent)
+        finally:
+            self._end_pending(host_stats)
+
+    async def _get_json_with_retries(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        limiter: HostLimiter,
+        latencies: LatencyHistogram,
+        host_stats: Dict[str, Any],
+        sent: Optional[asyncio.Event] = None,
+    ) -> Tuple[int, Any]:
+        """Send the request until it is not throttled or failed, or the retries are exhausted."""
+        status, data, error = 0, None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                host_stats["retries"] += 1
+            sent_at = await limiter.acquire()
+            host_stats["requests"] += 1
+            if sent is not None:
+                sent.set()
+            status, data, retry_after, error = 0, None, None, None
+            is_congested = True
+            try:
+                async with session.get(url) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    if status == 200:
+                        data = await response.json()
+                latencies.record(time.monotonic() - sent_at)
+            except asyncio.CancelledError:
+                # A cancelled request (e.g., that lost a hedge) is not a sign of congestion
+                latencies.record(time.monotonic() - sent_at, is_censored=True)
+                is_congested = False
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+                error = exception
+            else:
+                is_congested = status in self.retry_statuses
+            finally:
+                await limiter.release(sent_at, is_congested)
+
+            if not is_congested:
+                return status, data
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        host_stats["failures"] += 1
+        if error is not None:
+            raise error
+        return status, data
@@ -12,28 +12,28 @@ Classes:
         chemical activities, plastic additives, release management types, and records.
 
 Methods:
-    __init__(self, config: DictConfig, session: Session): Initializes the TriDataLoader class.
+    __init__(self, config: DictConfig, session: Session, identity_map: Optional[DimensionIdentityMap] = None):
+        Initializes the TriDataLoader class, with the identity map shared with the CDR loader, if any.
     load_chemical_activity(self): Loads chemical activities into the database.
     load_plastic_additives(self): Loads plastic additives into the database.
     load_release_management_type(self, df: pd.DataFrame, table_name: str): Loads release and
         management types into the database from a DataFrame.
     merge_with_1b(self, df_main: pd.DataFrame) -> pd.DataFrame: Merges main DataFrame with
         filtered 1b data on 'trifid' and 'tri_chem_id'.
-    get_inserted_record_ids(self, records_df: pd.DataFrame, eol_name_list: List[str]) -> pd.DataFrame:
-        Retrieves record IDs from the database and merges them with the original DataFrame.
+    merge_record_ids(df: pd.DataFrame, records_df: pd.DataFrame) -> pd.DataFrame:
+        Merges a DataFrame with the IDs of the inserted records on 'trifid' and 'tri_chem_id'.
     load_records(self, df: pd.DataFrame, record_type: str, handler_columns: Optional[Tuple[str, str]] = None):
-        Loads records into the Record table based on the type and enriched DataFrame.
-    _get_waste_handler_industry_sector_id(self, off_site_naics_code: Union[str, None], off_site_naics_title: Union[str, None]) -> Optional[int]:
-        Fetches or creates an IndustrySector for the waste handler and returns its ID.
-    _get_end_of_life_activity_id(self, eol_name: Union[str, None]) -> Optional[int]: Fetches
-        or creates an EndOfLifeActivity and returns its ID if record type is management.
-    _get_release_type_id(self, eol_name: Union[str, None]) -> Optional[int]: Fetches or creates
-        a ReleaseType and returns its ID if record type is release.
+        Loads records into the Record table based on the type and enriched DataFrame. The record
+        IDs are assigned by the loader, so the chemical activities are linked without a read-back.
+    resolve_record_ids(self, records_df: pd.DataFrame, record_type: str, handler_columns: Optional[Tuple[str, str]] = None)
+        -> pd.DataFrame: Adds the IDs of the additives, industry sectors and end-of-life activities
+        or release types of the records by merging them with tables of IDs, with no per-row Python work.
     _load_record_chemical_activity(self, df: pd.DataFrame): Loads associations between records
         and chemical activities using a DataFrame.
     load_all_records(self, transformer_1a, transformer_3a, transformer_3c): Loads records from
         different transformers into the Record table after merging with 1b.
-    set_1b(self, df: pd.DataFrame): Sets the 1b DataFrame for use in merging and enrichment.
+    set_1b(self, df: pd.DataFrame): Sets the 1b DataFrame (one chemical activity bitmask per
+        'trifid' and 'tri_chem_id') for use in merging and enrichment.
 
 Usage:
     This module can be run independently for smoke testing purposes. When executed directly,
@@ -49,7 +49,7 @@ Example:
 
 """
 
-from typing import Dict, List, Optional, Tuple, Union
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from omegaconf import DictConfig
@@ -62,8 +62,11 @@ from src.data_processing.data_models import (
     ChemicalActivity,
     EndOfLifeActivity,
     IndustrySector,
+    Record,
     ReleaseType,
 )
+from src.data_processing.identity_map import DimensionIdentityMap
+from src.data_processing.tri.utils import TriDataHelper
 
 
 class TriDataLoader(BaseDataLoader):
@@ -79,13 +82,19 @@ class TriDataLoader(BaseDataLoader):
         self,
         config: DictConfig,
         session: Session,
+        identity_map: Optional[DimensionIdentityMap] = None,
     ):
-        super().__init__(config, session)
-        self.cache_additive_id: Dict[Tuple, int] = {}
-        self.cache_industry_sector_id: Dict[Tuple, int] = {}
-        self.cache_end_of_life_activity_id: Dict[Tuple, int] = {}
-        self.cache_release_type_id: Dict[Tuple, int] = {}
-        self.cache_chemical_activity_id: Dict[Tuple, int] = {}
+        super().__init__(config, session, identity_map)
+
+    @property
+    def activity_mask_name(self) -> str:
+        """Get the name of the 1b column with the chemical activity bitmasks."""
+        return self.config.tri_files.file_1b.mask_name
+
+    @property
+    def chemical_activity_names(self) -> List[str]:
+        """Get the chemical activity names in the bit order of the 1b activity bitmasks."""
+        return [col["name"] for col in self.config.tri_files.file_1b.needed_columns if "is_general_info" not in col]
 
     def load_chemical_activity(self):
         """Load chemical activities into the database."""
@@ -156,64 +165,32 @@ class TriDataLoader(BaseDataLoader):
         self,
         df_main: pd.DataFrame,
     ) -> pd.DataFrame:
-        """Merge main DataFrame with filtered 1b data on 'trifid' and 'tri_chem_id'."""
-        # Merge main DataFrame with filtered 1b on 'trifid'
-        df_enriched = df_main.merge(
+        """Merge main DataFrame with filtered 1b data on 'trifid' and 'tri_chem_id'.
+
+        The 1b data holds one chemical activity bitmask per 'trifid' and 'tri_chem_id', so the
+        merge adds a single column without repeating the rows of the main DataFrame.
+        """
+        # Shared categories let the merge join on the integer codes
+        df_main, df_1b = TriDataHelper.unify_categories(
+            df_main,
             self.df_1b[
                 [
                     "trifid",
                     "tri_chem_id",
-                    "chemical_activity",
-                    "is_performed",
+                    self.activity_mask_name,
                 ]
             ],
+            ["trifid", "tri_chem_id"],
+        )
+
+        # Merge main DataFrame with filtered 1b on 'trifid'
+        df_enriched = df_main.merge(
+            df_1b,
             on=["trifid", "tri_chem_id"],
             how="left",  # Keep all rows in the main DataFrame
         )
         return df_enriched
 
-    def get_inserted_record_ids(
-        self,
-        records_df: pd.DataFrame,
-        eol_name_list: List[str],
-    ) -> pd.DataFrame:
-        """Fetch the record IDs from the database and merge them with the original DataFrame."""
-        sql_query = text(
-            """
-            SELECT record.id AS record_id,
-                record.trifid,
-                additive.tri_chemical_id AS tri_chem_id,
-                end_of_life_activity.name AS management_name,
-                release_type.name AS release_name
-            FROM record
-            LEFT JOIN additive ON record.additive_id = additive.id
-            LEFT JOIN end_of_life_activity ON record.end_of_life_activity_id = end_of_life_activity.id
-            LEFT JOIN release_type ON record.release_type_id = release_type.id
-        """
-        )
-        inserted_records = pd.read_sql(
-            sql_query,
-            con=self.session.get_bind(),
-        )
-        inserted_records = inserted_records[
-            (inserted_records["management_name"].isin(eol_name_list)) | (inserted_records["release_name"].isin(eol_name_list))
-        ]
-        inserted_records.drop(
-            columns=["management_name", "release_name"],
-            inplace=True,
-        )
-
-        merged_df = records_df.merge(
-            inserted_records,
-            on=[
-                "trifid",
-                "tri_chem_id",
-            ],
-            how="left",
-        )
-
-        return merged_df
-
     def load_records(
         self,
         df: pd.DataFrame,
@@ -225,70 +202,10 @@ class TriDataLoader(BaseDataLoader):
         if handler_columns:
             columns_needed.extend(handler_columns)
 
-        eol_name_list = df["eol_name"].unique().tolist()
-        records_df = df[columns_needed].drop_duplicates()
+        # The ids are resolved once per observed category
+        records_df = TriDataHelper.remove_unused_categories(df[columns_needed].drop_duplicates())
 
-        records_df["additive_id"] = records_df["tri_chem_id"].apply(
-            lambda row: self._cache_get_or_create(
-                self.cache_additive_id,
-                self._get_additive_id,
-                tri_chem_id=row,
-            ),
-        )
-        records_df["waste_generator_industry_sector_id"] = records_df.apply(
-            lambda row: self._cache_get_or_create(
-                self.cache_industry_sector_id,
-                self._get_industry_sector_id,
-                **{
-                    "naics_code": row["naics_code"],
-                    "naics_title": row["naics_title"],
-                },
-            ),
-            axis=1,
-        )
-        if handler_columns:
-            records_df["waste_handler_industry_sector_id"] = records_df.apply(
-                lambda row: (
-                    self._cache_get_or_create(
-                        self.cache_industry_sector_id,
-                        self._get_waste_handler_industry_sector_id,
-                        **{col: row[col] for col in handler_columns},
-                    )
-                    if all(pd.notnull(row[col]) for col in handler_columns)
-                    else None
-                ),  # type: ignore [reportCallIssue]
-                axis=1,
-            )
-        else:
-            records_df["waste_handler_industry_sector_id"] = None
-        records_df["end_of_life_activity_id"] = (
-            records_df.apply(
-                lambda row: self._cache_get_or_create(
-                    self.cache_end_of_life_activity_id,
-                    self._get_end_of_life_activity_id,
-                    **{
-                        "eol_name": row["eol_name"],
-                    },
-                ),
-                axis=1,
-            )
-            if record_type == "management"
-            else None
-        )
-        records_df["release_type_id"] = (
-            records_df.apply(
-                lambda row: self._cache_get_or_create(
-                    self.cache_release_type_id,
-                    self._get_release_type_id,
-                    **{
-                        "eol_name": row["eol_name"],
-                    },
-                ),
-                axis=1,
-            )
-            if record_type == "release"
-            else None
-        )
+        records_df = self.resolve_record_ids(records_df, record_type, handler_columns)
 
         record_columns = [
             "additive_id",
@@ -299,95 +216,139 @@ class TriDataLoader(BaseDataLoader):
             "release_type_id",
             "waste_handler_industry_sector_id",
         ]
-        insert_df = records_df[record_columns].drop_duplicates()
-
-        insert_df.to_sql(
-            name="record",
-            con=self.session.get_bind(),
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=200,
+        # The record ids are assigned here, so the chemical activities are linked without reading the records back
+        insert_df = records_df[[*record_columns, "tri_chem_id"]].drop_duplicates(subset=record_columns)
+        insert_df["id"] = self.allocate_ids(Record, len(insert_df))
+
+        self.bulk_writer.write("record", insert_df[["id", *record_columns]])
+
+        df_activity = df[["trifid", "tri_chem_id", self.activity_mask_name]].drop_duplicates()
+        df_activity = self.merge_record_ids(df_activity, insert_df)[["record_id", self.activity_mask_name]]
+        df_activity = TriDataHelper.expand_bitmask(
+            df_activity,
+            self.activity_mask_name,
+            self.chemical_activity_names,
+            "chemical_activity",
         )
-
-        df_activity = df[["trifid", "tri_chem_id", "chemical_activity", "is_performed"]].drop_duplicates()
-        df_activity = self.get_inserted_record_ids(df_activity, eol_name_list)[
-            ["record_id", "chemical_activity", "is_performed"]
-        ]
         df_activity.drop_duplicates(inplace=True)
 
         self._load_record_chemical_activity(df_activity)
 
         self.session.commit()
 
-    def _get_waste_handler_industry_sector_id(
-        self,
-        off_site_naics_code: Union[str, None],
-        off_site_naics_title: Union[str, None],
-    ):
-        """Fetch or create IndustrySector for the waste handler and return its id."""
-        if off_site_naics_code and off_site_naics_title:
-            sector = self.get_or_create(
-                IndustrySector,
-                naics_code=off_site_naics_code,
-                naics_title=off_site_naics_title,
-            )
-            if sector:
-                return sector.id
-        return None
+    @staticmethod
+    def merge_record_ids(
+        df: pd.DataFrame,
+        records_df: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """Add the ids of the inserted records of each 'trifid' and 'tri_chem_id' to a DataFrame.
 
-    def _get_end_of_life_activity_id(
-        self,
-        eol_name: Union[str, None],
-    ):
-        """Fetch or create EndOfLifeActivity and return its id if record_type is management."""
-        if eol_name:
-            activity = self.session.query(EndOfLifeActivity).filter_by(name=eol_name).first()
-            if activity:
-                return activity.id
-        return None
-
-    def _get_release_type_id(
+        Args:
+            df (pd.DataFrame): The DataFrame with the 'trifid' and 'tri_chem_id' columns.
+            records_df (pd.DataFrame): The inserted records, with their `id`, 'trifid' and 'tri_chem_id'.
+
+        Returns:
+            pd.DataFrame: One row per row of the DataFrame and matching record, with its `record_id`.
+
+        """
+        record_ids = records_df[["id", "trifid", "tri_chem_id"]].rename(columns={"id": "record_id"})
+        # Shared categories let the merge join on the integer codes
+        df, record_ids = TriDataHelper.unify_categories(df, record_ids, ["trifid", "tri_chem_id"])
+        return df.merge(
+            record_ids,
+            on=["trifid", "tri_chem_id"],
+            how="left",
+        )
+
+    def resolve_record_ids(
         self,
-        eol_name: Union[str, None],
-    ):
-        """Fetch or create ReleaseType and return its id if record_type is release."""
-        if eol_name:
-            release_type = self.session.query(ReleaseType).filter_by(name=eol_name).first()
-            if release_type:
-                return release_type.id
-        return None
+        records_df: pd.DataFrame,
+        record_type: str,
+        handler_columns: Optional[Tuple[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Add the IDs of the additive, industry sectors and end-of-life activity or release type of each record.
 
-    def _load_record_chemical_activity(self, df: pd.DataFrame):
-        """Loading of record-chemical activity associations using apply."""
-        # Filter the DataFrame for relevant rows where 'is_performed' is 'Yes'
-        filtered_df = df[(pd.notnull(df["chemical_activity"])) & (df["is_performed"] == "Yes")][
-            ["record_id", "chemical_activity"]
-        ].drop_duplicates()
-
-        # Apply the caching method to get chemical activity IDs
-        filtered_df["chemical_activity_id"] = filtered_df["chemical_activity"].apply(
-            lambda activity: self._cache_get_or_create(
-                self.cache_chemical_activity_id,
-                self.get_or_create,
-                **{
-                    "model": ChemicalActivity,
-                    "name": activity,
-                },
+        The distinct keys of each table are resolved at once and the IDs are merged back into the
+        records. Rows with a missing key (e.g., a handler without NAICS code) get no ID.
+
+        Args:
+            records_df (pd.DataFrame): The records, with the `tri_chem_id`, `naics_code`, `naics_title`
+                and `eol_name` columns and, optionally, the handler columns.
+            record_type (str): The type of the records, `management` or `release`.
+            handler_columns (Optional[Tuple[str, str]]): The NAICS code and title columns of the waste handler.
+
+        Returns:
+            pd.DataFrame: The records with the ID columns of the Record table.
+
+        """
+        records_df["additive_id"] = self.get_or_create_ids(
+            records_df,
+            Additive,
+            {"tri_chem_id": "tri_chemical_id"},
+            create=False,
+        )
+        # The generators and handlers share the industry sector table, resolved in a single lookup
+        sector_columns = {"naics_code": "naics_code", "naics_title": "naics_title"}
+        sector_keys = [records_df[list(sector_columns)].rename(columns=sector_columns)]
+        if handler_columns:
+            handler_sector_columns = dict(zip(handler_columns, sector_columns.values()))
+            sector_keys.append(records_df[list(handler_sector_columns)].rename(columns=handler_sector_columns))
+        sector_ids = self.get_id_table(IndustrySector, pd.concat(sector_keys, ignore_index=True).drop_duplicates())
+        records_df["waste_generator_industry_sector_id"] = self.merge_ids(
+            records_df.rename(columns=sector_columns),
+            sector_ids,
+            list(sector_columns.values()),
+        )
+        if handler_columns:
+            records_df["waste_handler_industry_sector_id"] = self.merge_ids(
+                records_df.drop(columns=list(sector_columns)).rename(columns=handler_sector_columns),
+                sector_ids,
+                list(sector_columns.values()),
             )
+        else:
+            records_df["waste_handler_industry_sector_id"] = None
+        records_df["end_of_life_activity_id"] = (
+            self.get_or_create_ids(
+                records_df,
+                EndOfLifeActivity,
+                {"eol_name": "name"},
+                create=False,
+            )
+            if record_type == "management"
+            else None
+        )
+        records_df["release_type_id"] = (
+            self.get_or_create_ids(
+                records_df,
+                ReleaseType,
+                {"eol_name": "name"},
+                create=False,
+            )
+            if record_type == "release"
+            else None
+        )
+        return records_df
+
+    def _load_record_chemical_activity(self, df: pd.DataFrame):
+        """Load the record-chemical activity associations.
+
+        Args:
+            df (pd.DataFrame): One row per record and performed chemical activity, as expanded
+                from the 1b activity bitmasks.
+
+        """
+        filtered_df = df[["record_id", "chemical_activity"]].drop_duplicates()
+        filtered_df = TriDataHelper.remove_unused_categories(filtered_df)
+
+        filtered_df["chemical_activity_id"] = self.get_or_create_ids(
+            filtered_df,
+            ChemicalActivity,
+            {"chemical_activity": "name"},
         )
 
         association_df = filtered_df[["record_id", "chemical_activity_id"]]
 
-        if not association_df.empty:
-            association_df.to_sql(
-                name="record_chemical_activity",
-                con=self.session.get_bind(),
-                if_exists="append",
-                index=False,
-                method="multi",
-                chunksize=200,
-            )
+        self.bulk_writer.write("record_chemical_activity", association_df)
 
     def load_all_records(
         self,
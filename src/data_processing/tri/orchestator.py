@@ -11,6 +11,8 @@ database for further analysis.
 Classes:
     - TriOrchestator: A class for coordinating the end-to-end processing of TRI data files,
       including loading, transforming, and storing data in the database.
+    - TriTransformerOutput: The output frames of a transformer, sent back from a worker process
+      when the files are transformed in parallel.
 
 Modules Imported:
     - DictConfig: Used for handling configuration settings.
@@ -26,27 +28,101 @@ Functionality:
     - Manages and releases data using helper methods for different TRI data file types.
 
 Methods:
-    - `__init__`: Initializes the `TriOrchestator` class with a specified year and configuration.
+    - `__init__`: Initializes the `TriOrchestator` class with a specified year and configuration,
+      and the identity map of the dimension tables shared with the CDR loader, if any.
     - `process_file`: A helper method that processes a specific TRI data file using a transformer class.
     - `process_1b`: Processes the TRI 1B data file.
     - `process_1a`: Processes the TRI 1A data file.
     - `process_3a`: Processes the TRI 3A data file.
     - `process_3c`: Processes the TRI 3C data file.
+    - `process_all_files`: Processes the four TRI data files, in parallel worker processes when
+      `tri_files.max_workers` is greater than 1.
+    - `prefetch_facility_naics_titles`: Looks up the titles of the facility NAICS codes of the 1A, 3A
+      and 3C files at once, before the files are processed (`tri_files.prefetch_facility_naics`).
     - `run`: Coordinates the overall data processing workflow, loading data into the database
-      and handling specific data transformations and loading tasks.
+      and handling specific data transformations and loading tasks. The shared HTTP client of the
+      API fetchers is closed once the files are transformed.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
 
+import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.create_sqlite_db import create_database
+from src.data_processing.http_client import SharedHttpClient
+from src.data_processing.identity_map import DimensionIdentityMap
+from src.data_processing.naics_api_queries import NaicsDataFetcher
 from src.data_processing.tri.load.load import TriDataLoader
+from src.data_processing.tri.transform.base import (
+    TriFileBaseTransformer,
+    TriFileNumericalTransformer,
+)
 from src.data_processing.tri.transform.file_1a import TriFile1aTransformer
 from src.data_processing.tri.transform.file_1b import TriFile1bTransformer
 from src.data_processing.tri.transform.file_3a import TriFile3aTransformer
 from src.data_processing.tri.transform.file_3c import TriFile3cTransformer
 
 
+class TriTransformerOutput:
+    """Output frames of a TRI file transformer.
+
+    Only the frames used by the loader are kept, so the output of a worker process can be
+    pickled back without the transformer, its fetchers and its intermediate data.
+
+    Attributes:
+        data (pd.DataFrame): The processed data of the file.
+        df_releases (Optional[pd.DataFrame]): The release records, if the file has any.
+        df_management (Optional[pd.DataFrame]): The management records, if the file has any.
+        management_data (Optional[pd.DataFrame]): The end of life activities of the file.
+        release_data (Optional[pd.DataFrame]): The release types of the file.
+
+    """
+
+    def __init__(
+        self,
+        transformer: TriFileBaseTransformer,
+    ):
+        self.data = transformer.data
+        self.df_releases = getattr(transformer, "df_releases", None)
+        self.df_management = getattr(transformer, "df_management", None)
+        is_numerical = isinstance(transformer, TriFileNumericalTransformer)
+        self.management_data = transformer.management_data if is_numerical else None
+        self.release_data = transformer.release_data if is_numerical else None
+
+
+def _select_file_data(
+    file_name: str,
+    transformer_class: Type[TriFileNumericalTransformer],
+    config: DictConfig,
+) -> Tuple[List[str], pd.DataFrame]:
+    """Load and select the data of a TRI data file in a worker process and return its facility NAICS codes and data."""
+    transformer = transformer_class(file_name, config)  # type: ignore [reportCallIssue]
+    return transformer.get_facility_naics_codes(), transformer.data
+
+
+def _transform_file(
+    file_name: str,
+    transformer_class: Type[TriFileBaseTransformer],
+    config: DictConfig,
+    facility_naics_titles: Optional[pd.DataFrame] = None,
+    data: Optional[pd.DataFrame] = None,
+) -> TriTransformerOutput:
+    """Process a TRI data file, or its already selected data, in a worker process and return its output frames."""
+    try:
+        if data is None:
+            transformer = transformer_class(file_name, config)  # type: ignore [reportCallIssue]
+        else:
+            transformer = transformer_class(file_name, config, data)  # type: ignore [reportCallIssue]
+        if isinstance(transformer, TriFileNumericalTransformer):
+            transformer.facility_naics_titles = facility_naics_titles
+        transformer.process()  # type: ignore [reportAttributeAccessIssue]
+        return TriTransformerOutput(transformer)
+    finally:
+        SharedHttpClient.close_instance()
+
+
 class TriOrchestator:
     """Class for orchestrating the transformation of TRI data files."""
 
@@ -54,6 +130,7 @@ class TriOrchestator:
         self,
         year: int,
         config: DictConfig,
+        identity_map: Optional[DimensionIdentityMap] = None,
     ):
         self.year = year
         self.config = config
@@ -61,8 +138,43 @@ class TriOrchestator:
         self.tri_db_loader = TriDataLoader(
             config=self.config,
             session=self.session,
+            identity_map=identity_map,
         )
         self._generic_file_name = "US_{file_type}_{year}.txt"
+        self._transformer_classes = {
+            "1b": TriFile1bTransformer,
+            "1a": TriFile1aTransformer,
+            "3a": TriFile3aTransformer,
+            "3c": TriFile3cTransformer,
+        }
+
+    @property
+    def max_workers(self) -> int:
+        """Get the number of worker processes for the transformers ('max_workers' in the configuration).
+
+        Returns:
+            int: The number of worker processes, 1 (sequential) if it is not set in the configuration.
+
+        """
+        return self.config.tri_files.get("max_workers") or 1
+
+    @property
+    def is_prefetch_facility_naics(self) -> bool:
+        """Get whether the facility NAICS titles are looked up once for all the files ('prefetch_facility_naics').
+
+        Returns:
+            bool: True if the titles are prefetched, which is the default.
+
+        """
+        return self.config.tri_files.get("prefetch_facility_naics", True)
+
+    def _get_file_name(self, file_type: str) -> str:
+        """Get the name of the TRI data file of a file type."""
+        return self._generic_file_name.format(file_type=file_type, year=self.year)
+
+    def _is_numerical(self, file_type: str) -> bool:
+        """Get whether the file type has facility NAICS codes (1A, 3A and 3C)."""
+        return issubclass(self._transformer_classes[file_type], TriFileNumericalTransformer)
 
     def process_file(self, file_type, transformer_class):
         """Helper method to process a TRI data file based on file type."""
@@ -76,6 +188,113 @@ class TriOrchestator:
         transformer.process()
         return transformer
 
+    def prefetch_facility_naics_titles(
+        self,
+        naics_codes: Iterable[str],
+    ) -> pd.DataFrame:
+        """Look up the titles of the facility NAICS codes of all the files at once.
+
+        Args:
+            naics_codes (Iterable[str]): The facility NAICS codes, possibly repeated across files.
+
+        Returns:
+            pd.DataFrame: A DataFrame containing `naics_code` and `naics_title`.
+
+        """
+        unique_naics_codes = pd.DataFrame({"naics_code": list(dict.fromkeys(naics_codes))})
+        return NaicsDataFetcher(self.config).process_naics_codes(unique_naics_codes, "naics_code")
+
+    def process_all_files(self) -> Dict[str, Union[TriFileBaseTransformer, TriTransformerOutput]]:
+        """Process the 1B, 1A, 3A and 3C data files.
+
+        The files do not share state, so with more than one worker each transformer runs in its
+        own process and only its output frames are sent back. The workers have their own HTTP
+        clients, so each one gets an equal share of the request limits of each host. Otherwise,
+        they run one after another in this process.
+
+        When the facility NAICS titles are prefetched, the files are loaded first, the union of
+        their facility NAICS codes is looked up at once and the titles are passed to each
+        transformer. Each file is read and filtered only once: the workers send back the selected
+        data of the plastic additives with the codes, and it is processed without loading the file
+        again. Without workers, the data of each file is selected right after it is loaded, so only
+        one raw file is in memory at a time.
+
+        Returns:
+            Dict[str, Union[TriFileBaseTransformer, TriTransformerOutput]]: The processed transformer, or
+                its output frames, for each file type.
+
+        """
+        if self.max_workers <= 1:
+            return self._process_all_files_sequentially()
+
+        n_workers = min(self.max_workers, len(self._transformer_classes))
+        # Each worker has its own HTTP client, so the request limits of each host are shared among them
+        worker_config = SharedHttpClient.worker_config(self.config, n_workers)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            facility_naics_titles = None
+            selected_data: Dict[str, pd.DataFrame] = {}
+            futures = {}
+            if self.is_prefetch_facility_naics:
+                # The 1B file has no NAICS codes, so it is processed while the codes are collected
+                futures = {
+                    file_type: executor.submit(
+                        _transform_file, self._get_file_name(file_type), transformer_class, worker_config
+                    )
+                    for file_type, transformer_class in self._transformer_classes.items()
+                    if not self._is_numerical(file_type)
+                }
+                selection_futures = {
+                    file_type: executor.submit(
+                        _select_file_data, self._get_file_name(file_type), transformer_class, worker_config
+                    )
+                    for file_type, transformer_class in self._transformer_classes.items()
+                    if self._is_numerical(file_type)
+                }
+                selections = {file_type: future.result() for file_type, future in selection_futures.items()}
+                facility_naics_titles = self.prefetch_facility_naics_titles(
+                    naics_code for naics_codes, _ in selections.values() for naics_code in naics_codes
+                )
+                selected_data = {file_type: data for file_type, (_, data) in selections.items()}
+                del selections
+
+            for file_type, transformer_class in self._transformer_classes.items():
+                if file_type not in futures:
+                    futures[file_type] = executor.submit(
+                        _transform_file,
+                        self._get_file_name(file_type),
+                        transformer_class,
+                        worker_config,
+                        facility_naics_titles if self._is_numerical(file_type) else None,
+                        selected_data.get(file_type),
+                    )
+            return {file_type: futures[file_type].result() for file_type in self._transformer_classes}
+
+    def _process_all_files_sequentially(self) -> Dict[str, Union[TriFileBaseTransformer, TriTransformerOutput]]:
+        """Process the data files one after another in this process."""
+        if not self.is_prefetch_facility_naics:
+            return {
+                file_type: self.process_file(file_type, transformer_class)
+                for file_type, transformer_class in self._transformer_classes.items()
+            }
+
+        transformers = {}
+        for file_type, transformer_class in self._transformer_classes.items():
+            transformer = transformer_class(self._get_file_name(file_type), self.config)
+            # The raw data is released before the next file is loaded
+            transformer.select_desired_data()
+            transformers[file_type] = transformer
+        numerical_transformers = [
+            transformer for transformer in transformers.values() if isinstance(transformer, TriFileNumericalTransformer)
+        ]
+        facility_naics_titles = self.prefetch_facility_naics_titles(
+            naics_code for transformer in numerical_transformers for naics_code in transformer.get_facility_naics_codes()
+        )
+        for transformer in transformers.values():
+            if isinstance(transformer, TriFileNumericalTransformer):
+                transformer.facility_naics_titles = facility_naics_titles
+            transformer.process()  # type: ignore [reportAttributeAccessIssue]
+        return transformers
+
     def process_1b(self):
         """Process the TRI 1B data file."""
         return self.process_file("1b", TriFile1bTransformer)
@@ -97,12 +316,10 @@ class TriOrchestator:
         self.tri_db_loader.load_chemical_activity()
         self.tri_db_loader.load_plastic_additives()
 
-        transformers = {
-            "1b": self.process_1b(),
-            "1a": self.process_1a(),
-            "3a": self.process_3a(),
-            "3c": self.process_3c(),
-        }
+        try:
+            transformers = self.process_all_files()
+        finally:
+            SharedHttpClient.close_instance()
 
         # Load management and release data as applicable
         for file_type, transformer in transformers.items():
@@ -20,15 +20,23 @@ Attributes:
     CURRENT_DIRECTORY (str): Stores the current working directory path.
 
 Methods:
-    __init__(file_name: str, file_type: str, config: DictConfig): Initializes the transformer with
-        the specified file name, file type, and configuration settings.
-    load_data(file_name: str) -> pd.DataFrame: Loads TRI data from a text file.
+    __init__(file_name: str, file_type: str, config: DictConfig, data: Optional[pd.DataFrame] = None):
+        Initializes the transformer with the specified file name, file type, and configuration settings.
+        The file is not loaded when its already selected data is given.
+    load_data(file_name: str) -> pd.DataFrame: Loads the needed columns of a TRI data file with
+        the dtypes set in the configuration, streaming it in chunks when 'chunksize' is set and
+        reusing the parsed frame cached under data/interim when available.
+    select_desired_data(): Keeps only the needed columns and the rows of the plastic additives, once.
     prepare_unpivot_columns() -> pd.DataFrame: Unpivots the data for standardized long format.
+    unpivot_amounts(): Unpivots the amounts in kilograms, skipping zero and missing amounts unless
+        'sparse_unpivot' is disabled in the configuration.
     fill_missing_values(): Fills NaN values in specific columns with zeros.
     separate_releases_and_management() -> Tuple[pd.DataFrame, pd.DataFrame]: Separates data into release
         and management subsets based on configuration.
     organize_management_dataframe(df_management: pd.DataFrame) -> pd.DataFrame: Organizes and formats
         management data column names for analysis.
+    get_facility_naics_codes() -> List[str]: Gets the facility NAICS codes of the plastic additives, so
+        their titles can be looked up once for several files and set in 'facility_naics_titles'.
 
 Usage Example:
     ```
@@ -53,12 +61,13 @@ Notes:
 """
 
 import os
-from typing import Dict, List, Tuple, cast
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.naics_api_queries import NaicsDataFetcher
+from src.data_processing.parsed_file_cache import ParsedFileCache
 from src.data_processing.tri.utils import ConversionFactor, TriDataHelper
 
 CURRENT_DIRECTORY = os.getcwd()
@@ -81,12 +90,16 @@ class TriFileBaseTransformer:
         file_name: str,
         file_type: str,
         config: DictConfig,
+        data: Optional[pd.DataFrame] = None,
     ):
         self.config = config
         self.file_type = file_type
         self._column_names: List[str]
         self._var_and_value_names: Dict[str, str]
-        self.data = self.load_data(file_name)
+        self.parsed_file_cache = ParsedFileCache(config)
+        # Data selected by `select_desired_data` (e.g., in another process) is not loaded again
+        self._is_data_selected = data is not None
+        self.data = data if data is not None else self.load_data(file_name)
 
     @property
     def column_names(self) -> List[str]:
@@ -104,6 +117,26 @@ class TriFileBaseTransformer:
             self._column_names = TriDataHelper.read_file_columns(columns_file_name)
         return self._column_names
 
+    @property
+    def engine(self) -> str:
+        """Get the engine used to parse the TRI data files ("c" or "pyarrow").
+
+        Returns:
+            str: The parsing engine, "c" if it is not set in the configuration.
+
+        """
+        return self.config.tri_files.get("engine", "c")
+
+    @property
+    def groupby_engine(self) -> str:
+        """Get the engine used to aggregate the TRI data ("numpy" or "pandas").
+
+        Returns:
+            str: The aggregation engine, "numpy" if it is not set in the configuration.
+
+        """
+        return self.config.tri_files.get("groupby_engine", "numpy")
+
     @property
     def var_and_value_names(self) -> Dict[str, str]:
         """Get the 'var_name' and 'value_name' attributes from the configuration file.
@@ -119,19 +152,44 @@ class TriFileBaseTransformer:
             self._var_and_value_names = self._get_var_and_value_names()
         return self._var_and_value_names
 
+    def select_desired_data(self):
+        """Keep only the needed columns and the rows of the plastic additives in the data.
+
+        It runs once, at the start of `process` or earlier (e.g., to collect the facility NAICS
+        codes before processing), so the raw data is released as soon as possible.
+
+        """
+        if not self._is_data_selected:
+            self.data = self.select_columns(self._get_needed_columns())
+            self.data = self.filter_desired_chemicals()
+            self._is_data_selected = True
+
     def filter_desired_chemicals(self):
         """Filter the data to include only the desired chemicals.
 
         Returns:
             pd.DataFrame: The filtered data.
 
+        """
+        return self._filter_plastic_additives(self.data)
+
+    def _filter_plastic_additives(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize the CASRN in 'tri_chem_id' and keep only the plastic additives.
+
+        Args:
+            df (pd.DataFrame): The DataFrame (or chunk) to filter.
+
+        Returns:
+            pd.DataFrame: The rows of the plastic additives.
+
         """
         plastic_additives = [chem["CASRN"] for chem in self.config.plastic_additives.tri_chem_id]
-        self._organize_tri_chem_id()
-        return self.data.loc[self.data.tri_chem_id.isin(plastic_additives)]
+        df.tri_chem_id = self._organize_tri_chem_id(df.tri_chem_id)
+        return TriDataHelper.remove_unused_categories(df.loc[df.tri_chem_id.isin(plastic_additives)])
 
-    def _organize_tri_chem_id(self):
-        self.data.tri_chem_id = self.data.tri_chem_id.str.replace("-", "").str.lstrip("0")
+    def _organize_tri_chem_id(self, tri_chem_id: pd.Series) -> pd.Series:
+        """Remove the dashes and leading zeros of the CASRN."""
+        return TriDataHelper.map_categories(tri_chem_id, lambda casrn: casrn.str.replace("-", "").str.lstrip("0"))
 
     def _get_path_to_columns(self) -> str:
         """Get the path to the columns file.
@@ -199,6 +257,30 @@ class TriFileBaseTransformer:
             if "release_type" in column or "management_type" in column
         ]
 
+    def _get_column_dtypes(self) -> Dict[str, str]:
+        """Build the parsing dtype of each needed column from the configuration.
+
+        Amount columns ('release_type' or 'management_type') are parsed as float, the unit
+        of measure as category and the identifiers as string. A column can override this
+        with an explicit 'dtype' attribute in the configuration.
+
+        Returns:
+            Dict[str, str]: A mapping from column name to dtype.
+
+        """
+        amount_columns = self._get_columns_with_attributes()
+        column_dtypes = {}
+        for column in self.config.tri_files[self.file_type].needed_columns:
+            if "dtype" in column:
+                column_dtypes[column.name] = column.dtype
+            elif column.name in amount_columns:
+                column_dtypes[column.name] = "float64"
+            elif getattr(column, "is_unit_of_measure", False):
+                column_dtypes[column.name] = "category"
+            else:
+                column_dtypes[column.name] = "str"
+        return column_dtypes
+
     def _get_id_vars(self) -> List[str]:
         """Get identifier columns (id_vars) based on 'is_general_info' in config."""
         return [
@@ -261,14 +343,77 @@ class TriFileBaseTransformer:
         file_path = TriDataHelper.generate_data_file_path(
             file_name=file_name,
         )
+        chunksize = self.config.tri_files.get("chunksize")
+        config_slice = {
+            "used_cols": self._get_needed_columns(),
+            "dtype": self._get_column_dtypes(),
+            "engine": self.engine,
+            # The streaming mode keeps only the plastic additives
+            "plastic_additives": self.config.plastic_additives.tri_chem_id if chunksize else None,
+        }
         try:
-            return TriDataHelper.load_txt_data(
-                file_path=file_path,
-                column_names=self.column_names,
+            return self.parsed_file_cache.get_or_parse(
+                source_files=[file_path, self._get_path_to_columns()],
+                config_slice=config_slice,
+                parse=lambda: self._parse_data(file_path, chunksize),
             )
         except FileNotFoundError:
             raise FileNotFoundError(f"File not found: {file_path}")
 
+    def _parse_data(self, file_path: str, chunksize: Optional[int] = None) -> pd.DataFrame:
+        """Parse the TRI data file, in chunks if a chunk size is given.
+
+        Args:
+            file_path (str): The path to the TRI data file.
+            chunksize (Optional[int]): The maximum number of rows parsed at once.
+
+        Returns:
+            pd.DataFrame: The data from the TRI data file.
+
+        """
+        if chunksize:
+            return self._stream_data(file_path, chunksize)
+        return TriDataHelper.load_txt_data(
+            file_path=file_path,
+            column_names=self.column_names,
+            used_cols=self._get_needed_columns(),
+            dtype=self._get_column_dtypes(),
+            engine=self.engine,
+        )
+
+    def _stream_data(self, file_path: str, chunksize: int) -> pd.DataFrame:
+        """Read the TRI data file in chunks, keeping only the rows of the plastic additives.
+
+        Each chunk is filtered as soon as it is parsed, so the peak memory depends on the
+        number of matching rows rather than on the size of the file.
+
+        Args:
+            file_path (str): The path to the TRI data file.
+            chunksize (int): The maximum number of rows parsed at once.
+
+        Returns:
+            pd.DataFrame: The rows of the plastic additives.
+
+        """
+        column_dtypes = self._get_column_dtypes()
+        chunks = [
+            self._filter_plastic_additives(chunk)
+            for chunk in TriDataHelper.iter_txt_data(
+                file_path=file_path,
+                column_names=self.column_names,
+                chunksize=chunksize,
+                used_cols=self._get_needed_columns(),
+                dtype=column_dtypes,
+                engine=self.engine,
+            )
+        ]
+        if not chunks:
+            return pd.DataFrame(columns=self._get_needed_columns())
+
+        # Categories differ between chunks, so concat falls back to object for those columns
+        categorical_columns = {column: dtype for column, dtype in column_dtypes.items() if dtype == "category"}
+        return pd.concat(chunks, ignore_index=True).astype(categorical_columns)
+
 
 class TriFileNumericalTransformer(TriFileBaseTransformer):
     """Class for transforming TRI data files with numerical values.
@@ -287,13 +432,15 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
         file_type: str,
         is_on_site: bool,
         config: DictConfig,
+        data: Optional[pd.DataFrame] = None,
     ):
-        super().__init__(file_name, file_type, config)
+        super().__init__(file_name, file_type, config, data)
         self._management_data: pd.DataFrame
         self._release_data: pd.DataFrame
         self.is_on_site = is_on_site
         self.census_fetcher = NaicsDataFetcher(config)
         self.naics_code_column = self.config.tri_files[self.file_type].naics_code_column
+        self.facility_naics_titles: Optional[pd.DataFrame] = None
 
     def _get_unit_column(self) -> str:
         """Retrieve the column marked as 'is_unit_of_measure' in the config.
@@ -310,33 +457,98 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
             f"The 'is_unit_of_measure' attribute is required in the configuration file for {self.file_type}."
         )
 
-    def apply_conversion(
-        self,
-        value: float,
-        unit: str,
-    ) -> float:
-        """Apply a conversion factor to the value based on the unit of measure.
+    def normalize_naics_code(self):
+        """Fill the missing facility NAICS codes with "0" and format them as integer strings."""
+        self.data[self.naics_code_column] = self._normalize_naics_codes(self.data[self.naics_code_column])
+
+    def _normalize_naics_codes(self, naics_codes: pd.Series) -> pd.Series:
+        """Fill the missing NAICS codes with "0" and format them as integer strings."""
+        if isinstance(naics_codes.dtype, pd.CategoricalDtype) and "0" not in naics_codes.cat.categories:
+            naics_codes = naics_codes.cat.add_categories("0")
+        return TriDataHelper.map_categories(
+            naics_codes.fillna("0"),
+            lambda codes: codes.astype(int).astype(str),
+        )
 
-        Note:
-            - Feel free to modify to Pint or other physical units handler package.
+    def get_facility_naics_codes(self) -> List[str]:
+        """Get the facility NAICS codes of the plastic additives, normalized as in `process`.
 
-        Args:
-            value (float): The value to convert.
-            unit (str): The unit of measure.
+        It can be called before `process`, so the titles of the codes of several files can be
+        looked up at once and set in `facility_naics_titles`. The data is selected first, so it
+        is not selected again by `process`.
 
         Returns:
-            float: The converted value. If the value cannot be converted it returns -1.0
+            List[str]: The unique facility NAICS codes.
 
         """
-        try:
-            conversion_factor = ConversionFactor.from_string(unit)
-            return float(value) * conversion_factor.value
-        except Exception as e:
-            print(f"Conversion error for unit '{unit}': {e}")
-            return -1.0
+        self.select_desired_data()
+        return self._normalize_naics_codes(self.data[self.naics_code_column]).unique().tolist()
+
+    @property
+    def is_sparse_unpivot(self) -> bool:
+        """Whether only non-zero amounts are unpivoted ('sparse_unpivot' in the configuration).
+
+        Returns:
+            bool: True if the sparse unpivot is enabled, which is the default.
+
+        """
+        return self.config.tri_files.get("sparse_unpivot", True)
+
+    def unpivot_amounts(self):
+        """Unpivot the amount columns to long format and convert them to kilograms.
+
+        In sparse mode the units are converted while the data is still wide and only the
+        non-zero amounts are unpivoted. Otherwise, missing amounts are filled with zeros and
+        every amount is unpivoted before the conversion.
+        """
+        if self.is_sparse_unpivot:
+            self.to_kilogram_wide()
+            self.data = self.prepare_sparse_unpivot_columns()
+        else:
+            self.fill_missing_values()
+            self.data = self.prepare_unpivot_columns()
+            self.to_kilogram()
+
+    def prepare_sparse_unpivot_columns(self) -> pd.DataFrame:
+        """Unpivot the DataFrame keeping only the non-zero amounts.
+
+        Returns:
+            pd.DataFrame: The unpivoted DataFrame in long format.
+        """
+        id_vars = [col for col in self._get_id_vars() if col in self.data.columns]
+        value_vars = self._get_value_vars()
+
+        return TriDataHelper.sparse_unpivot_dataframe(
+            self.data,
+            id_vars=id_vars,
+            value_vars=value_vars,
+            var_name=self.var_and_value_names["var_name"],
+            value_name=self.var_and_value_names["value_name"],
+        )
+
+    def to_kilogram_wide(self):
+        """Convert every amount column of the wide data to kilograms.
+
+        Rows with an unknown unit are dropped, reporting how many rows each unit lost, and
+        the unit of measure column is removed.
+        """
+        unit_column = self._get_unit_column()
+        value_vars = self._get_value_vars()
+
+        factors = self._get_conversion_factors(self.data[unit_column])
+        is_unknown_unit = factors.isna()
+        self._report_unknown_units(self.data.loc[is_unknown_unit, unit_column])
+
+        self.data = self.data.loc[~is_unknown_unit].copy()
+        self.data[value_vars] = self.data[value_vars].mul(factors[~is_unknown_unit], axis=0)
+        self._drop_measure_unit_column(unit_column)
 
     def to_kilogram(self):
-        """Convert the value column to kilograms based on the unit of measure."""
+        """Convert the value column to kilograms based on the unit of measure.
+
+        The factors are looked up once per distinct unit and multiplied column-wise. Rows with
+        an unknown unit are set to -1.0 and dropped, reporting how many rows each unit lost.
+        """
         value_column = self.var_and_value_names["value_name"]
         if value_column not in self.data.columns:
             raise KeyError(
@@ -345,12 +557,38 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
 
         unit_column = self._get_unit_column()
 
-        self.data[value_column] = self.data.apply(
-            lambda row: self.apply_conversion(row[value_column], row[unit_column]), axis=1
-        )
+        factors = self._get_conversion_factors(self.data[unit_column])
+        is_unknown_unit = factors.isna()
+        self._report_unknown_units(self.data.loc[is_unknown_unit, unit_column])
+
+        self.data[value_column] = self.data[value_column].mul(factors).where(~is_unknown_unit, -1.0)
         self._drop_no_converted_rows(value_column)
         self._drop_measure_unit_column(unit_column)
 
+    def _get_conversion_factors(self, units: pd.Series) -> pd.Series:
+        """Map each unit of measure to its kilogram conversion factor (NaN if unknown).
+
+        Args:
+            units (pd.Series): The unit of measure of each row.
+
+        Returns:
+            pd.Series: The conversion factor of each row.
+
+        """
+        units = units.astype(object)
+        factors = ConversionFactor.factors_for(units.dropna().unique())
+        return units.map(factors).astype(float)
+
+    def _report_unknown_units(self, unknown_units: pd.Series):
+        """Print how many rows are dropped for each unit that cannot be converted.
+
+        Args:
+            unknown_units (pd.Series): The unit of measure of the rows that cannot be converted.
+
+        """
+        for unit, count in unknown_units.astype(object).value_counts(dropna=False).items():
+            print(f"Conversion error for unit '{unit}': {count} rows dropped from the {self.file_type} data.")
+
     def aggregate_values(
         self,
         df: pd.DataFrame,
@@ -374,8 +612,7 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
             raise KeyError(f"The value column '{value_column}' specified in configuration does not exist in the data.")
 
         group_columns = [col for col in df.columns if col != value_column]
-        aggregated_df = df.groupby(group_columns, as_index=False)[value_column].sum()
-        return cast(pd.DataFrame, aggregated_df)
+        return TriDataHelper.aggregate(df, group_columns, value_column, how="sum", engine=self.groupby_engine)
 
     def separate_releases_and_management(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Separate DataFrame into releases and management based on configuration.
@@ -435,10 +672,12 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
             df_releases (pd.DataFrame): The DataFrame containing release data.
 
         """
-        df_releases.loc[:, self.var_and_value_names["var_name"]] = df_releases[self.var_and_value_names["var_name"]].map(
-            self.release_type_mapping  # type: ignore [reportArgumentType]
+        var_name = self.var_and_value_names["var_name"]
+        release_types = TriDataHelper.map_categories(
+            df_releases[var_name],
+            lambda names: names.map(self.release_type_mapping),  # type: ignore [reportArgumentType]
         )
-        return df_releases
+        return df_releases.assign(**{var_name: release_types})
 
     def format_management_column_names(self, df_management: pd.DataFrame) -> pd.DataFrame:
         """Format the column names of the management DataFrame.
@@ -453,16 +692,12 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
             pd.DataFrame: Updated DataFrame with formatted column values.
 
         """
-        # Create a mapping for the management column values to the desired format
-        column_value_mapping = {
-            col: col.replace("_", " ").capitalize() for col in df_management[self.var_and_value_names["var_name"]].unique()
-        }
-
-        df_management.loc[:, self.var_and_value_names["var_name"]] = df_management.loc[
-            :, self.var_and_value_names["var_name"]
-        ].map(column_value_mapping)
-
-        return df_management
+        var_name = self.var_and_value_names["var_name"]
+        management_names = TriDataHelper.map_categories(
+            df_management[var_name],
+            lambda names: names.str.replace("_", " ").str.capitalize(),
+        )
+        return df_management.assign(**{var_name: management_names})
 
     def _drop_no_converted_rows(
         self,
@@ -567,8 +802,16 @@ class TriFileNumericalTransformer(TriFileBaseTransformer):
         return df
 
     def look_for_facility_naics_code(self):
-        """Look for facility NAICS code in the data."""
-        naics_results = self.census_fetcher.process_naics_codes(self.data, self.naics_code_column)
+        """Look for facility NAICS code in the data.
+
+        The titles set in `facility_naics_titles` (e.g., looked up by the orchestrator for all the
+        files at once) are merged as they are. Otherwise, they are fetched for this file.
+
+        """
+        if self.facility_naics_titles is not None:
+            naics_results = self.facility_naics_titles.astype("category")
+        else:
+            naics_results = self.census_fetcher.process_naics_codes(self.data, self.naics_code_column).astype("category")
         self.data = self.data.merge(
             naics_results,
             left_on=self.naics_code_column,
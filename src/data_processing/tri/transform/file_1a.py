@@ -20,8 +20,8 @@ Attributes:
     data (pd.DataFrame): The primary DataFrame for storing and transforming TRI data.
 
 Methods:
-    __init__(file_name: str, config: DictConfig): Initializes the transformer with file name, file type,
-        and configuration settings.
+    __init__(file_name: str, config: DictConfig, data: Optional[pd.DataFrame] = None): Initializes the
+        transformer with file name, file type, and configuration settings, and the already selected data, if any.
     process(): Executes the complete data processing pipeline, including:
         - Column selection based on required fields.
         - Handling missing values.
@@ -53,7 +53,9 @@ Notes:
 
 """
 
+from typing import Optional
 
+import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.tri.transform.base import TriFileNumericalTransformer
@@ -74,18 +76,15 @@ class TriFile1aTransformer(TriFileNumericalTransformer):
         self,
         file_name: str,
         config: DictConfig,
+        data: Optional[pd.DataFrame] = None,
     ):
-        super().__init__(file_name, "file_1a", True, config)
+        super().__init__(file_name, "file_1a", True, config, data)
 
     def process(self):
         """Process the TRI data file."""
-        needed_columns = self._get_needed_columns()
-        self.data = self.select_columns(needed_columns)
-        self.data = self.filter_desired_chemicals()
-        self.fill_missing_values()
-        self.data = self.prepare_unpivot_columns()
-        self.to_kilogram()
-        self.data[self.naics_code_column] = self.data[self.naics_code_column].fillna(0).astype(int).astype(str)
+        self.select_desired_data()
+        self.unpivot_amounts()
+        self.normalize_naics_code()
         self.look_for_facility_naics_code()
         self.df_releases, self.df_management = self.separate_releases_and_management()
         self.df_releases = self.organize_resealse_dataframe(self.df_releases)
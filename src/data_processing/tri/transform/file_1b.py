@@ -19,11 +19,11 @@ Attributes:
 Methods:
     __init__(file_name: str, config: DictConfig): Initializes the transformer with file name, file type,
         and configuration settings, and sets up the NAICS data fetcher.
-    aggregate_yes_no() -> pd.DataFrame: Aggregates the data by grouping on all columns except a
-        specified "Yes/No" column. For each group, if any entry in the "Yes/No" column is 'Yes',
-        the aggregated value for the group will be 'Yes'; otherwise, it will be 'No'.
-    process(): Orchestrates the full data transformation by selecting required columns, preparing
-        the data for aggregation, enriching with NAICS descriptions, and applying Yes/No aggregation.
+    aggregate_activity_mask() -> pd.DataFrame: Encodes the chemical activities of each facility and
+        chemical as one integer bitmask, with the bits in the order of the activity columns in the
+        configuration. A bit is set if any entry of its activity column is 'Yes'.
+    process(): Orchestrates the full data transformation by selecting required columns, filtering
+        the plastic additives and encoding the chemical activities as bitmasks.
 
 Example Usage:
     ```
@@ -41,12 +41,11 @@ Example Usage:
 
 """
 
-from typing import cast
-
 import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.tri.transform.base import TriFileBaseTransformer
+from src.data_processing.tri.utils import TriDataHelper
 
 
 class TriFile1bTransformer(TriFileBaseTransformer):
@@ -67,35 +66,33 @@ class TriFile1bTransformer(TriFileBaseTransformer):
     ):
         super().__init__(file_name, "file_1b", config)
 
-    def aggregate_yes_no(self) -> pd.DataFrame:
-        """Aggregate the DataFrame based on Yes/No values in a specified column.
+    def aggregate_activity_mask(self) -> pd.DataFrame:
+        """Encode the chemical activities of each facility and chemical as one bitmask.
+
+        Bit i of the mask is set when the i-th activity column of 'needed_columns' is 'Yes'
+        in any row of the (trifid, tri_chem_id) pair.
 
         Returns:
-            pd.DataFrame: Aggregated DataFrame where each group has a Yes if any entry in the
-                          value_column is Yes, otherwise No.
+            pd.DataFrame: One row per 'trifid' and 'tri_chem_id' with the activity bitmask.
         """
-        value_column = self.var_and_value_names["value_name"]
-
-        # Ensure value_column exists in the data
-        if value_column not in self.data.columns:
-            raise KeyError(f"The value column '{value_column}' specified in configuration does not exist in the file_1b data.")
-
-        group_columns = [col for col in self.data.columns if col != value_column]
-
-        aggregated_df = self.data.groupby(group_columns, as_index=False).agg(
-            {value_column: lambda x: "Yes" if "Yes" in x.values else "No"}
+        mask_name = self.config.tri_files.file_1b.mask_name
+        key_columns = ["trifid", "tri_chem_id"]
+
+        is_performed = self.data[self._get_value_vars()].isin(["Yes"])
+        df_masks = self.data[key_columns].assign(**{mask_name: TriDataHelper.encode_bitmask(is_performed)})
+
+        return TriDataHelper.aggregate(
+            df_masks,
+            key_columns,
+            mask_name,
+            how="bit_or",
+            engine=self.groupby_engine,
         )
 
-        return cast(pd.DataFrame, aggregated_df)
-
     def process(self):
         """Process the TRI data file."""
-        needed_columns = self._get_needed_columns()
-        self.data = self.select_columns(needed_columns)
-        self.data = self.filter_desired_chemicals()
-        self.data = self.prepare_unpivot_columns()
-        self.data["is_performed"] = self.data["is_performed"].fillna("No")
-        self.data = self.aggregate_yes_no()
+        self.select_desired_data()
+        self.data = self.aggregate_activity_mask()
 
         if self.data.empty:
             raise ValueError("The data is empty after processing. Please check the configuration settings and the input data.")
@@ -19,10 +19,10 @@ Attributes:
     data (pd.DataFrame): The main DataFrame containing raw or processed TRI data.
 
 Methods:
-    __init__(file_name: str, config: DictConfig): Initializes the transformer with file name, file type,
-        and configuration settings.
-    look_for_offsite_naics_code(): Searches for offsite NAICS codes using the FRS and Census APIs.
-        Filters results to exclude null NAICS codes (e.g., for facilities located outside the U.S.),
+    __init__(file_name: str, config: DictConfig, data: Optional[pd.DataFrame] = None): Initializes the
+        transformer with file name, file type, and configuration settings, and the already selected data, if any.
+    look_for_offsite_naics_code(): Searches for offsite NAICS codes using the FRS and Census APIs,
+        looking up each NAICS title as soon as the FRS response with its code arrives. Filters results to exclude null NAICS codes (e.g., for facilities located outside the U.S.),
         merges enriched data into the management DataFrame, and updates the main data.
     process(): Orchestrates the transformation pipeline by selecting required columns, handling missing
         values, converting units, separating release and management records, formatting management
@@ -50,7 +50,9 @@ Notes:
 
 """
 
+from typing import Optional
 
+import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.frs_api_queries import FrsDataFetcher
@@ -73,8 +75,9 @@ class TriFile3aTransformer(TriFileNumericalTransformer):
         self,
         file_name: str,
         config: DictConfig,
+        data: Optional[pd.DataFrame] = None,
     ):
-        super().__init__(file_name, "file_3a", False, config)
+        super().__init__(file_name, "file_3a", False, config, data)
         self.frs_fether = FrsDataFetcher(config)
         self.census_fetcher = NaicsDataFetcher(config)
 
@@ -84,7 +87,9 @@ class TriFile3aTransformer(TriFileNumericalTransformer):
         self.df_management[off_site_frs_id_column] = self.df_management[off_site_frs_id_column].astype(int).astype(str)
 
         # Some times it could return a null naics code because the offsite is located outside the U.S.
-        frs_results = self.frs_fether.process_registry_ids(
+        # The NAICS titles are looked up as the FRS responses arrive
+        frs_results, naics_results = self.census_fetcher.process_frs_registry_ids(
+            self.frs_fether,
             self.df_management,
             off_site_frs_id_column,
         )
@@ -93,7 +98,6 @@ class TriFile3aTransformer(TriFileNumericalTransformer):
             subset=["off_site_naics_code"],
             inplace=True,
         )
-        naics_results = self.census_fetcher.process_naics_codes(frs_results, "off_site_naics_code")
         naics_results.rename(
             columns={
                 "naics_code": "off_site_naics_code",
@@ -119,13 +123,9 @@ class TriFile3aTransformer(TriFileNumericalTransformer):
 
     def process(self):
         """Process the TRI data file."""
-        needed_columns = self._get_needed_columns()
-        self.data = self.select_columns(needed_columns)
-        self.data = self.filter_desired_chemicals()
-        self.fill_missing_values()
-        self.data = self.prepare_unpivot_columns()
-        self.to_kilogram()
-        self.data[self.naics_code_column] = self.data[self.naics_code_column].fillna(0).astype(int).astype(str)
+        self.select_desired_data()
+        self.unpivot_amounts()
+        self.normalize_naics_code()
         self.look_for_facility_naics_code()
         self.df_releases, self.df_management = self.separate_releases_and_management()
         self.df_releases = self.organize_resealse_dataframe(self.df_releases)
@@ -36,6 +36,9 @@ Example Usage:
 
 """
 
+from typing import Optional
+
+import pandas as pd
 from omegaconf import DictConfig
 
 from src.data_processing.tri.transform.base import TriFileNumericalTransformer
@@ -56,8 +59,9 @@ class TriFile3cTransformer(TriFileNumericalTransformer):
         self,
         file_name: str,
         config: DictConfig,
+        data: Optional[pd.DataFrame] = None,
     ):
-        super().__init__(file_name, "file_3c", False, config)
+        super().__init__(file_name, "file_3c", False, config, data)
 
     def _assign_naics_to_potw(self):
         self.df_management["off_site_naics_code"] = self.config.potw_naics_code.naics_code
@@ -65,13 +69,9 @@ class TriFile3cTransformer(TriFileNumericalTransformer):
 
     def process(self):
         """Process the TRI data file."""
-        needed_columns = self._get_needed_columns()
-        self.data = self.select_columns(needed_columns)
-        self.data = self.filter_desired_chemicals()
-        self.fill_missing_values()
-        self.data = self.prepare_unpivot_columns()
-        self.to_kilogram()
-        self.data[self.naics_code_column] = self.data[self.naics_code_column].fillna(0).astype(int).astype(str)
+        self.select_desired_data()
+        self.unpivot_amounts()
+        self.normalize_naics_code()
         self.look_for_facility_naics_code()
         self.df_management = self.aggregate_values(self.data)
         self.df_management = self.format_management_column_names(self.df_management)
@@ -15,11 +15,16 @@ Classes:
 
 """
 
+import io
 import os
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+from pyarrow import csv as pa_csv
 
 CURRENT_DIRECTORY = os.getcwd()
 
@@ -60,6 +65,25 @@ class ConversionFactor(Enum):
         else:
             raise ValueError(f"Unknown unit: {unit}")
 
+    @classmethod
+    def factors_for(cls, units: Iterable[str]) -> Dict[str, float]:
+        """Get the conversion factor of each recognized unit.
+
+        Args:
+            units: Iterable[str]: The distinct units to look up, as written in the data.
+
+        Returns:
+            Dict[str, float]: A mapping from unit to conversion factor. Unknown units are left out.
+
+        """
+        factors = {}
+        for unit in units:
+            try:
+                factors[unit] = cls.from_string(unit).value
+            except (ValueError, AttributeError):
+                continue
+        return factors
+
 
 class TriDataHelper:
     """Helper class for working with TRI data files."""
@@ -112,36 +136,314 @@ class TriDataHelper:
         )
 
     @classmethod
-    def load_txt_data(cls, file_path: str, column_names: List[str], used_cols: Optional[List[str]] = None) -> pd.DataFrame:
+    def load_txt_data(
+        cls,
+        file_path: str,
+        column_names: List[str],
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+        engine: str = "c",
+    ) -> pd.DataFrame:
         """Load the data from a text file.
 
+        Only the requested columns are parsed, so the projection and the dtypes are
+        applied while reading instead of on the full-width object DataFrame.
+
         Args:
           file_path: str: The path to the text file.
           column_names: List[str]: The names of the columns in the data.
           used_cols: Optional[List[str]]: The columns to use from the data.
             If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+            Columns that are not in the mapping are inferred by pandas.
+          engine: str: The parsing engine, either "c" (pandas) or "pyarrow". The pyarrow
+            engine parses with multiple threads and returns Arrow-backed columns.
 
         Returns:
           pd.DataFrame: The data from the text file.
 
         """
+        if engine == "pyarrow":
+            return cls._load_txt_data_with_pyarrow(file_path, column_names, used_cols, dtype)
+
         try:
             df = pd.read_csv(
                 file_path,
-                sep="\t",
-                header=None,
-                encoding="ISO-8859-1",
-                low_memory=False,
-                lineterminator="\n",
-                quotechar='"',
-                on_bad_lines="skip",
-                usecols=range(len(column_names)),
+                **cls._get_read_csv_kwargs(column_names, used_cols, dtype),
             )
-            df.columns = column_names
+            df.columns = [column_names[position] for position in df.columns]
             return df
         except FileNotFoundError:
             raise FileNotFoundError(f"File not found: {file_path}")
 
+    @classmethod
+    def iter_txt_data(
+        cls,
+        file_path: str,
+        column_names: List[str],
+        chunksize: int,
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+        engine: str = "c",
+    ) -> Iterator[pd.DataFrame]:
+        """Stream the data from a text file in chunks of bounded size.
+
+        Args:
+          file_path: str: The path to the text file.
+          column_names: List[str]: The names of the columns in the data.
+          chunksize: int: The maximum number of rows per chunk.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+          engine: str: The parsing engine, either "c" (pandas) or "pyarrow".
+
+        Yields:
+          pd.DataFrame: The next chunk of data from the text file.
+
+        """
+        if engine == "pyarrow":
+            yield from cls._iter_txt_data_with_pyarrow(file_path, column_names, chunksize, used_cols, dtype)
+            return
+
+        try:
+            reader = pd.read_csv(
+                file_path,
+                chunksize=chunksize,
+                **cls._get_read_csv_kwargs(column_names, used_cols, dtype),
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        with reader:
+            for chunk in reader:
+                chunk.columns = [column_names[position] for position in chunk.columns]
+                yield chunk
+
+    @classmethod
+    def _get_read_csv_kwargs(
+        cls,
+        column_names: List[str],
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Get the pandas.read_csv arguments shared by the TRI text file readers.
+
+        Args:
+          column_names: List[str]: The names of the columns in the data.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+
+        Returns:
+          Dict[str, Any]: The keyword arguments for pandas.read_csv.
+
+        """
+        positions = cls._get_column_positions(column_names, used_cols)
+        dtype = dtype or {}
+        return {
+            "sep": "\t",
+            "header": None,
+            "skiprows": 1,  # The raw header labels differ from the normalized column names
+            "encoding": "ISO-8859-1",
+            "low_memory": False,
+            "lineterminator": "\n",
+            "quotechar": '"',
+            "on_bad_lines": "skip",
+            "usecols": positions,
+            "dtype": {position: dtype[column_names[position]] for position in positions if column_names[position] in dtype},
+        }
+
+    @classmethod
+    def _load_txt_data_with_pyarrow(
+        cls,
+        file_path: str,
+        column_names: List[str],
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Load the data from a text file with the multithreaded PyArrow CSV reader.
+
+        Args:
+          file_path: str: The path to the text file.
+          column_names: List[str]: The names of the columns in the data.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+
+        Returns:
+          pd.DataFrame: The data from the text file, with Arrow-backed columns.
+
+        """
+        ragged_rows: List[str] = []
+        options = cls._get_pyarrow_csv_options(file_path, column_names, used_cols, dtype, ragged_rows)
+        table = pa_csv.read_csv(file_path, **options)
+        if ragged_rows:
+            table = pa.concat_tables([table, cls._read_ragged_rows(ragged_rows, options)])
+        return table.to_pandas(types_mapper=cls._arrow_types_mapper)
+
+    @classmethod
+    def _iter_txt_data_with_pyarrow(
+        cls,
+        file_path: str,
+        column_names: List[str],
+        chunksize: int,
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Stream the data from a text file with the PyArrow CSV reader.
+
+        The record batches are grouped so that each chunk holds at least `chunksize` rows,
+        except the last one, which also holds the rows fitted to the header width.
+
+        Args:
+          file_path: str: The path to the text file.
+          column_names: List[str]: The names of the columns in the data.
+          chunksize: int: The number of rows per chunk.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+
+        Yields:
+          pd.DataFrame: The next chunk of data from the text file, with Arrow-backed columns.
+
+        """
+        ragged_rows: List[str] = []
+        options = cls._get_pyarrow_csv_options(file_path, column_names, used_cols, dtype, ragged_rows)
+        reader = pa_csv.open_csv(file_path, **options)
+        batches: List[pa.RecordBatch] = []
+        n_rows = 0
+        for batch in reader:
+            batches.append(batch)
+            n_rows += batch.num_rows
+            if n_rows >= chunksize:
+                yield pa.Table.from_batches(batches).to_pandas(types_mapper=cls._arrow_types_mapper)
+                batches, n_rows = [], 0
+        if ragged_rows:
+            batches.extend(cls._read_ragged_rows(ragged_rows, options).to_batches())
+        if batches:
+            yield pa.Table.from_batches(batches).to_pandas(types_mapper=cls._arrow_types_mapper)
+
+    @classmethod
+    def _get_pyarrow_csv_options(
+        cls,
+        file_path: str,
+        column_names: List[str],
+        used_cols: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+        ragged_rows: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Get the PyArrow CSV options equivalent to the pandas.read_csv arguments.
+
+        PyArrow rejects the rows whose number of fields differs from the header, while the
+        C engine keeps them, with missing values for the absent fields and without the extra
+        ones. These rows are padded or truncated to the header width and collected in
+        `ragged_rows`, to be parsed with `_read_ragged_rows` once the file is read.
+
+        Args:
+          file_path: str: The path to the text file.
+          column_names: List[str]: The names of the columns in the data.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+          dtype: Optional[Dict[str, str]]: The dtype of each used column, keyed by column name.
+          ragged_rows: Optional[List[str]]: The list that collects the rows fitted to the header width.
+            If None, these rows are skipped.
+
+        Returns:
+          Dict[str, Any]: The read, parse and convert options for pyarrow.csv.
+
+        """
+        try:
+            with open(file_path, "r", encoding="ISO-8859-1") as file:
+                n_fields = file.readline().count("\t") + 1
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        # Rows may have more fields than the columns file lists; those are never included
+        all_names = column_names + [f"unnamed_{position}" for position in range(len(column_names), n_fields)]
+        include_columns = [column_names[position] for position in cls._get_column_positions(column_names, used_cols)]
+        dtype = dtype or {}
+
+        def handle_invalid_row(row: pa_csv.InvalidRow) -> str:
+            if ragged_rows is not None:
+                fields = row.text.split("\t")[: row.expected_columns]
+                ragged_rows.append("\t".join(fields + [""] * (row.expected_columns - len(fields))))
+            return "skip"
+
+        return {
+            "read_options": pa_csv.ReadOptions(
+                column_names=all_names,
+                skip_rows=1,  # The raw header labels differ from the normalized column names
+                encoding="ISO-8859-1",
+            ),
+            "parse_options": pa_csv.ParseOptions(
+                delimiter="\t",
+                quote_char='"',
+                invalid_row_handler=handle_invalid_row,
+            ),
+            "convert_options": pa_csv.ConvertOptions(
+                include_columns=include_columns,
+                column_types={column: cls._to_arrow_type(dtype[column]) for column in include_columns if column in dtype},
+                strings_can_be_null=True,
+            ),
+        }
+
+    @classmethod
+    def _read_ragged_rows(cls, ragged_rows: List[str], options: Dict[str, Any]) -> pa.Table:
+        """Parse the rows fitted to the header width by the PyArrow reader.
+
+        Args:
+          ragged_rows: List[str]: The fitted rows, already decoded from the file encoding.
+          options: Dict[str, Any]: The PyArrow CSV options used to read the file.
+
+        Returns:
+          pa.Table: The rows with the same columns and types as the rest of the file.
+
+        """
+        read_options = pa_csv.ReadOptions(column_names=options["read_options"].column_names, encoding="utf8")
+        return pa_csv.read_csv(
+            io.BytesIO("\n".join(ragged_rows).encode("utf8")),
+            read_options=read_options,
+            parse_options=options["parse_options"],
+            convert_options=options["convert_options"],
+        )
+
+    @classmethod
+    def _to_arrow_type(cls, dtype: str) -> pa.DataType:
+        """Translate a pandas dtype name into the Arrow type used by the PyArrow reader."""
+        if dtype == "category":
+            return pa.dictionary(pa.int32(), pa.string())
+        if dtype == "str":
+            return pa.string()
+        return pa.from_numpy_dtype(np.dtype(dtype))
+
+    @classmethod
+    def _arrow_types_mapper(cls, arrow_type: pa.DataType) -> Optional[pd.ArrowDtype]:
+        """Keep Arrow-backed columns in pandas, except dictionaries that become categoricals."""
+        if pa.types.is_dictionary(arrow_type):
+            return None
+        return pd.ArrowDtype(arrow_type)
+
+    @classmethod
+    def _get_column_positions(cls, column_names: List[str], used_cols: Optional[List[str]] = None) -> List[int]:
+        """Get the positions of the used columns in the text file.
+
+        Args:
+          column_names: List[str]: The names of the columns in the data.
+          used_cols: Optional[List[str]]: The columns to use from the data.
+            If None, all columns are used.
+
+        Returns:
+          List[int]: The sorted positions of the used columns.
+
+        """
+        if used_cols is None:
+            return list(range(len(column_names)))
+
+        missing = set(used_cols) - set(column_names)
+        if missing:
+            print(f"Warning: These columns were not found in the columns file and will be ignored: {missing}")
+        return sorted(column_names.index(col) for col in used_cols if col not in missing)
+
     @classmethod
     def unpivot_dataframe(
         cls, df: pd.DataFrame, id_vars: List[str], value_vars: List[str], var_name: str = "variable", value_name: str = "value"
@@ -156,12 +458,255 @@ class TriDataHelper:
             value_name (str): Name of the new column for the variable values (default: 'value').
 
         Returns:
-            pd.DataFrame: The unpivoted DataFrame in long format.
+            pd.DataFrame: The unpivoted DataFrame in long format, with the variable names as categorical.
         """
-        return pd.melt(
+        long_df = pd.melt(
             df,
             id_vars=id_vars,
             value_vars=value_vars,
             var_name=var_name,
             value_name=value_name,
         )
+        long_df[var_name] = long_df[var_name].astype(pd.CategoricalDtype(value_vars))
+        return long_df
+
+    @classmethod
+    def sparse_unpivot_dataframe(
+        cls, df: pd.DataFrame, id_vars: List[str], value_vars: List[str], var_name: str = "variable", value_name: str = "value"
+    ) -> pd.DataFrame:
+        """Unpivot (melt) a DataFrame from wide to long format, keeping only non-zero values.
+
+        Zero and missing cells are skipped before the long frame is built, so its size
+        depends on the number of reported values instead of rows times value columns.
+
+        Args:
+            df (pd.DataFrame): The input DataFrame.
+            id_vars (List[str]): Columns to use as identifier variables.
+            value_vars (List[str]): Numeric columns to unpivot.
+            var_name (str): Name of the new column for the variable names (default: 'variable').
+            value_name (str): Name of the new column for the variable values (default: 'value').
+
+        Returns:
+            pd.DataFrame: The unpivoted DataFrame in long format without zero or missing values,
+                with the variable names as categorical.
+        """
+        values = df[value_vars].to_numpy(dtype=float, na_value=np.nan)
+        rows, columns = np.nonzero(np.nan_to_num(values, nan=0.0))
+
+        long_df = df[id_vars].iloc[rows].reset_index(drop=True)
+        long_df[var_name] = pd.Categorical.from_codes(columns, categories=value_vars)
+        long_df[value_name] = values[rows, columns]
+        return long_df
+
+    @staticmethod
+    def map_categories(series: pd.Series, mapper: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        """Transform the values of a Series, keeping it categorical.
+
+        For a categorical Series the mapper is applied to the categories only, once per
+        distinct value instead of once per row, and the categories that end up with the
+        same value are merged. Any other Series is passed to the mapper as is.
+
+        Args:
+            series (pd.Series): The Series to transform.
+            mapper (Callable[[pd.Series], pd.Series]): A vectorized transformation of a Series of values.
+
+        Returns:
+            pd.Series: The transformed Series.
+
+        """
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            return mapper(series)
+
+        new_codes, new_categories = pd.factorize(mapper(series.cat.categories.to_series()))
+        # The extra -1 keeps the missing values (code -1) missing
+        code_lookup = np.append(new_codes, -1)
+        return pd.Series(
+            pd.Categorical.from_codes(code_lookup[series.cat.codes.to_numpy()], categories=new_categories),
+            index=series.index,
+            name=series.name,
+        )
+
+    @staticmethod
+    def remove_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+        """Drop the categories without rows from every categorical column of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The input DataFrame.
+
+        Returns:
+            pd.DataFrame: The DataFrame with only the observed categories.
+
+        """
+        categorical_columns = df.select_dtypes("category").columns
+        return df.assign(**{column: df[column].cat.remove_unused_categories() for column in categorical_columns})
+
+    @staticmethod
+    def unify_categories(
+        left: pd.DataFrame,
+        right: pd.DataFrame,
+        columns: List[str],
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Give the categorical columns of two DataFrames the same categories.
+
+        Merging on categorical keys with identical categories joins on the integer codes,
+        while different categories make pandas fall back to the values.
+
+        Args:
+            left (pd.DataFrame): The left DataFrame.
+            right (pd.DataFrame): The right DataFrame.
+            columns (List[str]): The columns to unify, usually the merge keys.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: The two DataFrames with unified categories.
+
+        """
+        unified_dtypes = {}
+        for column in columns:
+            if isinstance(left[column].dtype, pd.CategoricalDtype) and isinstance(right[column].dtype, pd.CategoricalDtype):
+                categories = union_categoricals([left[column].array, right[column].array]).categories
+                unified_dtypes[column] = pd.CategoricalDtype(categories)
+        return left.astype(unified_dtypes), right.astype(unified_dtypes)
+
+    @classmethod
+    def aggregate(
+        cls,
+        df: pd.DataFrame,
+        group_columns: List[str],
+        value_column: str,
+        how: str = "sum",
+        engine: str = "numpy",
+    ) -> pd.DataFrame:
+        """Aggregate a column over the groups of the key columns.
+
+        The "numpy" engine factorizes the key columns into one int64 group code per row and
+        reduces the values with `np.bincount`, so the keys are hashed once per column instead
+        of once per group. The "pandas" engine uses `DataFrame.groupby`. Both drop the rows
+        with a missing key and return the groups sorted by key.
+
+        Args:
+            df (pd.DataFrame): The input DataFrame.
+            group_columns (List[str]): The key columns.
+            value_column (str): The column to aggregate.
+            how (str): The reduction, "sum" (missing values count as zero), "any" (boolean column)
+                or "bit_or" (integer bitmask column).
+            engine (str): The aggregation engine, "numpy" or "pandas".
+
+        Returns:
+            pd.DataFrame: One row per group with the key columns and the aggregated value.
+
+        Raises:
+            ValueError: If the reduction or the engine is not supported.
+
+        """
+        if how not in ("sum", "any", "bit_or"):
+            raise ValueError(f"Unsupported aggregation: {how}. Use 'sum', 'any' or 'bit_or'.")
+        if engine not in ("numpy", "pandas"):
+            raise ValueError(f"Unsupported aggregation engine: {engine}. Use 'numpy' or 'pandas'.")
+
+        if engine == "pandas" or df.empty:
+            reducer = (lambda values: np.bitwise_or.reduce(values.to_numpy())) if how == "bit_or" else how
+            return df.groupby(group_columns, as_index=False, observed=True)[value_column].agg(reducer)
+
+        row_positions, group_codes, first_rows = cls._factorize_groups(df, group_columns)
+        n_groups = len(first_rows)
+        if how == "sum":
+            values = np.nan_to_num(df[value_column].to_numpy(dtype=float, na_value=np.nan)[row_positions])
+            aggregated_values = np.bincount(group_codes, weights=values, minlength=n_groups)
+        elif how == "any":
+            values = df[value_column].to_numpy(dtype=bool)[row_positions]
+            aggregated_values = np.bincount(group_codes, weights=values, minlength=n_groups) > 0
+        else:
+            order = np.argsort(group_codes, kind="stable")
+            group_starts = np.searchsorted(group_codes[order], np.arange(n_groups))
+            values = df[value_column].to_numpy(dtype=np.int64)[row_positions]
+            aggregated_values = np.bitwise_or.reduceat(values[order], group_starts)
+
+        aggregated_df = df[group_columns].iloc[first_rows].reset_index(drop=True)
+        aggregated_df[value_column] = aggregated_values
+        return aggregated_df
+
+    @classmethod
+    def _factorize_groups(cls, df: pd.DataFrame, group_columns: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Combine the codes of the key columns into one group code per row.
+
+        Args:
+            df (pd.DataFrame): The input DataFrame.
+            group_columns (List[str]): The key columns.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The positions of the rows without missing keys,
+                their group codes (numbered in key order) and the position of the first row of each group.
+
+        """
+        column_codes = [cls._factorize_column(df[column]) for column in group_columns]
+        is_complete = np.ones(len(df), dtype=bool)
+        for codes, _ in column_codes:
+            is_complete &= codes >= 0
+        row_positions = np.flatnonzero(is_complete)
+
+        group_codes = np.zeros(len(row_positions), dtype=np.int64)
+        for codes, n_uniques in column_codes:
+            # Renumbering after each column keeps the combined code below the number of rows
+            _, group_codes = np.unique(group_codes * n_uniques + codes[row_positions], return_inverse=True)
+
+        _, first_positions = np.unique(group_codes, return_index=True)
+        return row_positions, group_codes, row_positions[first_positions]
+
+    @staticmethod
+    def _factorize_column(series: pd.Series) -> Tuple[np.ndarray, int]:
+        """Get the sorted codes of a column (-1 for missing values) and the number of distinct values."""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(dtype=np.int64), len(series.cat.categories)
+        codes, uniques = pd.factorize(series, sort=True)
+        return codes.astype(np.int64), len(uniques)
+
+    @staticmethod
+    def encode_bitmask(flags: pd.DataFrame) -> pd.Series:
+        """Pack the boolean columns of each row into one int64 bitmask.
+
+        Bit i of the mask is set when the i-th column of the row is True.
+
+        Args:
+            flags (pd.DataFrame): The boolean columns, in bit order.
+
+        Returns:
+            pd.Series: The bitmask of each row.
+
+        Raises:
+            ValueError: If there are more columns than bits in an int64.
+
+        """
+        n_bits = flags.shape[1]
+        if n_bits > 63:
+            raise ValueError(f"A bitmask holds at most 63 flags, but {n_bits} columns were given.")
+        bit_values = np.left_shift(1, np.arange(n_bits, dtype=np.int64))
+        return pd.Series(flags.to_numpy(dtype=np.int64) @ bit_values, index=flags.index)
+
+    @staticmethod
+    def expand_bitmask(
+        df: pd.DataFrame,
+        mask_column: str,
+        names: List[str],
+        name_column: str,
+    ) -> pd.DataFrame:
+        """Expand a bitmask column into one row per set bit.
+
+        Missing masks are treated as empty, so their rows are dropped.
+
+        Args:
+            df (pd.DataFrame): The input DataFrame.
+            mask_column (str): The column with the bitmask.
+            names (List[str]): The name of each bit, in bit order.
+            name_column (str): The new column for the names of the set bits.
+
+        Returns:
+            pd.DataFrame: The other columns repeated once per set bit, with the bit names as categorical.
+
+        """
+        masks = df[mask_column].fillna(0).to_numpy(dtype=np.int64)
+        is_set = np.right_shift(masks[:, None], np.arange(len(names), dtype=np.int64)) & 1 == 1
+        rows, bits = np.nonzero(is_set)
+
+        expanded_df = df.drop(columns=[mask_column]).iloc[rows].reset_index(drop=True)
+        expanded_df[name_column] = pd.Categorical.from_codes(bits, categories=names)
+        return expanded_df